@@ -4,36 +4,73 @@ auto_per_estimator.py
 たーちゃん哲学2.0 - 銘柄ごとの個別最適化売却目標
 """
 
-import yfinance as yf
 import pandas as pd
 import pickle
-import os
 from datetime import datetime, timedelta
 
+import perf
+from history_store import get_history
+from local_store import connect
 
-# キャッシュファイルパス
-CACHE_FILE = "target_prices_cache.pkl"
+
+# キャッシュDBパス（銘柄ごとに1行、SQLite WALで複数セッションから安全に読み書き）
+CACHE_FILE = "target_prices_cache.db"
 CACHE_VALIDITY_DAYS = 7
 
+log = perf.get_logger(__name__)
+
+
+def _init_cache(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS target_prices (
+            cache_key TEXT PRIMARY KEY,
+            ticker    TEXT NOT NULL,
+            data      BLOB NOT NULL,
+            cached_at TEXT NOT NULL
+        )
+    """)
+
 
 def load_cache():
-    """キャッシュを読み込む"""
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, "rb") as f:
-                return pickle.load(f)
-        except Exception:
-            return {}
-    return {}
-
-
-def save_cache(cache):
-    """キャッシュを保存する"""
+    """キャッシュ全体を読み込む（表示用）。{cache_key: {"data", "cached_at"}}"""
+    try:
+        with connect(CACHE_FILE) as conn:
+            _init_cache(conn)
+            rows = conn.execute("SELECT cache_key, data, cached_at FROM target_prices").fetchall()
+    except Exception:
+        return {}
+    return {
+        key: {"data": pickle.loads(data), "cached_at": datetime.fromisoformat(cached_at)}
+        for key, data, cached_at in rows
+    }
+
+
+def get_cache_entry(cache_key):
+    """1件のキャッシュを読み込む。なければNone"""
+    try:
+        with connect(CACHE_FILE) as conn:
+            _init_cache(conn)
+            row = conn.execute(
+                "SELECT data, cached_at FROM target_prices WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+    except Exception:
+        return None
+    if row is None:
+        return None
+    return {"data": pickle.loads(row[0]), "cached_at": datetime.fromisoformat(row[1])}
+
+
+def set_cache_entry(cache_key, ticker, data):
+    """1件のキャッシュを保存する（同じキーは置き換え）"""
     try:
-        with open(CACHE_FILE, "wb") as f:
-            pickle.dump(cache, f)
+        with connect(CACHE_FILE) as conn:
+            _init_cache(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO target_prices VALUES (?, ?, ?, ?)",
+                (cache_key, str(ticker), pickle.dumps(data), datetime.now().isoformat()),
+            )
     except Exception as e:
-        print(f"キャッシュ保存エラー: {e}")
+        log.warning(f"キャッシュ保存エラー: {e}")
 
 
 def is_cache_valid(cache_entry):
@@ -128,6 +165,7 @@ def get_default_targets(current_per, eps, current_price=None):
     return result
 
 
+@perf.timed("compute", "auto_per.estimate_ceiling")
 def estimate_realistic_per_ceiling(ticker, current_per, eps, current_price):
     """
     過去52週データから現実的なPER天井を自動推定
@@ -142,8 +180,7 @@ def estimate_realistic_per_ceiling(ticker, current_per, eps, current_price):
         dict: 推定された目標価格情報
     """
     try:
-        stock = yf.Ticker(f"{ticker}.T")
-        hist = stock.history(period="1y")
+        hist = get_history(f"{ticker}.T", period="1y")
 
         if hist.empty or eps == 0:
             return get_default_targets(current_per, eps, current_price)
@@ -194,7 +231,7 @@ def estimate_realistic_per_ceiling(ticker, current_per, eps, current_price):
         }
 
     except Exception as e:
-        print(f"PER推定エラー ({ticker}): {e}")
+        log.warning(f"PER推定エラー ({ticker}): {e}")
         return get_default_targets(current_per, eps, current_price)
 
 
@@ -224,21 +261,18 @@ def get_target_prices_auto(ticker, current_price, current_per, eps, stock_name="
             'estimation_method': str,
         }
     """
-    cache = load_cache() if use_cache else {}
     cache_key = f"{ticker}_{int(eps)}"
+    cached = get_cache_entry(cache_key) if use_cache else None
 
     # キャッシュ確認
-    if cache_key in cache and is_cache_valid(cache.get(cache_key, {})):
-        cached = cache[cache_key]
+    if use_cache:
+        perf.cache_event("target_prices", hit=bool(cached and is_cache_valid(cached)))
+    if cached and is_cache_valid(cached):
         estimated = cached.get("data", {})
     else:
         # 新規推定
         estimated = estimate_realistic_per_ceiling(ticker, current_per, eps, current_price)
-        cache[cache_key] = {
-            "data": estimated,
-            "cached_at": datetime.now(),
-        }
-        save_cache(cache)
+        set_cache_entry(cache_key, ticker, estimated)
 
     # 結果を整形
     result = {
@@ -288,17 +322,20 @@ def get_target_prices_auto(ticker, current_price, current_per, eps, stock_name="
 
 def clear_cache(ticker=None):
     """キャッシュをクリアする。ticker指定で個別削除、Noneで全削除"""
+    try:
+        with connect(CACHE_FILE) as conn:
+            _init_cache(conn)
+            if ticker is None:
+                conn.execute("DELETE FROM target_prices")
+            else:
+                conn.execute("DELETE FROM target_prices WHERE ticker = ?", (str(ticker),))
+    except Exception as e:
+        log.warning(f"キャッシュ削除エラー: {e}")
+        return
     if ticker is None:
-        if os.path.exists(CACHE_FILE):
-            os.remove(CACHE_FILE)
-            print("キャッシュを全削除しました")
+        log.info("キャッシュを全削除しました")
     else:
-        cache = load_cache()
-        keys_to_delete = [k for k in cache.keys() if k.startswith(f"{ticker}_")]
-        for k in keys_to_delete:
-            del cache[k]
-        save_cache(cache)
-        print(f"{ticker} のキャッシュを削除しました")
+        log.info(f"{ticker} のキャッシュを削除しました")
 
 
 if __name__ == "__main__":
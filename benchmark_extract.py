@@ -0,0 +1,114 @@
+"""
+================================================
+HTML 抽出ベンチマーク（オフライン）
+================================================
+機能:
+  - fixtures/html/ に保存したページで html_extract の抽出結果と速度を確認
+  - 従来の BeautifulSoup 全体解析と比較
+  - --save で実際のページを取得してフィクスチャに追加
+
+フィクスチャ:
+  fixtures/html/<取得元>/<名前>.html
+  fixtures/html/expected.json   {"<取得元>/<名前>.html": 期待値, ...}
+
+使い方:
+  python benchmark_extract.py                 # 全フィクスチャで計測
+  python benchmark_extract.py --repeat 200
+  python benchmark_extract.py --save          # 現在のページを保存（期待値は目視で確認）
+================================================
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import html_extract
+
+FIXTURE_DIR = os.path.join("fixtures", "html")
+EXPECTED_FILE = os.path.join(FIXTURE_DIR, "expected.json")
+
+# --save で取得するページ
+LIVE_PAGES = {
+    "yahoo_fund": "https://finance.yahoo.co.jp/quote/04311181",
+    "toushin": "https://toushin-lib.fwg.ne.jp/FdsWeb/FDST030000?isinCd=JP90C000K379",
+    "multpl": "https://www.multpl.com/shiller-pe",
+}
+
+
+def _load_expected():
+    if not os.path.exists(EXPECTED_FILE):
+        return {}
+    with open(EXPECTED_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _timed(func, page, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        value = func(page)
+    return value, (time.perf_counter() - started) / repeat * 1000
+
+
+def run(repeat=50):
+    """全フィクスチャで抽出結果と1回あたりの時間（ms）を比較"""
+    expected = _load_expected()
+    failures = 0
+    print(f"{'フィクスチャ':<34}{'期待値':>10}{'抽出値':>10}  {'方法':<30}{'高速(ms)':>10}{'soup(ms)':>10}")
+    for key in sorted(expected):
+        source = key.split("/")[0]
+        with open(os.path.join(FIXTURE_DIR, key), encoding="utf-8") as f:
+            page = f.read()
+
+        html_extract._last_success.pop(source, None)
+        (value, strategy), fast_ms = _timed(lambda p: html_extract.extract(source, p), page, repeat)
+        soup = dict(html_extract.SOURCES[source])["soup"]
+        soup_value, soup_ms = _timed(soup, page, repeat)
+
+        ok = value == expected[key] and soup_value == expected[key]
+        failures += not ok
+        mark = "" if ok else "  ❌"
+        print(f"{key:<36}{expected[key]:>10}{str(value):>10}  {str(strategy):<30}"
+              f"{fast_ms:>10.3f}{soup_ms:>10.3f}{mark}")
+
+    print(f"\n{len(expected)} 件中 {failures} 件不一致")
+    return failures
+
+
+def save_live_pages():
+    """現在のページを取得してフィクスチャに追加（期待値は抽出結果を仮登録）"""
+    import requests
+    from fang_manager import REQUEST_HEADERS
+
+    expected = _load_expected()
+    stamp = datetime.now().strftime("%Y%m%d")
+    for source, url in LIVE_PAGES.items():
+        try:
+            r = requests.get(url, headers=REQUEST_HEADERS, timeout=15)
+            r.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"❌ {source}: {e}")
+            continue
+        key = f"{source}/{stamp}.html"
+        os.makedirs(os.path.join(FIXTURE_DIR, source), exist_ok=True)
+        with open(os.path.join(FIXTURE_DIR, key), "w", encoding="utf-8") as f:
+            f.write(r.text)
+        value, strategy = html_extract.extract(source, r.text)
+        expected[key] = value
+        print(f"✅ {key}: {value}（{strategy}）← ブラウザの表示と一致するか確認してください")
+
+    with open(EXPECTED_FILE, "w", encoding="utf-8") as f:
+        json.dump(expected, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTML 抽出ベンチマーク")
+    parser.add_argument("--repeat", type=int, default=50, help="1ページあたりの計測回数")
+    parser.add_argument("--save", action="store_true", help="実際のページを取得してフィクスチャに追加")
+    args = parser.parse_args()
+
+    if args.save:
+        save_live_pages()
+    else:
+        raise SystemExit(1 if run(args.repeat) else 0)
@@ -3,9 +3,9 @@
 シクリカル株購入・売却記録管理モジュール（gspread版）
 ================================================
 機能:
-  - Google Sheetsへの購入記録追加（永続保存）
+  - 購入記録をローカル台帳（ledger_store）に追加し、Google Sheetsへ自動同期
   - 売却記録追加
-  - 購入履歴取得
+  - 購入履歴取得（ローカル台帳から即座に読み込み）
 
 Streamlit Secretsに以下が必要:
   [gcp_service_account]
@@ -21,48 +21,31 @@ Streamlit Secretsに以下が必要:
 
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 
-SCOPES = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive",
-]
+import ledger_store
+import perf
+from sheets_client import get_client
 
-SPREADSHEET_ID = "1-ioGOVA9KUKYqOTuDo9s8jP1O_XTiOJLQNgnf3D08n8"
 PURCHASE_SHEET_NAME = "purchased_stocks"
+PURCHASE_COLUMNS = ["購入日", "銘柄コード", "企業名", "購入単価", "購入株数", "投資金額", "メモ"]
+
+log = perf.get_logger(__name__)
+
+ledger_store.register(PURCHASE_SHEET_NAME, PURCHASE_COLUMNS, cols=8)
 
 
 def get_gspread_client():
-    """Streamlit Secretsからgspreadクライアントを取得。失敗時はNone。"""
-    try:
-        creds = Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"],
-            scopes=SCOPES,
-        )
-        return gspread.authorize(creds)
-    except Exception:
-        return None
+    """共有gspreadクライアントを取得（sheets_client）。失敗時はNone。"""
+    return get_client()
 
 
 def get_purchase_history() -> pd.DataFrame:
-    """購入履歴をGoogle Sheetsから取得"""
-    client = get_gspread_client()
-    if client is None:
-        return pd.DataFrame(
-            columns=["購入日", "銘柄コード", "企業名", "購入単価", "購入株数", "投資金額", "メモ"]
-        )
+    """購入履歴をローカル台帳から取得（Google Sheetsとはバックグラウンドで同期）"""
     try:
-        sh = client.open_by_key(SPREADSHEET_ID)
-        ws = sh.worksheet(PURCHASE_SHEET_NAME)
-        data = ws.get_all_records()
-        return pd.DataFrame(data) if data else pd.DataFrame(
-            columns=["購入日", "銘柄コード", "企業名", "購入単価", "購入株数", "投資金額", "メモ"]
-        )
-    except Exception:
-        return pd.DataFrame(
-            columns=["購入日", "銘柄コード", "企業名", "購入単価", "購入株数", "投資金額", "メモ"]
-        )
+        return ledger_store.read_ledger(PURCHASE_SHEET_NAME)
+    except Exception as e:
+        log.warning(f"購入履歴の読み込みエラー: {e}")
+        return pd.DataFrame(columns=PURCHASE_COLUMNS)
 
 
 def add_cyclical_purchase(
@@ -73,19 +56,10 @@ def add_cyclical_purchase(
     shares: int,
     memo: str = "",
 ) -> bool:
-    """購入記録をGoogle Sheetsに追加。成功時True。"""
-    client = get_gspread_client()
-    if client is None:
-        return False
+    """購入記録をローカル台帳に追加（Google Sheetsへは同期スレッドが反映）。成功時True。"""
     try:
-        sh = client.open_by_key(SPREADSHEET_ID)
-        try:
-            ws = sh.worksheet(PURCHASE_SHEET_NAME)
-        except gspread.WorksheetNotFound:
-            ws = sh.add_worksheet(title=PURCHASE_SHEET_NAME, rows=1000, cols=8)
-            ws.append_row(["購入日", "銘柄コード", "企業名", "購入単価", "購入株数", "投資金額", "メモ"])
         investment = int(purchase_price * shares)
-        ws.append_row([
+        ledger_store.append_record(PURCHASE_SHEET_NAME, dict(zip(PURCHASE_COLUMNS, [
             purchase_date,
             str(ticker_code),
             company_name,
@@ -93,25 +67,17 @@ def add_cyclical_purchase(
             int(shares),
             investment,
             memo,
-        ])
+        ])))
         return True
     except Exception as e:
-        st.error(f"Google Sheets書き込みエラー: {e}")
+        st.error(f"購入記録の保存エラー: {e}")
         return False
 
 
 def delete_last_purchase() -> bool:
     """最後の購入記録を削除（誤入力訂正用）。成功時True。"""
-    client = get_gspread_client()
-    if client is None:
-        return False
     try:
-        sh = client.open_by_key(SPREADSHEET_ID)
-        ws = sh.worksheet(PURCHASE_SHEET_NAME)
-        all_values = ws.get_all_values()
-        if len(all_values) <= 1:
-            return False
-        ws.delete_rows(len(all_values))
-        return True
-    except Exception:
+        return ledger_store.delete_last_record(PURCHASE_SHEET_NAME)
+    except Exception as e:
+        log.warning(f"購入記録の削除エラー: {e}")
         return False
@@ -3,8 +3,8 @@
 FANG+ 管理モジュール
 ================================================
 機能:
-  1. Yahoo!ファイナンスから基準価額を自動取得
-  2. fang_purchases.csv で購入履歴を管理
+  1. Yahoo!ファイナンス・投資信託協会から基準価額を自動取得（速い方を採用）
+  2. 購入履歴をローカル台帳で管理（Google Sheets fang_purchases へ自動同期）
   3. 加重平均取得単価を自動計算
 
 iFreeNEXT FANG+インデックス
@@ -13,152 +13,179 @@ iFreeNEXT FANG+インデックス
 ================================================
 """
 
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import os
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+import http_client
+import ledger_store
+import perf
+from html_extract import extract
+
 # ================================================
 # 設定
 # ================================================
 
 FANG_FUND_CODE = "04311181"  # iFreeNEXT FANG+インデックス
 
-SPREADSHEET_ID = "1-ioGOVA9KUKYqOTuDo9s8jP1O_XTiOJLQNgnf3D08n8"
 FANG_SHEET_NAME = "fang_purchases"
 
-SCOPES = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive",
-]
-
 COLUMNS = ["購入日", "投資額", "取得単価", "口数", "メモ"]
 
 
-def _get_gspread_client():
-    """Streamlit Secretsからgspreadクライアントを取得。失敗時はNone。"""
+ledger_store.register(FANG_SHEET_NAME, COLUMNS, cols=6)
+
+log = perf.get_logger(__name__)
+
+
+# ================================================
+# 1. 基準価額を取得（Yahoo!ファイナンス / 投資信託協会を同時に問い合わせ）
+# ================================================
+
+REQUEST_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "ja,en-US;q=0.9,en;q=0.8",
+}
+
+YAHOO_FUND_URL = f"https://finance.yahoo.co.jp/quote/{FANG_FUND_CODE}"
+TOUSHIN_URL = "https://toushin-lib.fwg.ne.jp/FdsWeb/FDST030000?isinCd=JP90C000K379"
+
+
+def _fetch_nav(url: str, source: str, label: str, debug: bool = False) -> float:
+    """ページを取得し html_extract で基準価額を取り出す。失敗時は 0.0"""
+    import requests
+
     try:
-        import streamlit as st
-        import gspread
-        from google.oauth2.service_account import Credentials
-        creds = Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"], scopes=SCOPES
+        val = http_client.get_parsed(
+            url, lambda page: extract(source, page)[0], headers=REQUEST_HEADERS, timeout=15
         )
-        return gspread.authorize(creds)
-    except Exception:
-        return None
+        if val is not None:
+            if debug:
+                log.info(f"{label}で取得: {val:,.0f}円")
+            return val
+        log.info(f"{label}: 基準価額を取り出せませんでした")
+    except requests.exceptions.RequestException as e:
+        log.info(f"{label}エラー: {e}")
+    return 0.0
 
 
-def _get_or_create_sheet(client):
-    """fang_purchasesシートを取得（なければ作成）"""
-    import gspread
-    sh = client.open_by_key(SPREADSHEET_ID)
-    try:
-        return sh.worksheet(FANG_SHEET_NAME)
-    except gspread.WorksheetNotFound:
-        ws = sh.add_worksheet(title=FANG_SHEET_NAME, rows=1000, cols=6)
-        ws.append_row(COLUMNS)
-        return ws
+def _fetch_yahoo(debug: bool = False) -> float:
+    """方法1: Yahoo!ファイナンスの投資信託ページ。失敗時は 0.0"""
+    return _fetch_nav(YAHOO_FUND_URL, "yahoo_fund", "Yahoo!ファイナンス", debug)
 
 
-# ================================================
-# 1. Yahoo!ファイナンスから基準価額を取得
-# ================================================
+def _fetch_toushin(debug: bool = False) -> float:
+    """方法2: 投資信託協会。失敗時は 0.0"""
+    return _fetch_nav(TOUSHIN_URL, "toushin", "投資信託協会", debug)
+
+
+NAV_SOURCES = {
+    "yahoo": _fetch_yahoo,
+    "toushin": _fetch_toushin,
+}
+
+
+def _race_sources(debug: bool, hedged: bool):
+    """取得元を問い合わせ、(採用した取得元, 基準価額) を返す。失敗時は (None, 0.0)"""
+    if not hedged:
+        for source, fetch in NAV_SOURCES.items():
+            val = fetch(debug)
+            if val > 0:
+                return source, val
+        return None, 0.0
 
-def get_fang_current_price(debug: bool = False) -> float:
+    executor = ThreadPoolExecutor(max_workers=len(NAV_SOURCES))
+    futures = {
+        executor.submit(perf.in_render(fetch), debug): source
+        for source, fetch in NAV_SOURCES.items()
+    }
+    try:
+        for future in as_completed(futures):
+            try:
+                val = future.result()
+            except Exception as e:
+                log.info(f"{futures[future]} エラー: {e}")
+                continue
+            if val > 0:
+                return futures[future], val
+    finally:
+        # 負けた側の完了は待たない（未開始なら取り消し、実行中ならタイムアウトまで裏で続く）
+        executor.shutdown(wait=False, cancel_futures=True)
+    return None, 0.0
+
+
+def fetch_fang_nav(debug: bool = False, hedged: bool = True) -> dict:
     """
-    Yahoo!ファイナンスから iFreeNEXT FANG+ の現在基準価額を取得。
-    失敗時は 0.0 を返す。
+    iFreeNEXT FANG+ の現在基準価額を取得し、採用した取得元と所要時間も返す
+
+    hedged=True なら Yahoo!ファイナンスと投資信託協会に同時に問い合わせ、
+    範囲内の値を最初に返した方を採用する。遅い方の結果は待たずに返すが、
+    実行中のリクエストは止められないため、そのスレッドはタイムアウト（15秒）
+    までに終わるまで裏で動き続ける。
+    hedged=False なら従来どおり Yahoo → 投資信託協会の順に試す。
+
+    採用した取得元と所要時間は perf に fetch / fang_nav として記録する（perf.log・計測パネル）。
+
+    Returns:
+        dict: {"source": 採用した取得元（失敗時 None）, "price": 基準価額（失敗時 0.0）,
+               "elapsed": 所要秒数}
     """
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        ),
-        "Accept-Language": "ja,en-US;q=0.9,en;q=0.8",
-    }
+    started = time.perf_counter()
+    with perf.timed("fetch", "fang_nav", hedged=hedged) as timer:
+        source, price = _race_sources(debug, hedged)
+        timer.set(source=source)
+    elapsed = time.perf_counter() - started
 
-    # 方法1: 投資信託ページ
-    url1 = f"https://finance.yahoo.co.jp/quote/{FANG_FUND_CODE}"
-    try:
-        r1 = requests.get(url1, headers=headers, timeout=15)
-        r1.raise_for_status()
-        soup1 = BeautifulSoup(r1.text, "html.parser")
-
-        # クラス名で価格要素を探す
-        for cls in ["_3rXWJKZF", "PriceBoard__price__1V0k", "price"]:
-            el = soup1.find(class_=cls)
-            if el:
-                text = el.get_text(strip=True).replace(",", "").replace("円", "")
-                try:
-                    val = float(text)
-                    if 10000 <= val <= 500000:
-                        if debug:
-                            print(f"[DEBUG] クラス '{cls}' で取得: {val:,.0f}円")
-                        return val
-                except ValueError:
-                    pass
-
-        # フォールバック: テキスト全体から数値パターンで抽出
-        text_all = soup1.get_text()
-        matches = re.findall(r'(\d{2,3},\d{3})', text_all[:5000])
-        for m in matches:
-            val = float(m.replace(",", ""))
-            if 10000 <= val <= 500000:
-                if debug:
-                    print(f"[DEBUG] テキスト抽出で取得: {val:,.0f}円")
-                return val
+    if source is None:
+        log.warning("FANG+基準価額: 全ての方法で取得失敗")
+    elif debug:
+        log.info(f"{source} が {elapsed:.2f}秒で先着: {price:,.0f}円")
+    return {"source": source, "price": price, "elapsed": elapsed}
 
-    except requests.exceptions.RequestException as e:
-        if debug:
-            print(f"[DEBUG] 方法1エラー: {e}")
 
-    # 方法2: 投資信託協会
-    url2 = "https://toushin-lib.fwg.ne.jp/FdsWeb/FDST030000?isinCd=JP90C000K379"
-    try:
-        r2 = requests.get(url2, headers=headers, timeout=15)
-        r2.raise_for_status()
-        soup2 = BeautifulSoup(r2.text, "html.parser")
-        text2 = soup2.get_text()
-        candidates = re.findall(r'\b(\d{2,3},\d{3})\b', text2[:3000])
-        for c in candidates:
-            val = float(c.replace(",", ""))
-            if 10000 <= val <= 500000:
-                if debug:
-                    print(f"[DEBUG] 投資信託協会で取得: {val:,.0f}円")
-                return val
-    except requests.exceptions.RequestException as e:
-        if debug:
-            print(f"[DEBUG] 方法2エラー: {e}")
+def get_fang_current_price(debug: bool = False, hedged: bool = True) -> float:
+    """iFreeNEXT FANG+ の現在基準価額（fetch_fang_nav の price）。失敗時は 0.0 を返す。"""
+    return fetch_fang_nav(debug, hedged)["price"]
 
-    if debug:
-        print("[DEBUG] 全ての方法で取得失敗")
-    return 0.0
+
+def get_fang_nav(force: bool = False, debug: bool = False) -> float:
+    """
+    基準価額を返す（nav_store に日次で蓄積）
+
+    次の基準価額の公表予定時刻までは保存済みの値を返し、取得元にアクセスしない。
+    失敗時は保存済みの最新値、なければ 0.0。
+    """
+    from nav_store import get_latest_nav
+    return get_latest_nav(FANG_FUND_CODE, lambda: get_fang_current_price(debug=debug), force=force)
+
+
+def get_fang_nav_history(start=None, end=None) -> pd.Series:
+    """蓄積した基準価額の履歴（index=日付）。評価額推移のチャート用"""
+    from nav_store import get_nav_history
+    return get_nav_history(FANG_FUND_CODE, start=start, end=end)
 
 
 # ================================================
-# 2. 購入履歴 Google Sheets 管理
+# 2. 購入履歴 管理（ローカル台帳 + Google Sheets 同期）
 # ================================================
 
 def load_fang_purchases(csv_path: str = "") -> pd.DataFrame:
-    """購入履歴をGoogle Sheetsから取得。失敗時は空DataFrame。"""
-    client = _get_gspread_client()
-    if client is None:
-        return pd.DataFrame(columns=COLUMNS)
+    """購入履歴をローカル台帳から取得（Google Sheetsとはバックグラウンドで同期）。失敗時は空DataFrame。"""
     try:
-        ws = _get_or_create_sheet(client)
-        data = ws.get_all_records()
-        if data:
-            df = pd.DataFrame(data)
+        df = ledger_store.read_ledger(FANG_SHEET_NAME)
+        if not df.empty:
             for col in COLUMNS:
                 if col not in df.columns:
                     df[col] = ""
             return df[COLUMNS]
-    except Exception:
-        pass
+    except Exception as e:
+        log.warning(f"FANG+購入履歴の読み込みエラー: {e}")
     return pd.DataFrame(columns=COLUMNS)
 
 
@@ -169,24 +196,18 @@ def add_fang_purchase(
     memo: str = "",
     csv_path: str = "",
 ) -> pd.DataFrame:
-    """購入履歴をGoogle Sheetsに追加。"""
+    """購入履歴をローカル台帳に追加（Google Sheetsへは同期スレッドが反映）。"""
     import streamlit as st
-    client = _get_gspread_client()
-    if client is None:
-        st.error("FANG+保存失敗: gspread認証エラー。Secretsの gcp_service_account を確認してください。")
-        return pd.DataFrame(columns=COLUMNS)
     try:
-        ws = _get_or_create_sheet(client)
         units = round(amount / unit_price, 6) if unit_price > 0 else 0.0
-        row = [
+        ledger_store.append_record(FANG_SHEET_NAME, dict(zip(COLUMNS, [
             str(purchase_date),
             int(amount),
             int(unit_price),
             units,
             str(memo),
-        ]
-        ws.append_row(row)
-        st.success(f"✅ Google Sheetsに保存しました（{purchase_date} / ¥{int(amount):,} / 単価{int(unit_price):,}）")
+        ])))
+        st.success(f"✅ 保存しました（{purchase_date} / ¥{int(amount):,} / 単価{int(unit_price):,}）Google Sheetsへは自動で同期されます")
     except Exception as e:
         st.error(f"FANG+記録の保存失敗: {type(e).__name__}: {e}")
         import traceback
@@ -196,17 +217,10 @@ def add_fang_purchase(
 
 def delete_last_fang_purchase() -> bool:
     """最後のFANG+購入記録を削除。成功時True。"""
-    client = _get_gspread_client()
-    if client is None:
-        return False
     try:
-        ws = _get_or_create_sheet(client)
-        all_values = ws.get_all_values()
-        if len(all_values) <= 1:
-            return False
-        ws.delete_rows(len(all_values))
-        return True
-    except Exception:
+        return ledger_store.delete_last_record(FANG_SHEET_NAME)
+    except Exception as e:
+        log.warning(f"FANG+購入記録の削除エラー: {e}")
         return False
 
 
@@ -265,7 +279,7 @@ def calc_fang_summary(
         price        = current_price
         price_source = "手動入力"
     else:
-        price        = get_fang_current_price()
+        price        = get_fang_nav()
         price_source = "自動取得" if price > 0 else "取得失敗"
 
     if price > 0:
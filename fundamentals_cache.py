@@ -0,0 +1,126 @@
+"""
+================================================
+財務データキャッシュ（有効期限クラス別）
+================================================
+機能: 銘柄の財務データを更新頻度ごとに分けてローカルSQLiteに保存
+
+有効期限クラス:
+  quote      : 現在株価                  → QUOTE_TTL_MINUTES 分
+  ratios     : PER・PBR・ROE・52週高安など → RATIOS_TTL_HOURS 時間
+  statements : 貸借対照表・損益計算書      → 次回決算の反映予定日まで
+
+使い方:
+  from fundamentals_cache import get_cached
+
+  quote = get_cached("9127", "quote", lambda: {"currentPrice": ...})
+================================================
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import perf
+from local_store import connect
+
+# 保存先
+FUNDAMENTALS_DB = "fundamentals_cache.db"
+
+QUOTE_TTL_MINUTES = 15
+RATIOS_TTL_HOURS = 24
+
+# 決算期末から年次決算データが反映されるまでの目安日数
+FILING_LAG_DAYS = 75
+# 反映予定日を過ぎても新しい決算が出ていない場合の再確認間隔
+STATEMENTS_RECHECK_HOURS = 24
+
+
+def _init_db(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fundamentals (
+            ticker     TEXT NOT NULL,
+            kind       TEXT NOT NULL,
+            payload    TEXT NOT NULL,
+            fetched_at TEXT NOT NULL,
+            expires_at TEXT NOT NULL,
+            PRIMARY KEY (ticker, kind)
+        )
+    """)
+
+
+def next_statement_due(period_end, now=None):
+    """
+    次の年次決算が取得できるようになる予定日時
+
+    Args:
+        period_end: 最新決算の期末日（'YYYY-MM-DD'）。不明ならNone
+    """
+    now = now or datetime.now()
+    recheck = now + timedelta(hours=STATEMENTS_RECHECK_HOURS)
+    if not period_end:
+        return recheck
+    due = datetime.fromisoformat(period_end) + timedelta(days=365 + FILING_LAG_DAYS)
+    return due if due > now else recheck
+
+
+def expires_at(kind, payload, now=None):
+    """有効期限クラスごとの期限を計算"""
+    now = now or datetime.now()
+    if kind == "quote":
+        return now + timedelta(minutes=QUOTE_TTL_MINUTES)
+    if kind == "ratios":
+        return now + timedelta(hours=RATIOS_TTL_HOURS)
+    if kind == "statements":
+        return next_statement_due(payload.get("period_end"), now)
+    raise ValueError(f"未対応の有効期限クラス: {kind}")
+
+
+def get_cached(ticker, kind, fetch):
+    """
+    有効期限内ならキャッシュを返し、期限切れ・未保存なら fetch() の結果を保存して返す
+
+    Args:
+        ticker: 銘柄コード（例: "9127"）
+        kind: 'quote' / 'ratios' / 'statements'
+        fetch: 取得関数（JSON化できる dict を返す）。例外はそのまま呼び出し元へ
+    """
+    now = datetime.now()
+    with connect(FUNDAMENTALS_DB) as conn:
+        _init_db(conn)
+        row = conn.execute(
+            "SELECT payload FROM fundamentals WHERE ticker = ? AND kind = ? AND expires_at > ?",
+            (str(ticker), kind, now.isoformat()),
+        ).fetchone()
+    perf.cache_event(f"fundamentals.{kind}", hit=row is not None)
+    if row:
+        return json.loads(row[0])
+
+    with perf.timed("fetch", f"fundamentals.{kind}", ticker=str(ticker)):
+        payload = fetch()
+    with connect(FUNDAMENTALS_DB) as conn:
+        _init_db(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO fundamentals VALUES (?, ?, ?, ?, ?)",
+            (
+                str(ticker),
+                kind,
+                json.dumps(payload),
+                now.isoformat(),
+                expires_at(kind, payload, now).isoformat(),
+            ),
+        )
+    return payload
+
+
+def invalidate(ticker=None, kind=None):
+    """キャッシュを削除する。ticker / kind 指定で絞り込み、両方Noneで全削除"""
+    query = "DELETE FROM fundamentals WHERE 1 = 1"
+    params = []
+    if ticker is not None:
+        query += " AND ticker = ?"
+        params.append(str(ticker))
+    if kind is not None:
+        query += " AND kind = ?"
+        params.append(kind)
+    with connect(FUNDAMENTALS_DB) as conn:
+        _init_db(conn)
+        conn.execute(query, params)
@@ -0,0 +1,277 @@
+"""
+================================================
+株価履歴ストア（OHLCV）
+================================================
+機能:
+  - 日足OHLCVをローカルSQLiteに保存（銘柄×日付のロング形式）
+  - 前回同期以降に不足している日足だけを追加取得
+  - 分割・配当調整で過去の値が変わった銘柄は全期間を取り直す
+用途: timing_analyzer / auto_per_estimator / ダッシュボードで共有
+
+使い方:
+  from history_store import get_history, get_close_matrix
+
+  hist = get_history("9127.T", period="6mo")       # yf.Ticker().history() と同じ列
+  close = get_close_matrix(["9127.T", "1848.T"], period="5d")  # 日付×銘柄の終値
+================================================
+"""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import perf
+from local_store import connect
+from market_calendar import fresh_since, market_for
+
+log = perf.get_logger(__name__)
+
+# 保存先
+HISTORY_DB = "price_history.db"
+
+# 初回取得期間（最長の分析期間 1年 + 移動平均の助走分）
+INITIAL_PERIOD = "2y"
+
+# 立会中に同じ銘柄を再同期するまでの間隔（引け後は次の寄り付きまで再同期しない）
+SYNC_INTERVAL_MINUTES = 5
+
+# 再取得した確定済み日足がこの比率以上ずれていたら調整が入ったとみなす
+ADJUSTMENT_TOLERANCE = 0.005
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def _init_db(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ohlcv (
+            ticker TEXT NOT NULL,
+            date   TEXT NOT NULL,
+            open   REAL,
+            high   REAL,
+            low    REAL,
+            close  REAL,
+            volume REAL,
+            PRIMARY KEY (ticker, date)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            ticker    TEXT PRIMARY KEY,
+            synced_at TEXT NOT NULL
+        )
+    """)
+
+
+# ==========================================
+# 取得（Yahoo Finance）
+# ==========================================
+
+def _download(tickers, **kwargs):
+    """複数銘柄を一括ダウンロードし、銘柄 → OHLCV DataFrame の辞書を返す"""
+    import yfinance as yf  # 取得が必要なときだけ読み込む（読込に時間がかかるため）
+
+    with perf.timed("fetch", "yfinance.download", tickers=len(tickers), **kwargs):
+        data = yf.download(
+            list(tickers), progress=False, auto_adjust=True, threads=True, **kwargs
+        )
+    if data is None or data.empty:
+        return {}
+
+    frames = {}
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(1):
+                continue
+            frame = data.xs(ticker, axis=1, level=1)
+        else:
+            frame = data
+        frame = frame.reindex(columns=OHLCV_COLUMNS).dropna(subset=["Close"])
+        if not frame.empty:
+            frames[ticker] = frame
+    return frames
+
+
+def _store_frames(conn, frames):
+    for ticker, frame in frames.items():
+        dates = pd.DatetimeIndex(frame.index).strftime("%Y-%m-%d")
+        conn.executemany(
+            "INSERT OR REPLACE INTO ohlcv VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (ticker, date, *(None if pd.isna(v) else float(v) for v in values))
+                for date, values in zip(dates, frame[OHLCV_COLUMNS].itertuples(index=False))
+            ],
+        )
+
+
+# ==========================================
+# 同期
+# ==========================================
+
+def sync(tickers):
+    """
+    指定銘柄の日足を最新化する
+
+    - 未保存の銘柄: INITIAL_PERIOD 分をまとめて取得
+    - 保存済みの銘柄: 直近2本から再取得し、不足分を追加
+      （直近1本は場中の途中値の可能性があるため上書き、
+        その前の確定足がずれていれば分割・配当調整とみなして全期間を取り直す）
+    - 取得できなかった銘柄は同期済みにしない（次回の呼び出しで再取得）
+
+    Returns:
+        list: 取得・保存できなかった銘柄（すべて最新なら空）
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return []
+
+    now = datetime.now()
+    # 市場ごとの鮮度の基準（立会中は SYNC_INTERVAL_MINUTES、引け後は確定値を1回取れば次の寄り付きまで不要）
+    interval = timedelta(minutes=SYNC_INTERVAL_MINUTES)
+    thresholds = {
+        market: fresh_since(market, interval).astimezone().replace(tzinfo=None).isoformat()
+        for market in {market_for(t) for t in tickers}
+    }
+
+    with connect(HISTORY_DB) as conn:
+        _init_db(conn)
+        placeholders = ",".join("?" * len(tickers))
+        fresh = {
+            ticker for ticker, synced_at in conn.execute(
+                f"SELECT ticker, synced_at FROM sync_state WHERE ticker IN ({placeholders})",
+                tickers,
+            )
+            if synced_at >= thresholds[market_for(ticker)]
+        }
+        # 銘柄ごとの直近2本（新しい順）
+        tails = {}
+        for ticker, date, close in conn.execute(f"""
+            SELECT ticker, date, close FROM (
+                SELECT ticker, date, close,
+                       ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS rn
+                FROM ohlcv WHERE ticker IN ({placeholders})
+            ) WHERE rn <= 2 ORDER BY ticker, date DESC
+        """, tickers):
+            tails.setdefault(ticker, []).append((date, close))
+
+    stale = [t for t in tickers if t not in fresh]
+    for ticker in tickers:
+        perf.cache_event("price_history", hit=ticker in fresh)
+    if not stale:
+        return []
+
+    new = [t for t in stale if len(tails.get(t, [])) < 2]
+    existing = [t for t in stale if t not in new]
+
+    frames = {}
+    readjust = []
+    try:
+        if new:
+            frames.update(_download(new, period=INITIAL_PERIOD))
+        if existing:
+            start = min(tails[t][1][0] for t in existing)
+            delta = _download(existing, start=start)
+
+            # 確定済みの足が変わっていれば調整済み系列として全期間取り直し
+            for ticker, frame in delta.items():
+                ref_date, ref_close = tails[ticker][1]
+                dates = pd.DatetimeIndex(frame.index).strftime("%Y-%m-%d")
+                refetched = frame["Close"][dates == ref_date]
+                if ref_close and len(refetched) > 0:
+                    if abs(float(refetched.iloc[0]) / ref_close - 1) > ADJUSTMENT_TOLERANCE:
+                        readjust.append(ticker)
+            for ticker in readjust:
+                del delta[ticker]
+            frames.update(delta)
+            if readjust:
+                frames.update(_download(readjust, period=INITIAL_PERIOD))
+    except Exception as e:
+        log.warning(f"株価履歴同期エラー: {e}")
+        return stale
+
+    with connect(HISTORY_DB) as conn:
+        _init_db(conn)
+        conn.executemany(
+            "DELETE FROM ohlcv WHERE ticker = ?",
+            [(ticker,) for ticker in readjust if ticker in frames],
+        )
+        _store_frames(conn, frames)
+        conn.executemany(
+            "INSERT OR REPLACE INTO sync_state VALUES (?, ?)",
+            [(ticker, now.isoformat()) for ticker in stale if ticker in frames],
+        )
+    return [ticker for ticker in stale if ticker not in frames]
+
+
+# ==========================================
+# 読み込み
+# ==========================================
+
+def _period_start(period, today=None):
+    """'6mo' / '1y' などの期間指定を開始日に変換（'5d' は営業日数なので None）"""
+    today = pd.Timestamp(today or datetime.now()).normalize()
+    if period.endswith("mo"):
+        return today - pd.DateOffset(months=int(period[:-2]))
+    if period.endswith("y"):
+        return today - pd.DateOffset(years=int(period[:-1]))
+    if period.endswith("d"):
+        return None
+    raise ValueError(f"未対応の期間指定: {period}")
+
+
+def _read_long(tickers, period):
+    start = _period_start(period)
+    placeholders = ",".join("?" * len(tickers))
+    query = (
+        f"SELECT ticker, date, open, high, low, close, volume FROM ohlcv "
+        f"WHERE ticker IN ({placeholders})"
+    )
+    params = list(tickers)
+    if start is not None:
+        query += " AND date >= ?"
+        params.append(start.strftime("%Y-%m-%d"))
+    query += " ORDER BY ticker, date"
+
+    with connect(HISTORY_DB) as conn:
+        _init_db(conn)
+        df = pd.read_sql_query(query, conn, params=params)
+
+    df.columns = ["ticker", "Date"] + OHLCV_COLUMNS
+    df["Date"] = pd.to_datetime(df["Date"])
+    if period.endswith("d"):
+        df = df.groupby("ticker", sort=False).tail(int(period[:-1]))
+    return df
+
+
+def get_history(ticker, period="6mo", refresh=True):
+    """
+    1銘柄の日足を返す（yf.Ticker(ticker).history(period=...) 相当）
+
+    Args:
+        ticker: ティッカー（例: "9127.T"）
+        period: "5d" / "6mo" / "1y" など
+        refresh: Trueなら読み込み前に不足分を同期
+
+    Returns:
+        DataFrame: index=Date, columns=[Open, High, Low, Close, Volume]
+    """
+    if refresh:
+        sync([ticker])
+    df = _read_long([ticker], period)
+    return df.drop(columns="ticker").set_index("Date")
+
+
+def get_close_matrix(tickers, period="6mo", refresh=True):
+    """
+    複数銘柄の終値を 日付×銘柄 の行列で返す
+
+    Returns:
+        DataFrame: index=Date, columns=ticker（データのない銘柄は全行NaN）
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if refresh:
+        sync(tickers)
+    if not tickers:
+        return pd.DataFrame()
+    df = _read_long(tickers, period)
+    matrix = df.pivot(index="Date", columns="ticker", values="Close")
+    return matrix.reindex(columns=tickers)
@@ -0,0 +1,231 @@
+"""
+================================================
+HTML 値抽出レイヤー（スクレイピング用）
+================================================
+機能:
+  - ページ全体をパースせず、目印（class / id）の位置から
+    必要な部分だけを切り出して数値を取り出す
+  - 取得元ごとに抽出方法（ストラテジー）を順に試し、
+    前回成功した方法を次回は最初に試す
+  - どの高速ストラテジーでも取れない場合は BeautifulSoup で
+    従来どおりページ全体を解析（最後の手段）
+
+取得元:
+  yahoo_fund : Yahoo!ファイナンス 投資信託ページ（基準価額）
+  toushin    : 投資信託協会 ファンド詳細ページ（基準価額）
+  multpl     : multpl.com シラーPER
+
+使い方:
+  from html_extract import extract
+
+  value, strategy = extract("yahoo_fund", response.text)
+
+ベンチマーク:
+  python benchmark_extract.py   # fixtures/html/ の保存済みページで速度と正しさを確認
+================================================
+"""
+
+import html as html_lib
+import re
+
+import perf
+
+
+# 基準価額として妥当な範囲（円）
+NAV_MIN, NAV_MAX = 10000, 500000
+
+# 取得元 → [(ストラテジー名, 抽出関数), ...]（抽出関数は ページ文字列 → 数値 or None）
+SOURCES = {}
+
+# 取得元 → 前回成功したストラテジー名
+_last_success = {}
+
+_HIDDEN = re.compile(r"<(script|style)\b.*?</\1\s*>|<!--.*?-->", re.S | re.I)
+_TAG = re.compile(r"<[^>]+>")
+# 切り出し範囲の末尾で途切れたスクリプト・コメント・タグ
+_UNCLOSED = re.compile(r"<(script|style)\b.*\Z|<!--.*\Z|<[^>]*\Z", re.S | re.I)
+
+
+# ==========================================
+# 抽出の部品
+# ==========================================
+
+def element_text(page, attr, value, window=2000):
+    """
+    attr="value" を持つ最初の要素のテキスト（strip済み）。見つからなければNone。
+
+    class は空白区切りのどれか1つと一致すればよい（BeautifulSoup の class_ と同じ）。
+    要素の開始タグから最初の閉じタグまでの範囲だけを見る。
+    """
+    if attr == "class":
+        pattern = rf'<(\w+)[^>]*\bclass=(["\'])(?:[^"\']*\s)?{re.escape(value)}(?:\s[^"\']*)?\2[^>]*>'
+    else:
+        pattern = rf'<(\w+)[^>]*\b{attr}=(["\']){re.escape(value)}\2[^>]*>'
+    match = re.search(pattern, page)
+    if not match:
+        return None
+    inner = page[match.end():match.end() + window]
+    close = inner.find(f"</{match.group(1)}")
+    if close >= 0:
+        inner = inner[:close]
+    return html_lib.unescape(_TAG.sub("", inner)).strip()
+
+
+def _strip(fragment):
+    fragment = _UNCLOSED.sub("", _HIDDEN.sub("", fragment))
+    return html_lib.unescape(_TAG.sub("", fragment))
+
+
+def visible_text(page, limit=None):
+    """
+    タグ・スクリプト・コメントを除いたテキスト（BeautifulSoup の get_text 相当）
+
+    limit 指定時は先頭 limit 文字が得られるまで、ページ先頭から
+    切り出す範囲を広げながら処理する（ページ全体は処理しない）。
+    """
+    if limit is None:
+        return _strip(page)
+    window = limit * 4
+    while True:
+        text = _strip(page[:window])
+        if len(text) >= limit or window >= len(page):
+            return text[:limit]
+        window *= 4
+
+
+def _in_range(value, lo, hi):
+    return value if lo <= value <= hi else None
+
+
+def class_number(cls, lo, hi):
+    """class の要素のテキスト全体を数値として読む（カンマ・円は除去）"""
+    def strategy(page):
+        text = element_text(page, "class", cls)
+        if not text:
+            return None
+        try:
+            return _in_range(float(text.replace(",", "").replace("円", "")), lo, hi)
+        except ValueError:
+            return None
+    return strategy
+
+
+def text_pattern(pattern, lo, hi, limit):
+    """ページ先頭 limit 文字のテキストから、範囲内の最初の一致を読む"""
+    regex = re.compile(pattern)
+
+    def strategy(page):
+        for m in regex.findall(visible_text(page, limit)):
+            value = _in_range(float(m.replace(",", "")), lo, hi)
+            if value is not None:
+                return value
+        return None
+    return strategy
+
+
+def element_pattern(attr, value, pattern):
+    """attr="value" の要素のテキストから最初の一致を読む"""
+    regex = re.compile(pattern)
+
+    def strategy(page):
+        text = element_text(page, attr, value)
+        match = regex.search(text) if text else None
+        return float(match.group()) if match else None
+    return strategy
+
+
+# ==========================================
+# 従来の BeautifulSoup 解析（最後の手段）
+# ==========================================
+
+def _soup(page):
+    from bs4 import BeautifulSoup  # フォールバック時のみ使うため遅延読込
+
+    return BeautifulSoup(page, "html.parser")
+
+
+def _soup_yahoo_fund(page):
+    soup = _soup(page)
+    for cls in ["_3rXWJKZF", "PriceBoard__price__1V0k", "price"]:
+        el = soup.find(class_=cls)
+        if el:
+            try:
+                value = float(el.get_text(strip=True).replace(",", "").replace("円", ""))
+                if NAV_MIN <= value <= NAV_MAX:
+                    return value
+            except ValueError:
+                pass
+    for m in re.findall(r'(\d{2,3},\d{3})', soup.get_text()[:5000]):
+        value = float(m.replace(",", ""))
+        if NAV_MIN <= value <= NAV_MAX:
+            return value
+    return None
+
+
+def _soup_toushin(page):
+    text = _soup(page).get_text()
+    for c in re.findall(r'\b(\d{2,3},\d{3})\b', text[:3000]):
+        value = float(c.replace(",", ""))
+        if NAV_MIN <= value <= NAV_MAX:
+            return value
+    return None
+
+
+def _soup_multpl(page):
+    el = _soup(page).find('div', id='current')
+    match = re.search(r'\d+\.\d+', el.get_text().strip()) if el else None
+    return float(match.group()) if match else None
+
+
+# ==========================================
+# 取得元の登録・抽出
+# ==========================================
+
+def register(source, strategies):
+    """取得元の抽出ストラテジーを登録（先頭から順に試す）"""
+    SOURCES[source] = list(strategies)
+    _last_success.pop(source, None)
+
+
+register("yahoo_fund", [
+    ("class:_3rXWJKZF", class_number("_3rXWJKZF", NAV_MIN, NAV_MAX)),
+    ("class:PriceBoard__price__1V0k", class_number("PriceBoard__price__1V0k", NAV_MIN, NAV_MAX)),
+    ("class:price", class_number("price", NAV_MIN, NAV_MAX)),
+    ("text", text_pattern(r'(\d{2,3},\d{3})', NAV_MIN, NAV_MAX, limit=5000)),
+    ("soup", _soup_yahoo_fund),
+])
+
+register("toushin", [
+    ("text", text_pattern(r'\b(\d{2,3},\d{3})\b', NAV_MIN, NAV_MAX, limit=3000)),
+    ("soup", _soup_toushin),
+])
+
+register("multpl", [
+    ("id:current", element_pattern("id", "current", r'\d+\.\d+')),
+    ("soup", _soup_multpl),
+])
+
+
+def extract(source, page):
+    """
+    ページから値を取り出す
+
+    Returns:
+        (値, 成功したストラテジー名)。どの方法でも取れなければ (None, None)
+    """
+    strategies = SOURCES[source]
+    last = _last_success.get(source)
+    if last:
+        strategies = sorted(strategies, key=lambda s: s[0] != last)
+
+    with perf.timed("scrape", f"html_extract.{source}", strategy=None) as timer:
+        for name, strategy in strategies:
+            try:
+                value = strategy(page)
+            except (ValueError, TypeError):
+                value = None
+            if value is not None:
+                _last_success[source] = name
+                timer.set(strategy=name)
+                return value, name
+    return None, None
@@ -0,0 +1,126 @@
+"""
+================================================
+スクレイピング用 共有HTTPクライアント
+================================================
+機能:
+  - プロセス内で1つの requests.Session を共有（keep-alive で接続を再利用）
+  - 取得先ホストごとに同時リクエスト数を制限
+  - 条件付きGET: 前回の ETag / Last-Modified を送り、
+    304 Not Modified なら前回解析した値をそのまま返す（本文の転送・解析なし）
+
+使い方:
+  from http_client import get_parsed
+
+  nav = get_parsed(url, lambda html: extract("yahoo_fund", html)[0], headers=HEADERS)
+================================================
+"""
+
+import json
+import threading
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import perf
+from local_store import connect
+
+# 条件付きGET用の保存先（ETag / Last-Modified と解析済みの値）
+HTTP_CACHE_DB = "http_cache.db"
+
+# ホストごとの同時リクエスト数・保持する接続数
+MAX_PER_HOST = 2
+POOL_MAXSIZE = 4
+
+_lock = threading.Lock()
+_session = None
+_host_slots = {}
+
+
+def _init_db(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS http_cache (
+            url           TEXT PRIMARY KEY,
+            etag          TEXT,
+            last_modified TEXT,
+            value         TEXT NOT NULL,
+            fetched_at    TEXT NOT NULL
+        )
+    """)
+
+
+def get_session():
+    """共有Session（接続プール付き）"""
+    global _session
+    with _lock:
+        if _session is None:
+            # requests は最初の通信時に読み込む
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_MAXSIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _host_slot(url):
+    host = urlsplit(url).netloc
+    with _lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MAX_PER_HOST)
+        return _host_slots[host]
+
+
+def get(url, headers=None, timeout=15):
+    """共有Sessionで GET（ホストごとの同時数制限つき）"""
+    with _host_slot(url), perf.timed("fetch", "http.get", host=urlsplit(url).netloc) as timer:
+        response = get_session().get(url, headers=headers, timeout=timeout)
+        timer.set(status=response.status_code)
+        return response
+
+
+def get_parsed(url, parse, headers=None, timeout=15):
+    """
+    ページを取得して parse(本文) の結果を返す
+
+    前回の応答に ETag / Last-Modified があれば条件付きで要求し、
+    304 なら前回の解析結果を返す。parse の結果が None なら保存しない。
+
+    Args:
+        parse: 本文（str）→ JSON化できる値 の関数
+    Raises:
+        requests.exceptions.RequestException: 通信エラー・HTTPエラー
+    """
+    with connect(HTTP_CACHE_DB) as conn:
+        _init_db(conn)
+        cached = conn.execute(
+            "SELECT etag, last_modified, value FROM http_cache WHERE url = ?", (url,)
+        ).fetchone()
+
+    request_headers = dict(headers or {})
+    if cached:
+        etag, last_modified, _ = cached
+        if etag:
+            request_headers["If-None-Match"] = etag
+        if last_modified:
+            request_headers["If-Modified-Since"] = last_modified
+
+    response = get(url, headers=request_headers, timeout=timeout)
+    perf.cache_event("http_conditional", hit=response.status_code == 304 and bool(cached))
+    if response.status_code == 304 and cached:
+        return json.loads(cached[2])
+    response.raise_for_status()
+
+    value = parse(response.text)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    with connect(HTTP_CACHE_DB) as conn:
+        _init_db(conn)
+        if value is not None and (etag or last_modified):
+            conn.execute(
+                "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(value), datetime.now().isoformat()),
+            )
+        elif cached:
+            conn.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+    return value
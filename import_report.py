@@ -0,0 +1,173 @@
+"""
+================================================
+起動時インポート時間レポート
+================================================
+機能:
+  - ダッシュボードが起動時に読み込むモジュールを、起動時と同じ順に
+    新しいPythonプロセスで import し、モジュールごとの追加時間（ms）を表示
+    （python -X importtime の出力を集計。先に読み込まれた依存は
+      後のモジュールの時間に含まれない）
+  - 遅延読込の対象（yfinance・plotly・gspread など）が
+    起動時に読み込まれていないかを確認
+  - --save / --compare で前回の計測と比較（起動時間の劣化の確認用）
+
+使い方:
+  python import_report.py                               # 計測して表示
+  python import_report.py --repeat 5                    # 5回計測して最小値
+  python import_report.py --save import_baseline.json   # 基準として保存
+  python import_report.py --compare import_baseline.json
+================================================
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# ダッシュボード起動時の import（unified_investment_dashboard.py の先頭と同じ順）
+STARTUP_MODULES = [
+    "streamlit",
+    "pandas",
+    "perf",
+    "snapshot_store",
+    "history_store",
+    "macro_snapshot",
+    "market_calendar",
+    "macro_valuation",
+    "portfolio_engine",
+    "auto_per_estimator",
+    "fang_manager",
+    "ledger_store",
+    "cyclical_purchase_manager",
+]
+
+# 起動時には読み込まず、使う機能の実行時に読み込むライブラリ
+LAZY_PACKAGES = ["yfinance", "plotly", "gspread", "google.auth", "google.oauth2", "bs4", "requests"]
+
+# 前回比でこの割合・時間を超えて遅くなったら劣化とみなす
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_MS = 20.0
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _run_importtime(modules):
+    """
+    1つの新しいプロセスで modules を順に import し、-X importtime の出力を返す
+
+    Returns:
+        [(深さ, モジュール名, 自身の時間us, 累積時間us), ...]（出力順 = 子が親より先）
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        cwd=REPO_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_part, cumulative_us, name = line.split("|", 2)
+        self_us = int(self_part.split(":")[1])
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), self_us, int(cumulative_us)))
+    return entries
+
+
+def measure(modules=STARTUP_MODULES):
+    """
+    モジュールごとの追加時間と、その import で読み込まれたモジュール
+
+    Returns:
+        dict: {モジュール名: {'ms': 追加時間, 'loaded': [読み込まれたモジュール名],
+                             'heaviest': [(直下の依存, ms), ...]}}
+              先に読み込み済みだったモジュールは ms=0
+    """
+    report = {name: {'ms': 0.0, 'loaded': [], 'heaviest': []} for name in modules}
+    pending = []
+    for depth, name, _, cumulative_us in _run_importtime(modules):
+        if depth > 0:
+            pending.append((depth, name, cumulative_us))
+            continue
+        if name in report:
+            report[name] = {
+                'ms': cumulative_us / 1000,
+                'loaded': [n for _, n, _ in pending],
+                'heaviest': sorted(
+                    ((n, us / 1000) for d, n, us in pending if d == 1),
+                    key=lambda item: -item[1],
+                )[:3],
+            }
+        pending = []
+    return report
+
+
+def lazy_violations(report):
+    """このリポジトリのモジュールが起動時に読み込んでしまった遅延読込対象 {モジュール: [パッケージ]}"""
+    violations = {}
+    for module, entry in report.items():
+        if not os.path.exists(os.path.join(REPO_DIR, f"{module}.py")):
+            continue  # streamlit / pandas 自体の依存は対象外
+        found = sorted({
+            package for package in LAZY_PACKAGES
+            for name in entry['loaded']
+            if name == package or name.startswith(package + ".")
+        })
+        if found:
+            violations[module] = found
+    return violations
+
+
+def run(repeat=1, compare=None):
+    """計測して表示。劣化・遅延読込の違反があれば False"""
+    reports = [measure() for _ in range(repeat)]
+    report = reports[0]
+    for name in report:
+        report[name]['ms'] = min(r[name]['ms'] for r in reports)
+    total = sum(entry['ms'] for entry in report.values())
+
+    baseline = {}
+    if compare:
+        with open(compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    ok = True
+    print(f"{'モジュール':<28}{'追加(ms)':>10}{'前回(ms)':>10}  主な依存")
+    for name, entry in report.items():
+        ms = entry['ms']
+        previous = baseline.get(name)
+        mark = ""
+        if previous is not None and ms > previous * REGRESSION_RATIO and ms - previous > REGRESSION_MIN_MS:
+            mark = "  ❌ 劣化"
+            ok = False
+        heaviest = ", ".join(f"{n} {t:.0f}" for n, t in entry['heaviest']) if ms else "（読込済み）"
+        previous_text = f"{previous:.1f}" if previous is not None else "-"
+        print(f"{name:<30}{ms:>10.1f}{previous_text:>10}  {heaviest}{mark}")
+    previous_total = baseline.get("_total")
+    print(f"\n合計: {total:.1f} ms" + (f"（前回 {previous_total:.1f} ms）" if previous_total else ""))
+
+    violations = lazy_violations(report)
+    for module, packages in violations.items():
+        print(f"❌ {module} が起動時に {', '.join(packages)} を読み込んでいます（使う関数の中で import してください）")
+    if not violations:
+        print(f"✅ 遅延読込の対象（{', '.join(LAZY_PACKAGES)}）は起動時に読み込まれていません")
+
+    return ok and not violations, {**{name: entry['ms'] for name, entry in report.items()}, "_total": total}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="起動時インポート時間レポート")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最小値を採用）")
+    parser.add_argument("--save", metavar="PATH", help="結果をJSONで保存（--compare の基準）")
+    parser.add_argument("--compare", metavar="PATH", help="保存済みの結果と比較")
+    args = parser.parse_args()
+
+    passed, result = run(args.repeat, args.compare)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"💾 {args.save} に保存しました")
+    raise SystemExit(0 if passed else 1)
@@ -0,0 +1,139 @@
+"""
+================================================
+テクニカル指標エンジン（複数銘柄一括）
+================================================
+機能: 日付×銘柄の終値行列から、全銘柄の指標をNumPyでまとめて計算
+  - RSI（単純移動平均版 / Wilder平滑化版）
+  - 移動平均（5日・25日・75日）
+  - トレンド判定（上昇 / 下降 / レンジ）
+
+使い方:
+  from history_store import get_close_matrix
+  from indicators import compute_indicators
+
+  close = get_close_matrix(["9127.T", "1848.T"], period="6mo")
+  ind = compute_indicators(close)
+  print(ind.loc["9127.T", "rsi"])
+================================================
+"""
+
+import numpy as np
+import pandas as pd
+
+RSI_PERIOD = 14
+MA_WINDOWS = (5, 25, 75)
+
+
+def _align_bottom(values):
+    """
+    各列の有効値を下詰めにする
+
+    上場前や欠損日のNaNを列ごとに除いた系列を、最新日が最終行に揃うよう並べる。
+    1銘柄ずつ dropna した Series に対する計算と同じ結果になる。
+    """
+    valid = ~np.isnan(values)
+    order = np.argsort(valid, axis=0, kind="stable")
+    return np.take_along_axis(values, order, axis=0), valid.sum(axis=0)
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def _rsi_sma(gain, loss, counts, period):
+    """直近 period 日の値上がり幅・値下がり幅の単純平均によるRSI"""
+    rsi = _rsi_from_averages(gain[-period:].mean(axis=0), loss[-period:].mean(axis=0))
+    rsi[counts < period + 1] = np.nan
+    return rsi
+
+
+def _rsi_wilder(gain, loss, counts, period):
+    """
+    Wilder平滑化によるRSI
+
+    最初の period 日を単純平均で初期化し、以降は
+    avg = (前日avg × (period-1) + 当日値) / period で更新する。
+    """
+    n_rows, n_cols = gain.shape
+    # 列ごとの初期化行（有効な前日比が period 本そろう行）
+    seed_row = (n_rows - (counts - 1)) + period - 1
+    has_seed = counts >= period + 1
+
+    zeros = np.zeros((1, n_cols))
+    gain_cum = np.vstack([zeros, np.cumsum(gain, axis=0)])
+    loss_cum = np.vstack([zeros, np.cumsum(loss, axis=0)])
+
+    avg_gain = np.full(n_cols, np.nan)
+    avg_loss = np.full(n_cols, np.nan)
+    if not has_seed.any():
+        return avg_gain
+
+    for t in range(int(seed_row[has_seed].min()), n_rows):
+        seeding = has_seed & (seed_row == t)
+        if seeding.any():
+            avg_gain[seeding] = (gain_cum[t + 1, seeding] - gain_cum[t + 1 - period, seeding]) / period
+            avg_loss[seeding] = (loss_cum[t + 1, seeding] - loss_cum[t + 1 - period, seeding]) / period
+        updating = has_seed & (seed_row < t)
+        avg_gain[updating] = (avg_gain[updating] * (period - 1) + gain[t, updating]) / period
+        avg_loss[updating] = (avg_loss[updating] * (period - 1) + loss[t, updating]) / period
+
+    return _rsi_from_averages(avg_gain, avg_loss)
+
+
+def compute_indicators(prices, rsi_period=RSI_PERIOD, ma_windows=MA_WINDOWS):
+    """
+    全銘柄のテクニカル指標を一括計算
+
+    Args:
+        prices: 終値の DataFrame（index=日付, columns=銘柄）
+        rsi_period: RSIの計算期間
+        ma_windows: 移動平均の日数（先頭3つを短期・中期・長期としてトレンド判定に使用）
+
+    Returns:
+        DataFrame: index=銘柄, columns=[
+            'days', 'current_price', 'rsi', 'rsi_wilder', 'ma_5', 'ma_25', 'ma_75', 'trend'
+        ]
+        データ不足の指標は欠損値、trend は 'up' / 'down' / 'range'（判定不能は欠損値）
+    """
+    values = prices.to_numpy(dtype=float)
+    if values.shape[0] == 0:
+        values = np.full((1, values.shape[1]), np.nan)
+    aligned, counts = _align_bottom(values)
+    n_rows = aligned.shape[0]
+
+    result = pd.DataFrame(index=prices.columns)
+    result['days'] = counts
+    result['current_price'] = aligned[-1]
+
+    # RSI
+    delta = np.diff(aligned, axis=0)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    if delta.shape[0] >= rsi_period:
+        result['rsi'] = _rsi_sma(gain, loss, counts, rsi_period)
+        result['rsi_wilder'] = _rsi_wilder(gain, loss, counts, rsi_period)
+    else:
+        result['rsi'] = np.nan
+        result['rsi_wilder'] = np.nan
+
+    # 移動平均（期間に満たない銘柄は NaN が混ざるため自然に NaN になる）
+    for window in ma_windows:
+        if n_rows >= window:
+            result[f'ma_{window}'] = aligned[-window:].mean(axis=0)
+        else:
+            result[f'ma_{window}'] = np.nan
+
+    # トレンド判定
+    short, mid, long = (result[f'ma_{w}'].to_numpy() for w in ma_windows[:3])
+    with np.errstate(invalid="ignore"):
+        trend = np.select(
+            [(short > mid) & (mid > long), (short < mid) & (mid < long)],
+            ['up', 'down'],
+            default='range',
+        ).astype(object)
+    trend[np.isnan(long)] = None
+    result['trend'] = trend
+
+    return result
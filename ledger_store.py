@@ -0,0 +1,457 @@
+"""
+================================================
+ローカル台帳（購入記録）+ Google Sheets 同期
+================================================
+機能:
+  - purchased_stocks / fang_purchases の記録をローカルSQLiteに保存し、
+    読み書きはすべてローカルで完結（正本はローカル）
+  - バックグラウンドの同期スレッドが Google Sheets と双方向に同期
+      push: ローカルで追加・削除した記録をシートへ反映
+            （追加は append_rows でまとめて1回、失敗時は間隔を広げて再試行）
+      pull: シート側の内容（スマホからの編集など）をローカルへ取り込み
+            （前回の行数と末尾数行のチェックサムを覚えておき、通常は新しい行だけを
+              範囲指定で読む。末尾が変わっていたら編集・削除とみなして全体を再読込）
+  - Google Sheets はスマホから編集できるバックアップとして維持
+
+使い方:
+  import ledger_store
+
+  ledger_store.register("fang_purchases", ["購入日", "投資額", ...], cols=6)
+  df = ledger_store.read_ledger("fang_purchases")
+  ledger_store.append_record("fang_purchases", {"購入日": "2026-01-07", ...})
+================================================
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import perf
+from local_store import connect
+
+# 保存先
+LEDGER_DB = "ledger.db"
+
+# 同期スレッドの実行間隔（書き込み時は即座に起こす）
+SYNC_INTERVAL_SECONDS = 60
+
+# 同期失敗時の再試行間隔（失敗のたびに倍、上限あり）
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 300
+
+# 差分取り込みで照合する末尾の行数
+TAIL_ROWS = 5
+
+# 台帳定義 {シート名: {"header": [...], "cols": int}}
+_ledgers = {}
+
+_sync_lock = threading.Lock()
+_worker = None
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+
+# シート名 → (連続失敗回数, 次回再試行時刻 time.monotonic())
+_backoff = {}
+
+log = perf.get_logger(__name__)
+
+
+def _init_db(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_rows (
+            row_id    INTEGER PRIMARY KEY AUTOINCREMENT,
+            sheet     TEXT NOT NULL,
+            sheet_row INTEGER,
+            record    TEXT NOT NULL,
+            status    TEXT NOT NULL  -- synced / pending / pushed / deleting
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_sync (
+            sheet         TEXT PRIMARY KEY,
+            header        TEXT NOT NULL,
+            pulled_at     TEXT,
+            row_count     INTEGER,
+            tail_checksum TEXT
+        )
+    """)
+    # 差分取り込み導入前のDBには列を追加
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(ledger_sync)")}
+    for column, kind in (("row_count", "INTEGER"), ("tail_checksum", "TEXT")):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE ledger_sync ADD COLUMN {column} {kind}")
+
+
+def register(sheet_name, header, cols=None):
+    """
+    同期対象の台帳を登録する
+
+    Args:
+        sheet_name: シート名
+        header: 見出し行（シートがなければこの見出しで作成）
+        cols: シート作成時の列数
+    """
+    _ledgers[sheet_name] = {"header": list(header), "cols": cols or len(header)}
+
+
+# ==========================================
+# ローカル読み書き
+# ==========================================
+
+def _header(conn, sheet_name):
+    row = conn.execute("SELECT header FROM ledger_sync WHERE sheet = ?", (sheet_name,)).fetchone()
+    return json.loads(row[0]) if row else _ledgers[sheet_name]["header"]
+
+
+def _is_pulled(sheet_name):
+    with connect(LEDGER_DB) as conn:
+        _init_db(conn)
+        row = conn.execute(
+            "SELECT pulled_at FROM ledger_sync WHERE sheet = ?", (sheet_name,)
+        ).fetchone()
+    return bool(row and row[0])
+
+
+def read_ledger(sheet_name):
+    """
+    台帳をローカルから読み込む
+
+    まだ一度もシートから取り込んでいなければ、初回のみ同期してから返す
+    （同期の失敗後は再試行間隔が過ぎるまで同期せず、ローカルの内容を返す）。
+
+    Returns:
+        DataFrame: シートの見出し順の列（記録がなければ見出しのみ）
+    """
+    ensure_sync_worker()
+    if not _is_pulled(sheet_name):
+        _sync_with_backoff(sheet_name)
+
+    with connect(LEDGER_DB) as conn:
+        _init_db(conn)
+        header = _header(conn, sheet_name)
+        rows = conn.execute("""
+            SELECT record FROM ledger_rows
+            WHERE sheet = ? AND status != 'deleting'
+            ORDER BY sheet_row IS NULL, sheet_row, row_id
+        """, (sheet_name,)).fetchall()
+
+    records = [json.loads(row[0]) for row in rows]
+    if not records:
+        return pd.DataFrame(columns=header)
+    df = pd.DataFrame(records)
+    columns = header + [c for c in df.columns if c not in header]
+    return df.reindex(columns=columns).fillna("")
+
+
+def append_records(sheet_name, records):
+    """
+    記録をまとめてローカルに追加し、シートへの反映を同期スレッドに依頼する
+
+    ローカルへの書き込みが終わった時点で戻る（シートへの反映は待たない）。
+    """
+    with connect(LEDGER_DB) as conn:
+        _init_db(conn)
+        conn.executemany(
+            "INSERT INTO ledger_rows (sheet, sheet_row, record, status) VALUES (?, NULL, ?, 'pending')",
+            [(sheet_name, json.dumps(record, ensure_ascii=False)) for record in records],
+        )
+    request_sync()
+
+
+def append_record(sheet_name, record):
+    """記録を1件ローカルに追加する（append_records の1件版）"""
+    append_records(sheet_name, [record])
+
+
+def delete_last_record(sheet_name):
+    """
+    最後の記録を削除する（誤入力訂正用）。削除対象があればTrue。
+
+    シート未反映の記録はローカルから消すだけ、反映済みの記録は
+    同期スレッドがシートから削除するまで非表示にする。
+    """
+    with connect(LEDGER_DB) as conn:
+        _init_db(conn)
+        row = conn.execute("""
+            SELECT row_id, status FROM ledger_rows
+            WHERE sheet = ? AND status != 'deleting'
+            ORDER BY sheet_row IS NULL DESC, sheet_row DESC, row_id DESC
+            LIMIT 1
+        """, (sheet_name,)).fetchone()
+        if row is None:
+            return False
+        row_id, status = row
+        if status == "pending":
+            conn.execute("DELETE FROM ledger_rows WHERE row_id = ?", (row_id,))
+        else:
+            conn.execute("UPDATE ledger_rows SET status = 'deleting' WHERE row_id = ?", (row_id,))
+    request_sync()
+    return True
+
+
+def pending_count(sheet_name):
+    """シートに未反映の追加・削除の件数"""
+    with connect(LEDGER_DB) as conn:
+        _init_db(conn)
+        return conn.execute(
+            "SELECT COUNT(*) FROM ledger_rows WHERE sheet = ? AND status IN ('pending', 'deleting')",
+            (sheet_name,),
+        ).fetchone()[0]
+
+
+# ==========================================
+# Google Sheets 同期
+# ==========================================
+
+def _to_row(record, header):
+    return ["" if record.get(col) is None else record.get(col) for col in header]
+
+
+def _cell(value):
+    """比較用にセルの値を揃える（数値は "1,000" / "1000" / 1000.0 などの書式の違いを吸収）"""
+    text = str(value).strip()
+    try:
+        return float(text.replace(",", ""))
+    except ValueError:
+        return text
+
+
+def _matches(record, values, header):
+    """ローカルの記録とシート上の行が同じ内容か（数値は数値として比較）"""
+    expected = [_cell(v) for v in _to_row(record, header)]
+    actual = list(values) + [""] * (len(header) - len(values))
+    return expected == [_cell(v) for v in actual[:len(header)]]
+
+
+def _find_last_match(values, record, header):
+    """シート全体の値から、記録と一致する最後の行番号を探す（なければNone）"""
+    for i in range(len(values) - 1, 0, -1):
+        if _matches(record, values[i], header):
+            return i + 1
+    return None
+
+
+def _normalize(rows, width):
+    """シートの行を見出しの列数に揃えた文字列のリストにする"""
+    return [[str(v) for v in (list(row) + [""] * width)[:width]] for row in rows]
+
+
+def _checksum(rows):
+    return hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode()).hexdigest()
+
+
+def _read_sheet(ws, state, header, force_full=False):
+    """
+    シートの内容を読む（可能なら前回からの差分だけ）
+
+    Args:
+        state: 前回の (見出し, 行数, 末尾チェックサム)。未取り込みならNone
+        header: シートが空の場合の見出し
+        force_full: 差分を使わず全体を読む
+
+    Returns:
+        (見出し, [(行番号, 値のリスト), ...], 全体を読んだか, 行数, 末尾チェックサム)
+        全体を読んだ場合は全行、差分の場合は新しい行のみ
+    """
+    from gspread.utils import rowcol_to_a1
+
+    if state and not force_full:
+        header, row_count, tail_checksum = state
+        width = len(header)
+        n_rows = len(ws.col_values(1))
+        if n_rows >= row_count > 1:
+            start = max(2, row_count - TAIL_ROWS + 1)
+            values = _normalize(ws.get(f"A{start}:{rowcol_to_a1(n_rows, width)}"), width)
+            values += [[""] * width] * (n_rows - start + 1 - len(values))
+            if _checksum(values[:row_count - start + 1]) == tail_checksum:
+                new_rows = [(start + i, row) for i, row in enumerate(values) if start + i > row_count]
+                tail = values[max(2, n_rows - TAIL_ROWS + 1) - start:]
+                return header, new_rows, False, n_rows, _checksum(tail)
+
+    values = ws.get_all_values()
+    header = values[0] if values else header
+    data = _normalize(values[1:], len(header))
+    rows = [(i + 2, row) for i, row in enumerate(data)]
+    return header, rows, True, len(data) + 1, _checksum(data[-TAIL_ROWS:])
+
+
+def sync_sheet(sheet_name):
+    """
+    1つの台帳をシートと同期する
+
+    1. 削除待ちの記録をシートから削除（シート上の内容が一致する場合のみ）
+    2. 追加待ちの記録を append_rows でまとめてシートへ追加
+    3. シートの新しい行を取り込む（編集・削除を検知したら全体を読み直して置き換え）
+    """
+    from gspread.utils import numericise_all
+    from sheets_client import get_worksheet
+
+    ledger = _ledgers[sheet_name]
+    with _sync_lock:
+        ws = get_worksheet(sheet_name, header=ledger["header"], cols=ledger["cols"])
+        if ws is None:
+            raise RuntimeError("Google Sheets に接続できません")
+
+        with connect(LEDGER_DB) as conn:
+            _init_db(conn)
+            header = _header(conn, sheet_name)
+            state = conn.execute(
+                "SELECT header, row_count, tail_checksum FROM ledger_sync WHERE sheet = ?",
+                (sheet_name,),
+            ).fetchone()
+            deleting = conn.execute("""
+                SELECT row_id, sheet_row, record FROM ledger_rows
+                WHERE sheet = ? AND status = 'deleting' ORDER BY sheet_row DESC
+            """, (sheet_name,)).fetchall()
+            pending = conn.execute("""
+                SELECT row_id, record FROM ledger_rows
+                WHERE sheet = ? AND status = 'pending' ORDER BY row_id
+            """, (sheet_name,)).fetchall()
+
+        # 1. 削除（下の行から順に。内容が変わっていれば削除せず取り込み結果に任せる）
+        #    行番号が未確定（追加直後）の記録はシート上の一致する最後の行を探す
+        for _, sheet_row, record in deleting:
+            record = json.loads(record)
+            with perf.timed("sheets", "ledger.delete_row", sheet=sheet_name):
+                if sheet_row is None:
+                    sheet_row = _find_last_match(ws.get_all_values(), record, header)
+                elif not _matches(record, ws.row_values(sheet_row), header):
+                    sheet_row = None
+                if sheet_row:
+                    ws.delete_rows(sheet_row)
+
+        # 2. 追加（1回のAPI呼び出し。成功したら二重に追加しないよう pushed にする）
+        #    追加中にローカルで削除された記録はシートに載ってしまったので、削除待ちとして残す
+        if pending:
+            with perf.timed("sheets", "ledger.append_rows", sheet=sheet_name, rows=len(pending)):
+                ws.append_rows([_to_row(json.loads(record), header) for _, record in pending])
+            with connect(LEDGER_DB) as conn:
+                for row_id, record in pending:
+                    updated = conn.execute(
+                        "UPDATE ledger_rows SET status = 'pushed' WHERE row_id = ? AND status = 'pending'",
+                        (row_id,),
+                    ).rowcount
+                    if not updated:
+                        conn.execute(
+                            "INSERT INTO ledger_rows (sheet, sheet_row, record, status) "
+                            "VALUES (?, NULL, ?, 'deleting')",
+                            (sheet_name, record),
+                        )
+
+        # 3. 取り込み（行を削除した直後は行番号がずれるので全体を読む）
+        if state and state[1] is not None:
+            state = (json.loads(state[0]), state[1], state[2])
+        else:
+            state = None
+        with perf.timed("sheets", "ledger.pull", sheet=sheet_name) as timer:
+            sheet_header, rows, full, row_count, tail_checksum = _read_sheet(
+                ws, state, header, force_full=bool(deleting)
+            )
+            timer.set(rows=len(rows), full=full)
+        records = [
+            (sheet_row, dict(zip(sheet_header, numericise_all(row))))
+            for sheet_row, row in rows
+            if any(v.strip() for v in row)
+        ]
+
+        with connect(LEDGER_DB) as conn:
+            _init_db(conn)
+            # 同期中に新たに削除指定された行は次回の同期まで残す
+            processed = [row_id for row_id, _, _ in deleting]
+            replaced = "('synced', 'pushed')" if full else "('pushed')"
+            conn.execute(
+                f"DELETE FROM ledger_rows WHERE sheet = ? AND status IN {replaced}", (sheet_name,)
+            )
+            conn.executemany(
+                "DELETE FROM ledger_rows WHERE row_id = ?", [(row_id,) for row_id in processed]
+            )
+            still_deleting = conn.execute(
+                "SELECT sheet_row, record FROM ledger_rows WHERE sheet = ? AND status = 'deleting'",
+                (sheet_name,),
+            ).fetchall()
+            skipped = {sheet_row for sheet_row, _ in still_deleting if sheet_row is not None}
+            # 行番号が未確定の削除待ち（追加と行き違った削除）は、一致する最後の行を取り込まない
+            unplaced = [json.loads(record) for sheet_row, record in still_deleting if sheet_row is None]
+            for sheet_row, row in reversed(rows):
+                match = next((r for r in unplaced if _matches(r, row, sheet_header)), None)
+                if match is not None:
+                    unplaced.remove(match)
+                    skipped.add(sheet_row)
+            conn.executemany(
+                "INSERT INTO ledger_rows (sheet, sheet_row, record, status) VALUES (?, ?, ?, 'synced')",
+                [
+                    (sheet_name, sheet_row, json.dumps(record, ensure_ascii=False))
+                    for sheet_row, record in records
+                    if sheet_row not in skipped
+                ],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO ledger_sync VALUES (?, ?, ?, ?, ?)",
+                (
+                    sheet_name,
+                    json.dumps(sheet_header, ensure_ascii=False),
+                    datetime.now().isoformat(),
+                    row_count,
+                    tail_checksum,
+                ),
+            )
+
+
+def _retry_delay(failures):
+    return min(RETRY_BASE_SECONDS * 2 ** (failures - 1), RETRY_MAX_SECONDS)
+
+
+def _sync_with_backoff(sheet_name):
+    """
+    再試行待ちでなければ同期する（同期スレッドと read_ledger の初回同期で共通）
+
+    Returns:
+        次の再試行までの秒数（同期に成功したら None）
+    """
+    from sheets_client import reset
+
+    failures, retry_at = _backoff.get(sheet_name, (0, 0.0))
+    now = time.monotonic()
+    if now < retry_at:
+        return retry_at - now
+    try:
+        sync_sheet(sheet_name)
+        _backoff.pop(sheet_name, None)
+        return None
+    except Exception as e:
+        failures += 1
+        delay = _retry_delay(failures)
+        _backoff[sheet_name] = (failures, time.monotonic() + delay)
+        log.warning(f"台帳同期エラー ({sheet_name}, {failures}回目, {delay}秒後に再試行): {e}")
+        reset()
+        return delay
+
+
+def _run_worker():
+    while True:
+        timeout = SYNC_INTERVAL_SECONDS
+        for sheet_name in list(_ledgers):
+            delay = _sync_with_backoff(sheet_name)
+            if delay is not None:
+                timeout = min(timeout, delay)
+        _wake.wait(timeout)
+        _wake.clear()
+
+
+def ensure_sync_worker():
+    """同期スレッドを起動する（プロセス内で1つだけ）"""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name="ledger-sync", daemon=True)
+            _worker.start()
+
+
+def request_sync():
+    """同期スレッドに即時同期を依頼する"""
+    ensure_sync_worker()
+    _wake.set()
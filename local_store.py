@@ -0,0 +1,34 @@
+"""
+================================================
+ローカルデータストア（SQLite）
+================================================
+機能: 株価履歴・キャッシュなどを保存するSQLite接続の共通設定
+
+使い方:
+  from local_store import connect
+
+  with connect("price_history.db") as conn:
+      conn.execute("SELECT ...")
+================================================
+"""
+
+import sqlite3
+from contextlib import contextmanager
+
+
+@contextmanager
+def connect(db_path):
+    """
+    SQLiteに接続し、ブロック終了時にコミット（例外時はロールバック）する
+
+    WALモードで開くため、Streamlitの複数セッションから同時に読み書きしても
+    読み込みが書き込みにブロックされない。
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,110 @@
+"""
+================================================
+マクロ指標スナップショット（債券利回り・VIX・主要指数）
+================================================
+機能:
+  - ^TNX ^FVX ^VIX ^GSPC ^IXIC QQQ の直近終値を1回の一括取得で読み込み
+    （history_store 経由。同期済みなら差分のみ）
+  - 結果を型付きのスナップショット（dataclass）で返す
+
+使い方:
+  from macro_snapshot import fetch_macro_snapshot
+
+  macro = fetch_macro_snapshot()
+  print(macro.bonds.ten_year, macro.vix.current, macro.indices["QQQ"].price)
+================================================
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import perf
+from history_store import get_close_matrix
+
+BOND_SYMBOLS = {'ten_year': '^TNX', 'five_year': '^FVX'}
+VIX_SYMBOL = '^VIX'
+INDEX_SYMBOLS = {
+    'S&P 500': '^GSPC',
+    'NASDAQ': '^IXIC',
+    'QQQ': 'QQQ',
+}
+
+# 2年債は取得できないため10年債から推定（10年債 - 0.8%程度）
+TWO_YEAR_OFFSET = 0.8
+
+log = perf.get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class BondYields:
+    ten_year: float = 0.0
+    five_year: float = 0.0
+    two_year: float = 0.0
+    spread: float = 0.0
+
+
+@dataclass(frozen=True)
+class VixReading:
+    current: float = 0.0
+    history: list = field(default_factory=list)  # 直近5日の終値
+
+
+@dataclass(frozen=True)
+class IndexQuote:
+    price: float
+    change_pct: float
+
+
+@dataclass(frozen=True)
+class MacroSnapshot:
+    bonds: BondYields = field(default_factory=BondYields)
+    vix: VixReading = field(default_factory=VixReading)
+    indices: dict = field(default_factory=dict)  # 指数名 → IndexQuote
+    fetched_at: datetime = None
+
+
+def fetch_macro_snapshot():
+    """
+    マクロ指標をまとめて取得
+
+    Returns:
+        MacroSnapshot（取得できなかった項目は 0 / 空の既定値）
+    """
+    symbols = [*BOND_SYMBOLS.values(), VIX_SYMBOL, *INDEX_SYMBOLS.values()]
+    try:
+        close = get_close_matrix(symbols, period="5d")
+    except Exception as e:
+        log.warning(f"マクロ指標取得エラー: {e}")
+        return MacroSnapshot(fetched_at=datetime.now())
+
+    series = {symbol: close[symbol].dropna() for symbol in symbols if symbol in close.columns}
+
+    bonds = BondYields()
+    ten, five = (series.get(BOND_SYMBOLS[k]) for k in ('ten_year', 'five_year'))
+    if ten is not None and five is not None and len(ten) > 0 and len(five) > 0:
+        ten_year = float(ten.iloc[-1])
+        two_year = ten_year - TWO_YEAR_OFFSET
+        bonds = BondYields(
+            ten_year=ten_year,
+            five_year=float(five.iloc[-1]),
+            two_year=two_year,
+            spread=ten_year - two_year,
+        )
+
+    vix = VixReading()
+    if len(series.get(VIX_SYMBOL, ())) > 0:
+        vix = VixReading(current=float(series[VIX_SYMBOL].iloc[-1]), history=series[VIX_SYMBOL].tolist())
+
+    indices = {}
+    for name, symbol in INDEX_SYMBOLS.items():
+        data = series.get(symbol)
+        if data is None or len(data) == 0:
+            continue
+        current = float(data.iloc[-1])
+        prev = float(data.iloc[-2]) if len(data) > 1 else current
+        indices[name] = IndexQuote(
+            price=current,
+            change_pct=((current - prev) / prev * 100) if prev > 0 else 0,
+        )
+
+    return MacroSnapshot(bonds=bonds, vix=vix, indices=indices, fetched_at=datetime.now())
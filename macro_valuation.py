@@ -0,0 +1,216 @@
+"""
+================================================
+マクロ バリュエーション（シラーPER）
+================================================
+機能:
+  - multpl.com からシラーPERを1日1回だけ取得し、ローカルSQLiteに蓄積
+  - 月次の全履歴（1871年〜）は取り込みに成功するまで毎回試し、以降は日次の現在値を追記
+  - 履歴に対するパーセンタイル順位をNumPyでまとめて計算
+  - calculate_danger_level に渡すシラーPERのスナップショットを返す
+
+使い方:
+  from macro_valuation import get_shiller_snapshot, get_shiller_history
+
+  snap = get_shiller_snapshot()
+  print(snap["value"], snap["percentile"])
+================================================
+"""
+
+import html as html_lib
+import re
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from html_extract import extract
+import perf
+from http_client import get_parsed
+from local_store import connect
+
+# 保存先
+MACRO_DB = "macro_valuation.db"
+
+SHILLER_URL = "https://www.multpl.com/shiller-pe"
+SHILLER_TABLE_URL = "https://www.multpl.com/shiller-pe/table/by-month"
+
+REQUEST_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+}
+
+# パーセンタイルを併記する直近期間（年）
+RECENT_YEARS = 20
+
+# パーセンタイルを出すのに必要な履歴の長さ（月数）。足りなければ None
+# （月次の全履歴を取り込めていないと日次の数点だけで順位が付いてしまうため）
+MIN_HISTORY_MONTHS = 120
+
+log = perf.get_logger(__name__)
+
+_TABLE_ROW = re.compile(
+    r"<td[^>]*>\s*([A-Z][a-z]{2} \d{1,2}, \d{4})\s*</td>\s*<td[^>]*>(.*?)</td>", re.S
+)
+
+
+def _init_db(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS shiller_pe (
+            date  TEXT PRIMARY KEY,
+            value REAL NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fetch_state (
+            name       TEXT PRIMARY KEY,
+            fetched_on TEXT NOT NULL
+        )
+    """)
+
+
+def parse_shiller_table(page):
+    """月次履歴ページの表 → [('YYYY-MM-DD', 値), ...]"""
+    rows = []
+    for day, cell in _TABLE_ROW.findall(page):
+        match = re.search(r"\d+\.\d+", html_lib.unescape(cell))
+        if match:
+            rows.append((datetime.strptime(day, "%b %d, %Y").date().isoformat(), float(match.group())))
+    return rows
+
+
+def refresh_shiller_pe(force=False):
+    """
+    シラーPERを取得して保存する（同じ日に2回目以降は何もしない）
+
+    月次の全履歴は取り込みに成功するまで（fetch_state の 'shiller_table'）毎回取得を試す。
+    取得失敗時は保存済みのデータのまま。
+    """
+    today = date.today().isoformat()
+    with connect(MACRO_DB) as conn:
+        _init_db(conn)
+        state = dict(conn.execute("SELECT name, fetched_on FROM fetch_state").fetchall())
+    has_table = 'shiller_table' in state
+    fresh = state.get('shiller_pe') == today and has_table and not force
+    perf.cache_event("shiller_pe", hit=fresh)
+    if fresh:
+        return
+
+    try:
+        table = []
+        if not has_table:
+            table = get_parsed(SHILLER_TABLE_URL, parse_shiller_table, headers=REQUEST_HEADERS) or []
+            if not table:
+                log.warning("シラーPERの月次履歴を取得できませんでした（次回再取得）")
+        current = None
+        if state.get('shiller_pe') != today or force:
+            current = get_parsed(SHILLER_URL, lambda page: extract("multpl", page)[0], headers=REQUEST_HEADERS)
+    except Exception as e:
+        log.warning(f"シラーPER取得エラー: {e}")
+        return
+
+    rows = list(table)
+    if current is not None:
+        rows.append((today, float(current)))
+    with connect(MACRO_DB) as conn:
+        _init_db(conn)
+        conn.executemany("INSERT OR REPLACE INTO shiller_pe VALUES (?, ?)", [tuple(r) for r in rows])
+        if table:
+            conn.execute("INSERT OR REPLACE INTO fetch_state VALUES ('shiller_table', ?)", (today,))
+        if current is not None:
+            conn.execute("INSERT OR REPLACE INTO fetch_state VALUES ('shiller_pe', ?)", (today,))
+
+
+def get_shiller_history(start=None, refresh=True):
+    """
+    シラーPERの履歴
+
+    Returns:
+        Series: index=日付（DatetimeIndex）, 値=シラーPER
+        （〜前月は月次、取得を始めてからは日次）
+    """
+    if refresh:
+        refresh_shiller_pe()
+    query = "SELECT date, value FROM shiller_pe"
+    params = []
+    if start is not None:
+        query += " WHERE date >= ?"
+        params.append(str(start))
+    with connect(MACRO_DB) as conn:
+        _init_db(conn)
+        rows = conn.execute(query + " ORDER BY date", params).fetchall()
+    return pd.Series(
+        [value for _, value in rows],
+        index=pd.DatetimeIndex([day for day, _ in rows], name="Date"),
+        name="shiller_pe",
+        dtype=float,
+    )
+
+
+def percentile_rank(values, history):
+    """
+    values が history の中で何パーセンタイルに当たるか（0〜100、以下の割合）
+
+    values はスカラー・配列どちらでもよい（ソート済み履歴への二分探索でまとめて計算）。
+    """
+    sorted_history = np.sort(np.asarray(history, dtype=float))
+    sorted_history = sorted_history[~np.isnan(sorted_history)]
+    if len(sorted_history) == 0:
+        return np.full(np.shape(values), np.nan)
+    return np.searchsorted(sorted_history, values, side="right") / len(sorted_history) * 100
+
+
+def monthly(history):
+    """日次部分を月末値に揃えた月次系列（パーセンタイルの母集団を月次に統一）"""
+    return history.groupby(history.index.to_period("M")).last()
+
+
+def get_shiller_snapshot(refresh=True):
+    """
+    現在のシラーPERと履歴上の位置
+
+    Returns:
+        dict: {
+            'value': 最新値（取得できなければ None）,
+            'date': 最新値の日付,
+            'percentile': 全期間（月次）に対するパーセンタイル,
+            'percentile_recent': 直近 RECENT_YEARS 年に対するパーセンタイル,
+            （いずれも履歴が MIN_HISTORY_MONTHS か月に満たなければ None）
+            'median': 全期間の中央値,
+        }
+    """
+    history = get_shiller_history(refresh=refresh)
+    if history.empty:
+        return {'value': None, 'date': None, 'percentile': None, 'percentile_recent': None, 'median': None}
+
+    by_month = monthly(history)
+    recent = by_month[by_month.index >= pd.Period(date.today(), "M") - RECENT_YEARS * 12]
+    value = float(history.iloc[-1])
+
+    def rank(population):
+        if len(population) < MIN_HISTORY_MONTHS:
+            return None
+        return float(percentile_rank(value, population.to_numpy()))
+
+    return {
+        'value': value,
+        'date': history.index[-1].strftime("%Y-%m-%d"),
+        'percentile': rank(by_month),
+        'percentile_recent': rank(recent),
+        'median': float(by_month.median()),
+    }
+
+
+if __name__ == "__main__":
+    snap = get_shiller_snapshot()
+    if snap['value'] is None:
+        print("❌ シラーPERを取得できませんでした")
+    else:
+        print(f"📊 シラーPER: {snap['value']:.2f}倍（{snap['date']}）")
+        if snap['percentile'] is None:
+            print(f"   履歴が{MIN_HISTORY_MONTHS}か月に満たないためパーセンタイルは未算出")
+        else:
+            print(f"   全期間パーセンタイル: {snap['percentile']:.1f}%（中央値 {snap['median']:.1f}倍）")
+            print(f"   直近{RECENT_YEARS}年パーセンタイル: {snap['percentile_recent']:.1f}%")
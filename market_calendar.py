@@ -0,0 +1,268 @@
+"""
+================================================
+市場カレンダー（東証・NYSE）とキャッシュ期限
+================================================
+機能:
+  - 東証（TSE）・ニューヨーク証券取引所（NYSE）の立会時間・休場日を判定
+    （祝日は規則から計算。外部ライブラリ不要）
+  - 立会中は短い間隔、引け後は確定値を1回取り直したあと次の寄り付きまで
+    同じ値を使うためのキャッシュキー（cache_epoch）を返す
+
+使い方:
+  from market_calendar import cache_epoch, is_open, market_for
+
+  @st.cache_data(max_entries=32)
+  def get_prices(codes, epoch): ...
+
+  get_prices(codes, cache_epoch("TSE"))   # 値が変わったときだけ再取得
+================================================
+"""
+
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+# 立会中のキャッシュ間隔
+OPEN_TTL_SECONDS = 300
+
+# 大引け後、確定値が取得元に反映されるまでの待ち時間
+CLOSE_SETTLE_MINUTES = 20
+
+MARKETS = {
+    "TSE": {
+        "tz": ZoneInfo("Asia/Tokyo"),
+        # 前場・後場
+        "sessions": [(time(9, 0), time(11, 30)), (time(12, 30), time(15, 30))],
+    },
+    "NYSE": {
+        "tz": ZoneInfo("America/New_York"),
+        "sessions": [(time(9, 30), time(16, 0))],
+        "early_close": time(13, 0),
+    },
+}
+
+
+# ==========================================
+# 祝日
+# ==========================================
+
+def _nth_weekday(year, month, weekday, n):
+    """month の第n weekday（n=-1 で最終）"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """復活祭（グレゴリオ暦）"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    j, k = c // 4, c % 4
+    m = (a + 11 * h) // 319
+    r = (2 * e + 2 * j - k - h + m + 32) % 7
+    month = (h - m + r + 90) // 25
+    return date(year, month, (h - m + r + month + 19) % 32)
+
+
+def _observed_us(day):
+    """土曜の祝日は前の金曜、日曜の祝日は翌月曜に振替"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def nyse_holidays(year):
+    """NYSE の休場日"""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),        # キング牧師記念日
+        _nth_weekday(year, 2, 0, 3),        # 大統領の日
+        _easter(year) - timedelta(days=2),  # 聖金曜日
+        _nth_weekday(year, 5, 0, -1),       # メモリアルデー
+        _observed_us(date(year, 7, 4)),     # 独立記念日
+        _nth_weekday(year, 9, 0, 1),        # レイバーデー
+        _nth_weekday(year, 11, 3, 4),       # 感謝祭
+        _observed_us(date(year, 12, 25)),   # クリスマス
+    }
+    # 元日が土曜なら前年12/31は振替しない（NYSEの規則）
+    if date(year, 1, 1).weekday() != 5:
+        holidays.add(_observed_us(date(year, 1, 1)))
+    if year >= 2022:
+        holidays.add(_observed_us(date(year, 6, 19)))  # ジューンティーンス
+    return frozenset(holidays)
+
+
+def nyse_early_closes(year):
+    """NYSE の短縮取引日（13時引け）"""
+    candidates = {
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),  # 感謝祭の翌日
+        date(year, 12, 24),
+        date(year, 7, 3),
+    }
+    return {d for d in candidates if d.weekday() < 5 and d not in nyse_holidays(year)}
+
+
+def _equinox(year, base):
+    return int(base + 0.242194 * (year - 1980) - (year - 1980) // 4)
+
+
+@lru_cache(maxsize=None)
+def jp_holidays(year):
+    """日本の国民の祝日（振替休日・国民の休日を含む）"""
+    holidays = {
+        date(year, 1, 1),
+        _nth_weekday(year, 1, 0, 2),                   # 成人の日
+        date(year, 2, 11),
+        date(year, 2, 23),                             # 天皇誕生日
+        date(year, 3, _equinox(year, 20.8431)),        # 春分の日
+        date(year, 4, 29),
+        date(year, 5, 3), date(year, 5, 4), date(year, 5, 5),
+        _nth_weekday(year, 7, 0, 3),                   # 海の日
+        date(year, 8, 11),                             # 山の日
+        _nth_weekday(year, 9, 0, 3),                   # 敬老の日
+        date(year, 9, _equinox(year, 23.2488)),        # 秋分の日
+        _nth_weekday(year, 10, 0, 2),                  # スポーツの日
+        date(year, 11, 3),
+        date(year, 11, 23),
+    }
+    # 国民の休日（祝日に挟まれた平日）
+    for day in sorted(holidays):
+        between = day + timedelta(days=1)
+        if between + timedelta(days=1) in holidays and between not in holidays and between.weekday() != 6:
+            holidays.add(between)
+    # 振替休日（日曜の祝日 → 次の祝日でない日）
+    for day in sorted(holidays):
+        if day.weekday() == 6:
+            substitute = day + timedelta(days=1)
+            while substitute in holidays:
+                substitute += timedelta(days=1)
+            holidays.add(substitute)
+    return frozenset(holidays)
+
+
+def tse_holidays(year):
+    """東証の休場日（祝日 + 年末年始 12/31〜1/3）"""
+    return jp_holidays(year) | {date(year, 1, 2), date(year, 1, 3), date(year, 12, 31)}
+
+
+# ==========================================
+# 立会時間
+# ==========================================
+
+def is_trading_day(market, day):
+    if day.weekday() >= 5:
+        return False
+    holidays = tse_holidays(day.year) if market == "TSE" else nyse_holidays(day.year)
+    return day not in holidays
+
+
+def sessions(market, day):
+    """day の立会時間 [(開始, 終了), ...]（市場のタイムゾーン付き）。休場日は空"""
+    if not is_trading_day(market, day):
+        return []
+    spec = MARKETS[market]
+    result = []
+    for start, end in spec["sessions"]:
+        if market == "NYSE" and day in nyse_early_closes(day.year):
+            end = spec["early_close"]
+        result.append((
+            datetime.combine(day, start, tzinfo=spec["tz"]),
+            datetime.combine(day, end, tzinfo=spec["tz"]),
+        ))
+    return result
+
+
+def _local_now(market, now=None):
+    tz = MARKETS[market]["tz"]
+    return now.astimezone(tz) if now else datetime.now(tz)
+
+
+def current_session(market, now=None):
+    """立会中ならその (開始, 終了)、そうでなければ None"""
+    now = _local_now(market, now)
+    for start, end in sessions(market, now.date()):
+        if start <= now < end:
+            return start, end
+    return None
+
+
+def is_open(market, now=None):
+    return current_session(market, now) is not None
+
+
+def next_open(market, now=None):
+    """now 以降の次の立会開始時刻"""
+    now = _local_now(market, now)
+    day = now.date()
+    for _ in range(15):
+        for start, _ in sessions(market, day):
+            if start > now:
+                return start
+        day += timedelta(days=1)
+    return None
+
+
+def last_close(market, now=None):
+    """now 以前の直近の立会終了時刻"""
+    now = _local_now(market, now)
+    day = now.date()
+    for _ in range(15):
+        for _, end in reversed(sessions(market, day)):
+            if end <= now:
+                return end
+        day -= timedelta(days=1)
+    return None
+
+
+def market_for(ticker):
+    """ティッカーの市場（.T は東証、それ以外はNYSEとみなす）"""
+    return "TSE" if str(ticker).endswith(".T") else "NYSE"
+
+
+# ==========================================
+# キャッシュキー・鮮度
+# ==========================================
+
+def fresh_since(market, interval, now=None):
+    """
+    この時刻以降に取得したデータなら最新とみなせる時刻
+
+    立会中（と引け直後の確定待ち）は now - interval、
+    確定後は「大引け + CLOSE_SETTLE_MINUTES」（次の寄り付きまで取り直さない）。
+    """
+    now = now or datetime.now(ZoneInfo("UTC"))
+    if not is_open(market, now):
+        closed_at = last_close(market, now)
+        if closed_at:
+            settled = closed_at + timedelta(minutes=CLOSE_SETTLE_MINUTES)
+            if now >= settled:
+                return settled
+    return now - interval
+
+
+def _epoch(market, now):
+    session = current_session(market, now)
+    if session:
+        bucket = int(now.timestamp() // OPEN_TTL_SECONDS)
+        return f"{market}:open:{bucket}"
+    closed_at = last_close(market, now)
+    if closed_at and now < closed_at + timedelta(minutes=CLOSE_SETTLE_MINUTES):
+        return f"{market}:settling:{closed_at.isoformat()}"
+    return f"{market}:closed:{closed_at.isoformat() if closed_at else ''}"
+
+
+def cache_epoch(*markets, now=None):
+    """
+    キャッシュキーに加える値（st.cache_data の引数に渡す）
+
+    立会中は OPEN_TTL_SECONDS ごとに、引け直後と確定値の反映後に1回ずつ変わり、
+    その後は次の寄り付きまで変わらない（夜間・休日は再取得しない）。
+    """
+    now = now or datetime.now(ZoneInfo("UTC"))
+    return "|".join(_epoch(market, now) for market in markets)
@@ -0,0 +1,175 @@
+"""
+================================================
+投資信託 基準価額（NAV）履歴ストア
+================================================
+機能:
+  - 基準価額をローカルSQLiteに日付ごとに1件ずつ蓄積
+  - 基準価額は営業日（東証の営業日）ごとに1回（夕方以降）公表されるため、
+    次の公表予定時刻までは取得済みの値を返し、スクレイピングしない
+  - 公表予定を過ぎても取得元が前回と同じ値を返す間は未更新とみなし、
+    前日の値を当日分として保存せずに再確認する
+  - 期間指定で履歴を取り出せる（評価額推移のチャート用）
+
+使い方:
+  from nav_store import get_latest_nav, get_nav_history
+
+  nav = get_latest_nav("04311181", fetch=get_fang_current_price)
+  history = get_nav_history("04311181", start="2026-01-01")
+================================================
+"""
+
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+import perf
+from local_store import connect
+from market_calendar import is_trading_day
+
+# 保存先
+NAV_DB = "nav_history.db"
+
+JST = ZoneInfo("Asia/Tokyo")
+
+# 基準価額が取得元に反映される目安の時刻（営業日・日本時間）
+NAV_PUBLISH_TIME = time(20, 0)
+
+# 取得に失敗した場合・取得元がまだ更新されていない場合の再試行間隔
+RETRY_MINUTES = 15
+
+# 公表予定からこの時間が過ぎても値が前回と同じなら、同値で公表されたとみなして保存
+UNCHANGED_ACCEPT_HOURS = 6
+
+
+def _init_db(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS nav (
+            fund_code  TEXT NOT NULL,
+            date       TEXT NOT NULL,
+            nav        REAL NOT NULL,
+            fetched_at TEXT NOT NULL,
+            PRIMARY KEY (fund_code, date)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS nav_state (
+            fund_code TEXT PRIMARY KEY,
+            next_due  TEXT NOT NULL
+        )
+    """)
+
+
+def _now():
+    return datetime.now(JST)
+
+
+def latest_publication(now=None):
+    """now 時点で公表済みの最新の基準価額の日付（土日・祝日・年末年始は前営業日）"""
+    now = now or _now()
+    day = now.date()
+    if now.time() < NAV_PUBLISH_TIME:
+        day -= timedelta(days=1)
+    while not is_trading_day("TSE", day):
+        day -= timedelta(days=1)
+    return day
+
+
+def next_publication(now=None):
+    """now より後の次の基準価額の公表予定時刻"""
+    now = now or _now()
+    day = latest_publication(now) + timedelta(days=1)
+    while not is_trading_day("TSE", day):
+        day += timedelta(days=1)
+    return datetime.combine(day, NAV_PUBLISH_TIME, tzinfo=JST)
+
+
+def _latest_stored(conn, fund_code):
+    return conn.execute(
+        "SELECT date, nav FROM nav WHERE fund_code = ? ORDER BY date DESC LIMIT 1",
+        (fund_code,),
+    ).fetchone()
+
+
+def get_latest_nav(fund_code, fetch, force=False):
+    """
+    最新の基準価額を返す
+
+    次の公表予定時刻までは保存済みの値を返す。公表予定を過ぎていれば
+    fetch() で取得して保存する（取得失敗時は保存済みの値、なければ 0.0）。
+    取得した値が保存済みの前営業日の値と同じなら取得元が未更新とみなし、
+    RETRY_MINUTES 後に再確認する（UNCHANGED_ACCEPT_HOURS を過ぎたら同値として保存）。
+
+    Args:
+        fund_code: ファンドコード
+        fetch: 現在の基準価額を返す関数（失敗時は 0.0）
+        force: 公表予定に関係なく取得する
+    """
+    now = _now()
+    with connect(NAV_DB) as conn:
+        _init_db(conn)
+        stored = _latest_stored(conn, fund_code)
+        state = conn.execute(
+            "SELECT next_due FROM nav_state WHERE fund_code = ?", (fund_code,)
+        ).fetchone()
+    is_fresh = bool(state and not force and datetime.fromisoformat(state[0]) > now)
+    perf.cache_event("nav", hit=is_fresh)
+    if is_fresh:
+        return stored[1] if stored else 0.0
+
+    nav = fetch()
+    published = latest_publication(now)
+    published_at = datetime.combine(published, NAV_PUBLISH_TIME, tzinfo=JST)
+    not_updated = (
+        nav > 0 and stored is not None
+        and stored[0] < published.isoformat() and float(nav) == stored[1]
+        and now - published_at < timedelta(hours=UNCHANGED_ACCEPT_HOURS)
+    )
+    with connect(NAV_DB) as conn:
+        _init_db(conn)
+        if nav > 0 and not not_updated:
+            conn.execute(
+                "INSERT OR REPLACE INTO nav VALUES (?, ?, ?, ?)",
+                (fund_code, published.isoformat(), float(nav), now.isoformat()),
+            )
+            next_due = next_publication(now)
+        else:
+            next_due = now + timedelta(minutes=RETRY_MINUTES)
+        conn.execute(
+            "INSERT OR REPLACE INTO nav_state VALUES (?, ?)",
+            (fund_code, next_due.isoformat()),
+        )
+
+    if nav > 0:
+        return float(nav)
+    return stored[1] if stored else 0.0
+
+
+def get_nav_history(fund_code, start=None, end=None):
+    """
+    基準価額の履歴を返す
+
+    Args:
+        start, end: 期間（'YYYY-MM-DD' / date、省略時は全期間）
+
+    Returns:
+        Series: index=日付（DatetimeIndex）, 値=基準価額
+    """
+    query = "SELECT date, nav FROM nav WHERE fund_code = ?"
+    params = [fund_code]
+    if start is not None:
+        query += " AND date >= ?"
+        params.append(str(start))
+    if end is not None:
+        query += " AND date <= ?"
+        params.append(str(end))
+    with connect(NAV_DB) as conn:
+        _init_db(conn)
+        rows = conn.execute(query + " ORDER BY date", params).fetchall()
+
+    return pd.Series(
+        [nav for _, nav in rows],
+        index=pd.DatetimeIndex([date for date, _ in rows], name="Date"),
+        name="nav",
+        dtype=float,
+    )
@@ -0,0 +1,276 @@
+"""
+================================================
+計測（所要時間・キャッシュヒット率）と構造化ログ
+================================================
+機能:
+  - ネットワーク取得・スクレイピング・Google Sheets 呼び出し・計算段階の
+    所要時間を記録（プロセス内に直近 MAX_EVENTS 件を保持）
+  - キャッシュごとのヒット / ミスを記録
+  - 同じ内容を JSON Lines の構造化ログとして PERF_LOG に出力
+    （各モジュールのエラーも同じログに出す。コンソールには警告以上のみ）
+  - 描画ごとの ID（mark）を記録に付け、ダッシュボードはその描画の記録だけを集計して表示
+    （他のセッション・裏の再計算スレッドの記録は含まない）
+
+分類（category）:
+  fetch   : 株価・指標などのネットワーク取得
+  scrape  : HTML からの値の抽出
+  sheets  : Google Sheets の呼び出し
+  compute : 計算段階（スナップショットの組み立て・売却目標の推定など）
+  cache   : キャッシュのヒット / ミス
+
+使い方:
+  import perf
+
+  log = perf.get_logger(__name__)
+
+  with perf.timed("fetch", "yfinance.download", tickers=3):
+      ...
+
+  @perf.timed("compute", "estimate_targets")
+  def estimate_targets(...): ...
+
+  perf.cache_event("fundamentals", hit=True)
+
+  render = perf.mark()
+  ...
+  perf.slowest(render), perf.cache_stats(render)
+
+  # 描画中に別スレッドで実行する処理は perf.in_render で包むと同じ描画として記録される
+  executor.submit(perf.in_render(fetch), ...)
+================================================
+"""
+
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+# 構造化ログの出力先（JSON Lines。サイズで切り替え）
+PERF_LOG = "perf.log"
+PERF_LOG_BYTES = 5_000_000
+PERF_LOG_BACKUPS = 3
+
+# プロセス内に保持する記録の件数（パネル表示用）
+MAX_EVENTS = 2000
+
+LOGGER_NAME = "dashboard"
+
+_lock = threading.Lock()
+_events = deque(maxlen=MAX_EVENTS)
+_local = threading.local()
+_configured = False
+
+# 現在の描画の ID（mark で設定。スレッドプールには in_render で引き継ぐ）
+_render = contextvars.ContextVar("perf_render", default=None)
+_render_ids = itertools.count(1)
+
+
+# ==========================================
+# 構造化ログ
+# ==========================================
+
+class JsonFormatter(logging.Formatter):
+    """1レコード = 1行の JSON（record の event 属性はそのまま展開）"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "event", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(path=PERF_LOG):
+    """ログの出力先を設定する（プロセス内で1回だけ。get_logger から自動で呼ばれる）"""
+    global _configured
+    with _lock:
+        if _configured:
+            return
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+        file_handler = RotatingFileHandler(
+            path, maxBytes=PERF_LOG_BYTES, backupCount=PERF_LOG_BACKUPS,
+            encoding="utf-8", delay=True,
+        )
+        file_handler.setFormatter(JsonFormatter())
+        logger.addHandler(file_handler)
+
+        # コンソールには従来の print と同じく警告・エラーの文面だけを出す
+        console = logging.StreamHandler()
+        console.setLevel(logging.WARNING)
+        console.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(console)
+        _configured = True
+
+
+def get_logger(name):
+    """モジュール用のロガー（dashboard.<モジュール名>）"""
+    configure_logging()
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+_log = get_logger("perf")
+
+
+# ==========================================
+# 記録
+# ==========================================
+
+def record(category, name, ms, ok=True, **fields):
+    """1件の計測を記録してログに出す"""
+    event = {
+        "ts": time.time(),
+        "category": category,
+        "name": name,
+        "ms": round(ms, 2),
+        "ok": ok,
+        "thread": threading.current_thread().name,
+        "render": _render.get(),
+        **fields,
+    }
+    with _lock:
+        _events.append(event)
+    _log.info(f"{category} {name}", extra={"event": event})
+
+
+class timed:
+    """
+    所要時間を記録するコンテキストマネージャ / デコレータ
+
+    例外が発生した場合は ok=False と error を記録し、例外はそのまま送出する。
+    with ブロック内で set(件数=...) を呼ぶと記録に項目を追加できる。
+    """
+
+    def __init__(self, category, name, **fields):
+        self.category = category
+        self.name = name
+        self.fields = fields
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        fields = dict(self.fields)
+        if exc is not None:
+            fields["error"] = f"{exc_type.__name__}: {exc}"
+        record(self.category, self.name, (time.perf_counter() - self.started) * 1000,
+               ok=exc is None, **fields)
+        return False
+
+    def __call__(self, func):
+        # 呼び出しごとに別インスタンス（複数スレッドから同時に呼ばれても混ざらない）
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.category, self.name, **self.fields):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def cache_event(cache, hit, **fields):
+    """キャッシュのヒット / ミスを記録"""
+    record("cache", cache, 0.0, hit=bool(hit), **fields)
+
+
+def cache_miss():
+    """memoize された関数の本体から呼ぶ（cached_call がミスとして記録する）"""
+    _local.missed = True
+
+
+def cached_call(cache, func, *args, **kwargs):
+    """
+    st.cache_data などで memoize された func を呼び、ヒット / ミスを記録する
+
+    func の本体で cache_miss() を呼んでおくと、本体が実行されたときだけミスになる。
+    本体の中で別の cached_call を呼んでも外側の判定は変わらない。
+    """
+    outer = getattr(_local, "missed", False)
+    _local.missed = False
+    try:
+        result = func(*args, **kwargs)
+        missed = _local.missed
+    finally:
+        _local.missed = outer
+    cache_event(cache, hit=not missed)
+    return result
+
+
+def mark():
+    """
+    新しい描画を開始し、その ID を返す（events / slowest などの render に渡す）
+
+    以降このスレッド（コンテキスト）で記録したものにこの ID が付く。
+    """
+    render = next(_render_ids)
+    _render.set(render)
+    return render
+
+
+def in_render(func):
+    """func を呼び出し元の描画の記録として実行するラッパー（スレッドプールに渡す用）"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+# ==========================================
+# 集計
+# ==========================================
+
+def events(render=None, category=None):
+    """描画 render（mark の戻り値）の記録（古い順）。render=None なら保持しているすべて"""
+    with _lock:
+        return [
+            e for e in _events
+            if (render is None or e["render"] == render)
+            and (category is None or e["category"] == category)
+        ]
+
+
+def slowest(render=None, limit=15):
+    """計測（キャッシュ記録を除く）を所要時間の長い順に"""
+    timings = [e for e in events(render) if e["category"] != "cache"]
+    return sorted(timings, key=lambda e: -e["ms"])[:limit]
+
+
+def stage_totals(render=None):
+    """分類ごとの {category: {'count', 'ms', 'errors'}}"""
+    totals = {}
+    for e in events(render):
+        if e["category"] == "cache":
+            continue
+        entry = totals.setdefault(e["category"], {"count": 0, "ms": 0.0, "errors": 0})
+        entry["count"] += 1
+        entry["ms"] += e["ms"]
+        entry["errors"] += not e["ok"]
+    return totals
+
+
+def cache_stats(render=None):
+    """キャッシュごとの {cache: {'hits', 'misses', 'hit_rate'}}（hit_rate は%）"""
+    stats = {}
+    for e in events(render, category="cache"):
+        entry = stats.setdefault(e["name"], {"hits": 0, "misses": 0})
+        entry["hits" if e["hit"] else "misses"] += 1
+    for entry in stats.values():
+        entry["hit_rate"] = entry["hits"] / (entry["hits"] + entry["misses"]) * 100
+    return stats
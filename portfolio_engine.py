@@ -0,0 +1,657 @@
+"""
+================================================
+ポートフォリオ計算エンジン（Streamlit 非依存）
+================================================
+機能:
+  - 保有銘柄・現在価格・損益・売却シグナル・売却目標価格・警戒レベルを
+    まとめて計算し、1つの不変スナップショット（PortfolioSnapshot）を返す
+  - ダッシュボードはこのスナップショットを表示するだけ
+  - CLI から同じスナップショットをテキスト / JSON で出力できる
+
+使い方:
+  from portfolio_engine import PortfolioEngine
+
+  snapshot = PortfolioEngine(buffett_indicator=200, cash_reserve=100000).build()
+  print(snapshot.totals.total_value, snapshot.danger_level)
+
+  python portfolio_engine.py --buffett 200 --cash 100000
+  python portfolio_engine.py --buffett 200 --cash 100000 --json > snapshot.json
+================================================
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import perf
+from history_store import get_close_matrix
+from macro_snapshot import MacroSnapshot, fetch_macro_snapshot
+from macro_valuation import get_shiller_snapshot
+
+# たーちゃん哲学2.0 - 売却目標価格自動推定
+try:
+    from auto_per_estimator import get_target_prices_auto
+    TARGET_PRICES_AVAILABLE = True
+except ImportError:
+    TARGET_PRICES_AVAILABLE = False
+
+# FANG+ 管理モジュール
+try:
+    from fang_manager import calc_fang_summary
+    FANG_MODULE_OK = True
+except ImportError:
+    FANG_MODULE_OK = False
+
+# 保有銘柄のローカルファイル（Google Sheets URL 未設定時）
+LOCAL_CSV_PATH = "/Users/carlos/PyCharmMiscProject/株スクリーニング完成版/portfolio_data/purchased_stocks.csv"
+
+# 長期配当ホールド銘柄（売却目標の表示から既定で除外: NTT）
+LONG_TERM_HOLD_CODES = ('9432',)
+
+# 売却シグナルの閾値
+LOSS_CUT_PCT = -30
+TAKE_PROFIT_PCT = 30
+BIG_MOVE_PCT = 5
+
+# シラーPERの全期間（1871年〜・月次）パーセンタイル → 割高度
+# （旧来の固定水準 25 / 30 / 35倍 が概ね 80 / 93 / 97% に相当）
+SHILLER_PERCENTILE_LEVELS = ((97, 3), (93, 2), (80, 1))
+
+log = perf.get_logger(__name__)
+
+
+# ==========================================
+# スナップショット
+# ==========================================
+
+@dataclass(frozen=True)
+class Holding:
+    code: str
+    name: str
+    purchase_price: float
+    shares: float
+    purchase_date: str
+    purchase_per: float
+    current_price: float  # 取得できなければ購入価格
+    change_pct: float
+    cost: float
+    value: float
+    profit: float
+    profit_pct: float
+
+
+@dataclass(frozen=True)
+class FangPosition:
+    investment: float = 0.0
+    units: float = 0.0
+    avg_cost: float = 0.0
+    current_price: float = 0.0
+    value: float = 0.0
+    profit: float = 0.0
+    profit_pct: float = 0.0
+    price_source: str = "取得失敗"
+
+
+@dataclass(frozen=True)
+class PortfolioTotals:
+    fang: FangPosition
+    cyclical_cost: float
+    cyclical_value: float
+    cyclical_profit: float
+    cyclical_profit_pct: float
+    cash: float
+    total_investment: float
+    total_value: float
+    total_profit: float
+    total_profit_pct: float
+
+
+@dataclass(frozen=True)
+class SellSignal:
+    label: str  # "コード 銘柄名"
+    strength: int
+    reason: str
+    profit_pct: float
+
+
+@dataclass(frozen=True)
+class TargetEstimate:
+    code: str
+    name: str
+    current_price: float
+    per: float = 0.0  # 0 なら PER/EPS 不明で推定できない
+    eps: float = 0.0
+    result: dict = None  # get_target_prices_auto の戻り値
+    error: str = None
+
+
+@dataclass(frozen=True)
+class PortfolioSnapshot:
+    holdings: tuple
+    totals: PortfolioTotals
+    signals: tuple  # シグナル強度の高い順
+    targets: tuple  # 全保有銘柄（長期ホールド銘柄を含む。with_targets=False なら空）
+    targets_available: bool
+    macro: MacroSnapshot
+    shiller: dict
+    buffett_indicator: float
+    danger_level: int
+    holdings_source: str  # "google_sheets" / "local" / "none"
+    messages: tuple = ()  # 読込時の警告など
+    built_at: datetime = None
+
+    def to_dict(self):
+        """JSON 出力用の dict"""
+        return asdict(self)
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), ensure_ascii=False, default=_json_default, **kwargs)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return value.isoformat()
+    return str(value)
+
+
+# ==========================================
+# 計算部品
+# ==========================================
+
+def load_holdings(sheets_url="", local_csv_path=LOCAL_CSV_PATH):
+    """
+    シクリカル株の保有データを読み込み、銘柄ごとに集約
+
+    Returns:
+        (DataFrame, 読込元, 警告メッセージのリスト)
+        DataFrame: columns=['銘柄コード', '銘柄名', '購入価格', '購入株数', '購入日', '購入時PER']
+    """
+    df = pd.DataFrame()
+    source = "none"
+    messages = []
+
+    # 優先順位1: Google Sheets URL
+    if sheets_url:
+        try:
+            with perf.timed("sheets", "sheets.read_csv"):
+                df = pd.read_csv(sheets_url)
+            source = "google_sheets"
+        except Exception as e:
+            messages.append(f"Google Sheets 読込失敗: {e}")
+
+    # 優先順位2: ローカルファイル
+    if df.empty and local_csv_path and os.path.exists(local_csv_path):
+        try:
+            df = pd.read_csv(local_csv_path, encoding='utf-8-sig')
+            source = "local"
+        except Exception as e:
+            log.warning(f"ローカルファイル読み込みエラー: {e}")
+
+    # データ集約処理（同じ銘柄の複数購入記録を1回のgroupbyで集約）
+    if not df.empty and '銘柄コード' in df.columns:
+        shares = pd.to_numeric(df['購入株数'], errors='coerce').fillna(0)
+        cost = shares * pd.to_numeric(df['購入単価'], errors='coerce').fillna(0)
+
+        # 購入時PERの加重平均（EPSを逆算するために保持）。PERが正の記録のみ対象
+        if '購入時PER' in df.columns:
+            purchase_per = pd.to_numeric(df['購入時PER'], errors='coerce')
+            per_weight = cost.where(purchase_per > 0, 0)
+            weighted_per = (per_weight * purchase_per).where(purchase_per > 0, 0)
+        else:
+            per_weight = weighted_per = pd.Series(0.0, index=df.index)
+
+        grouped = pd.DataFrame({
+            '銘柄コード': df['銘柄コード'],
+            '企業名': df['企業名'],
+            '購入日': df['購入日'],
+            'shares': shares,
+            'cost': cost,
+            'per_weight': per_weight,
+            'weighted_per': weighted_per,
+        }).groupby('銘柄コード', sort=False).agg(
+            銘柄名=('企業名', 'first'),
+            購入株数=('shares', 'sum'),
+            total_cost=('cost', 'sum'),
+            購入日=('購入日', 'min'),
+            per_weight=('per_weight', 'sum'),
+            weighted_per=('weighted_per', 'sum'),
+        )
+
+        # 平均取得単価（加重平均）
+        grouped['購入価格'] = (grouped['total_cost'] / grouped['購入株数']).where(grouped['購入株数'] > 0, 0)
+        grouped['購入時PER'] = (grouped['weighted_per'] / grouped['per_weight']).where(grouped['per_weight'] > 0, 0)
+
+        holdings = grouped.reset_index()[['銘柄コード', '銘柄名', '購入価格', '購入株数', '購入日', '購入時PER']]
+        return holdings, source, messages
+
+    empty = pd.DataFrame({
+        '銘柄コード': [],
+        '銘柄名': [],
+        '購入価格': [],
+        '購入株数': [],
+        '購入日': [],
+        '購入時PER': [],
+    })
+    return empty, "none", messages
+
+
+def fetch_portfolio_prices(codes):
+    """
+    保有銘柄の現在価格を一括取得
+
+    Args:
+        codes: 銘柄コードのタプル（例: ('9127', '1848')）
+
+    Returns:
+        DataFrame: index=銘柄コード, columns=['price', 'change_pct']
+                   取得失敗した銘柄は price=0, change_pct=0
+    """
+    codes = list(dict.fromkeys(str(c) for c in codes))
+    prices = pd.DataFrame(
+        {'price': 0.0, 'change_pct': 0.0},
+        index=pd.Index(codes, name='銘柄コード')
+    )
+    if not codes:
+        return prices
+
+    tickers = [f"{code}.T" for code in codes]
+    try:
+        close = get_close_matrix(tickers, period="5d")
+        close.columns = codes
+    except Exception:
+        return prices
+
+    # 銘柄ごとの最新終値・前日終値（休場日などの欠損は飛ばす）
+    valid = close.notna()
+    rank_from_end = valid[::-1].cumsum()[::-1]
+    current = close.where(valid & (rank_from_end == 1)).max()
+    prev = close.where(valid & (rank_from_end == 2)).max().fillna(current)
+    change_pct = ((current - prev) / prev * 100).where(prev > 0, 0.0)
+
+    prices['price'] = current.fillna(0.0)
+    prices['change_pct'] = change_pct.fillna(0.0)
+    return prices
+
+
+def score_simple_sell_signals(holdings, prices):
+    """
+    簡易売却シグナル（損益率・前日比）を全銘柄まとめて判定
+
+    Args:
+        holdings: load_holdings の戻り値の DataFrame
+        prices: fetch_portfolio_prices の戻り値
+
+    Returns:
+        DataFrame: シグナルのある銘柄のみ（シグナル強度の高い順）
+                   columns=['銘柄', 'シグナル強度', '理由', '損益率']（損益率は%の数値）
+    """
+    codes = holdings['銘柄コード'].astype(str)
+    quotes = prices.reindex(codes)
+    purchase_price = holdings['購入価格'].astype(float).to_numpy()
+    shares = holdings['購入株数'].astype(float).to_numpy()
+    price = quotes['price'].fillna(0).to_numpy()
+    change_pct = quotes['change_pct'].fillna(0).to_numpy()
+
+    cost = purchase_price * shares
+    current_price = np.where(price > 0, price, purchase_price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profit_pct = np.where(cost > 0, (current_price * shares - cost) / cost * 100, 0.0)
+
+    # 損益率チェック
+    is_loss_cut = profit_pct <= LOSS_CUT_PCT
+    is_take_profit = ~is_loss_cut & (profit_pct >= TAKE_PROFIT_PCT)
+    profit_level = np.select([is_loss_cut, is_take_profit], [3, 2], default=0)
+    profit_reason = np.select(
+        [is_loss_cut, is_take_profit],
+        ["⚠️ 損切りライン（-30%以下）", "💰 利益確定ライン（+30%以上）"],
+        default=""
+    )
+
+    # 変動率チェック
+    is_big_move = np.abs(change_pct) > BIG_MOVE_PCT
+    move_level = np.where(is_big_move, 1, 0)
+    move_reason = np.where(
+        is_big_move,
+        "📈 大幅変動（" + pd.Series(change_pct).map('{:+.2f}'.format).to_numpy(dtype=object) + "%）",
+        ""
+    )
+
+    separator = np.where((profit_reason != "") & (move_reason != ""), " / ", "")
+    signal_df = pd.DataFrame({
+        '銘柄': (codes + " " + holdings['銘柄名'].astype(str)).to_numpy(),
+        'シグナル強度': profit_level + move_level,
+        '理由': profit_reason.astype(object) + separator + move_reason.astype(object),
+        '損益率': profit_pct,
+    })
+    signal_df = signal_df[signal_df['シグナル強度'] > 0]
+    return signal_df.sort_values('シグナル強度', ascending=False)
+
+
+def calculate_danger_level(buffett, yield_spread, vix, shiller_percentile=None):
+    """
+    総合危険度計算（0〜9）
+
+    バリュエーションはバフェット指数とシラーPER（取得できた場合）の
+    割高度の高い方を採用する。シラーPERは固定の倍率ではなく
+    履歴上のパーセンタイル（macro_valuation の 'percentile'）で評価する。
+    """
+    danger = 0
+
+    # イールドカーブ
+    if yield_spread < -0.5:
+        danger += 3
+    elif yield_spread < 0:
+        danger += 2
+
+    # VIX
+    if vix > 30:
+        danger += 3
+    elif vix > 25:
+        danger += 2
+    elif vix > 20:
+        danger += 1
+
+    # バフェット指数
+    if buffett > 200:
+        valuation = 3
+    elif buffett > 180:
+        valuation = 2
+    elif buffett > 150:
+        valuation = 1
+    else:
+        valuation = 0
+
+    # シラーPER（履歴上のパーセンタイル）
+    if shiller_percentile is not None:
+        for threshold, level in SHILLER_PERCENTILE_LEVELS:
+            if shiller_percentile > threshold:
+                valuation = max(valuation, level)
+                break
+
+    return danger + valuation
+
+
+@perf.timed("compute", "engine.estimate_targets")
+def estimate_targets(holdings, progress=None):
+    """
+    保有銘柄ごとの売却目標価格（購入時PERからEPSを逆算して推定）
+
+    Args:
+        holdings: Holding のタプル
+        progress: 1銘柄ごとに呼ぶ関数 progress(完了数, 全体数, 銘柄名)（任意）
+
+    Returns:
+        TargetEstimate のタプル（auto_per_estimator が無ければ空）
+    """
+    if not TARGET_PRICES_AVAILABLE:
+        return ()
+    targets = []
+    for i, h in enumerate(holdings):
+        if progress:
+            progress(i + 1, len(holdings), h.name)
+
+        # PER / EPS（購入時PERとEPS逆算方式）
+        if h.purchase_per > 0 and h.purchase_price > 0:
+            # EPS = 購入単価 ÷ 購入時PER
+            eps = round(h.purchase_price / h.purchase_per, 2)
+            # 現在PER = 現在株価 ÷ EPS
+            per = round(h.current_price / eps, 2) if eps > 0 else 0
+        else:
+            per, eps = 0, 0
+
+        estimate = TargetEstimate(code=h.code, name=h.name, current_price=h.current_price)
+        if per > 0 and eps > 0:
+            try:
+                result = get_target_prices_auto(h.code, h.current_price, per, eps, h.name)
+                estimate = TargetEstimate(h.code, h.name, h.current_price, per, eps, result=result)
+            except Exception as e:
+                estimate = TargetEstimate(h.code, h.name, h.current_price, per, eps, error=str(e))
+        targets.append(estimate)
+    return tuple(targets)
+
+
+def _fang_position(summary):
+    """calc_fang_summary の戻り値 → FangPosition"""
+    if not summary:
+        return FangPosition()
+    return FangPosition(
+        investment=float(summary.get("total_investment", 0.0)),
+        units=float(summary.get("total_units", 0.0)),
+        avg_cost=float(summary.get("avg_cost", 0.0)),
+        current_price=float(summary.get("current_price", 0.0)),
+        value=float(summary.get("current_value", 0.0)),
+        profit=float(summary.get("profit", 0.0)),
+        profit_pct=float(summary.get("profit_pct", 0.0)),
+        price_source=summary.get("price_source", "取得失敗"),
+    )
+
+
+def _pct(profit, base):
+    return profit / base * 100 if base > 0 else 0.0
+
+
+# ==========================================
+# エンジン
+# ==========================================
+
+class PortfolioEngine:
+    """
+    入力（手動入力値・データ取得関数）からスナップショットを組み立てる
+
+    取得関数は差し替え可能（ダッシュボードは st.cache_data 付きの関数を渡す）。
+
+    Args:
+        buffett_indicator: バフェット指数（%）
+        cash_reserve: 待機資金（円）
+        fang_price: FANG+の基準価額（0 なら fang_manager で取得）
+        fang_summary: 計算済みの calc_fang_summary の戻り値（指定時は fang_price より優先）
+        sheets_url: 保有銘柄の Google Sheets CSV URL
+        price_loader: 銘柄コードのタプル → fetch_portfolio_prices と同じ DataFrame
+        macro_loader: () → MacroSnapshot
+        shiller_loader: () → get_shiller_snapshot と同じ dict
+    """
+
+    def __init__(self, buffett_indicator, cash_reserve, fang_price=0.0, fang_summary=None,
+                 sheets_url="", local_csv_path=LOCAL_CSV_PATH,
+                 price_loader=fetch_portfolio_prices, macro_loader=fetch_macro_snapshot,
+                 shiller_loader=get_shiller_snapshot):
+        self.buffett_indicator = float(buffett_indicator)
+        self.cash_reserve = float(cash_reserve)
+        self.fang_price = float(fang_price)
+        self.fang_summary = fang_summary
+        self.sheets_url = sheets_url
+        self.local_csv_path = local_csv_path
+        self.price_loader = price_loader
+        self.macro_loader = macro_loader
+        self.shiller_loader = shiller_loader
+
+    def cache_key(self):
+        """入力値（手動入力・読込元）から作るキー。保存済みスナップショットの照合に使う"""
+        fang = asdict(_fang_position(self.fang_summary)) if self.fang_summary is not None else None
+        inputs = [self.buffett_indicator, self.cash_reserve, self.fang_price, fang,
+                  self.sheets_url, self.local_csv_path]
+        return hashlib.sha1(json.dumps(inputs, default=_json_default).encode()).hexdigest()
+
+    def build(self, progress=None, with_targets=True):
+        """
+        スナップショットを計算
+
+        Args:
+            progress: 売却目標の計算中に呼ぶ関数 progress(完了数, 全体数, 銘柄名)（任意）
+            with_targets: False なら売却目標を計算しない（targets は空。
+                          表示側で estimate_targets を必要なときだけ呼ぶ）
+        """
+        # 段階ごとの所要時間を perf に記録（取得関数内の通信は fetch として別に記録される）
+        with perf.timed("compute", "engine.load_holdings"):
+            holdings_df, source, messages = load_holdings(self.sheets_url, self.local_csv_path)
+        with perf.timed("compute", "engine.prices", codes=len(holdings_df)):
+            prices = self.price_loader(tuple(holdings_df['銘柄コード'].astype(str)))
+
+        with perf.timed("compute", "engine.holdings_signals"):
+            holdings = self._holdings(holdings_df, prices)
+            signal_df = score_simple_sell_signals(holdings_df, prices) if holdings else pd.DataFrame()
+            signals = tuple(
+                SellSignal(label=row['銘柄'], strength=int(row['シグナル強度']),
+                           reason=row['理由'], profit_pct=float(row['損益率']))
+                for _, row in signal_df.iterrows()
+            )
+
+        with perf.timed("compute", "engine.macro"):
+            macro = self.macro_loader()
+        with perf.timed("compute", "engine.shiller"):
+            shiller = self.shiller_loader()
+        danger_level = calculate_danger_level(
+            self.buffett_indicator, macro.bonds.spread, macro.vix.current,
+            shiller_percentile=shiller.get('percentile'),
+        )
+        with perf.timed("compute", "engine.totals"):
+            totals = self._totals(holdings)
+
+        return PortfolioSnapshot(
+            holdings=holdings,
+            totals=totals,
+            signals=signals,
+            targets=estimate_targets(holdings, progress) if with_targets else (),
+            targets_available=TARGET_PRICES_AVAILABLE,
+            macro=macro,
+            shiller=dict(shiller),
+            buffett_indicator=self.buffett_indicator,
+            danger_level=danger_level,
+            holdings_source=source,
+            messages=tuple(messages),
+            built_at=datetime.now(),
+        )
+
+    def _holdings(self, holdings_df, prices):
+        rows = []
+        for row in holdings_df.itertuples(index=False):
+            code = str(row.銘柄コード)
+            purchase_price = float(row.購入価格)
+            shares = float(row.購入株数)
+            quote = prices.loc[code] if code in prices.index else {'price': 0.0, 'change_pct': 0.0}
+            current_price = float(quote['price']) if quote['price'] > 0 else purchase_price
+            cost = purchase_price * shares
+            value = current_price * shares
+            rows.append(Holding(
+                code=code,
+                name=str(row.銘柄名),
+                purchase_price=purchase_price,
+                shares=shares,
+                purchase_date=str(row.購入日),
+                purchase_per=float(row.購入時PER) if pd.notna(row.購入時PER) else 0.0,
+                current_price=current_price,
+                change_pct=float(quote['change_pct']),
+                cost=cost,
+                value=value,
+                profit=value - cost,
+                profit_pct=_pct(value - cost, cost),
+            ))
+        return tuple(rows)
+
+    def _fang(self):
+        if self.fang_summary is not None:
+            return _fang_position(self.fang_summary)
+        if FANG_MODULE_OK:
+            return _fang_position(calc_fang_summary(current_price=self.fang_price))
+        return FangPosition()
+
+    def _totals(self, holdings):
+        fang = self._fang()
+        cyclical_cost = sum(h.cost for h in holdings)
+        # 現在価格が取れない銘柄は取得額で評価（Holding.current_price が購入価格）
+        cyclical_value = sum(h.value for h in holdings)
+        total_investment = fang.investment + cyclical_cost + self.cash_reserve
+        total_value = fang.value + cyclical_value + self.cash_reserve
+        return PortfolioTotals(
+            fang=fang,
+            cyclical_cost=cyclical_cost,
+            cyclical_value=cyclical_value,
+            cyclical_profit=cyclical_value - cyclical_cost,
+            cyclical_profit_pct=_pct(cyclical_value - cyclical_cost, cyclical_cost),
+            cash=self.cash_reserve,
+            total_investment=total_investment,
+            total_value=total_value,
+            total_profit=total_value - total_investment,
+            total_profit_pct=_pct(total_value - total_investment, total_investment),
+        )
+
+
+# ==========================================
+# CLI
+# ==========================================
+
+def _print_summary(snapshot, elapsed):
+    totals = snapshot.totals
+    print("=" * 60)
+    print(f"📊 ポートフォリオ スナップショット（{snapshot.built_at:%Y-%m-%d %H:%M:%S}・{elapsed:.2f}秒）")
+    print("=" * 60)
+    print(f"💰 合計資産:     ¥{totals.total_value:,.0f}  "
+          f"({totals.total_profit:+,.0f} / {totals.total_profit_pct:+.2f}%)")
+    print(f"💎 FANG+:        ¥{totals.fang.value:,.0f}  ({totals.fang.profit_pct:+.2f}%)")
+    print(f"📊 シクリカル株: ¥{totals.cyclical_value:,.0f}  ({totals.cyclical_profit_pct:+.2f}%)")
+    print(f"💵 現金:         ¥{totals.cash:,.0f}")
+
+    print(f"\n保有銘柄（{len(snapshot.holdings)}件・読込元: {snapshot.holdings_source}）")
+    for h in snapshot.holdings:
+        print(f"  {h.code} {h.name:<12} ¥{h.current_price:>10,.0f}  {h.profit_pct:+7.2f}%")
+
+    print("\n🚨 売却シグナル")
+    for s in snapshot.signals:
+        print(f"  [{s.strength}] {s.label}: {s.reason}")
+    if not snapshot.signals:
+        print("  なし")
+
+    print("\n🎯 売却目標（保守的）")
+    for t in snapshot.targets:
+        if t.result:
+            target = t.result['targets'][0]
+            print(f"  {t.code} {t.name:<12} ¥{target['price']:>10,.0f}  (+{target['return_pct']}%)")
+
+    shiller = snapshot.shiller.get('value')
+    percentile = snapshot.shiller.get('percentile')
+    if shiller is None:
+        shiller_text = "-"
+    elif percentile is None:
+        shiller_text = f"{shiller:.1f}"
+    else:
+        shiller_text = f"{shiller:.1f}（{percentile:.0f}%）"
+    print(f"\n⚠️ 警戒レベル: {snapshot.danger_level} / 9"
+          f"（VIX {snapshot.macro.vix.current:.2f}・イールドカーブ {snapshot.macro.bonds.spread:+.2f}%"
+          f"・シラーPER {shiller_text}）")
+    for message in snapshot.messages:
+        print(f"⚠️ {message}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ポートフォリオ スナップショットを計算")
+    parser.add_argument("--buffett", type=float, default=200.0, help="バフェット指数（%%）")
+    parser.add_argument("--cash", type=float, default=100000, help="待機資金（円）")
+    parser.add_argument("--fang-price", type=float, default=0.0, help="FANG+基準価額（省略時は自動取得）")
+    parser.add_argument("--sheets-url", default="", help="保有銘柄の Google Sheets CSV URL")
+    parser.add_argument("--csv", default=LOCAL_CSV_PATH, help="保有銘柄のローカルCSV")
+    parser.add_argument("--json", action="store_true", help="JSON で出力")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    snapshot = PortfolioEngine(
+        buffett_indicator=args.buffett,
+        cash_reserve=args.cash,
+        fang_price=args.fang_price,
+        sheets_url=args.sheets_url,
+        local_csv_path=args.csv,
+    ).build()
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(snapshot.to_json(indent=2))
+    else:
+        _print_summary(snapshot, elapsed)
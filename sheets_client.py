@@ -0,0 +1,111 @@
+"""
+================================================
+Google Sheets 共有クライアント
+================================================
+機能:
+  - gspreadクライアントをプロセス内で1つだけ作成して使い回す
+  - アクセストークンが期限切れなら使用前に更新
+  - スプレッドシート・ワークシートのハンドルをシート名ごとにキャッシュ
+
+使い方:
+  from sheets_client import get_worksheet
+
+  ws = get_worksheet("purchased_stocks")          # なければ None / 例外
+  ws = get_worksheet("fang_purchases", header=[...], cols=6)  # なければ作成
+
+Streamlit Secretsに [gcp_service_account] が必要
+（gspread / google-auth は最初に接続するときに読み込む）
+================================================
+"""
+
+import threading
+
+import perf
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+SPREADSHEET_ID = "1-ioGOVA9KUKYqOTuDo9s8jP1O_XTiOJLQNgnf3D08n8"
+
+_lock = threading.RLock()
+_credentials = None
+_client = None
+_spreadsheet = None
+_worksheets = {}
+
+
+def get_client():
+    """共有gspreadクライアントを返す（トークンは必要に応じて更新）。失敗時はNone。"""
+    global _credentials, _client
+    with _lock:
+        try:
+            import gspread
+            from google.auth.transport.requests import Request
+            from google.oauth2.service_account import Credentials
+
+            if _client is None:
+                import streamlit as st
+                with perf.timed("sheets", "sheets.authorize"):
+                    _credentials = Credentials.from_service_account_info(
+                        st.secrets["gcp_service_account"], scopes=SCOPES
+                    )
+                    _client = gspread.authorize(_credentials)
+            if not _credentials.valid:
+                with perf.timed("sheets", "sheets.refresh_token"):
+                    _credentials.refresh(Request())
+            return _client
+        except Exception:
+            reset()
+            return None
+
+
+def get_worksheet(sheet_name, header=None, cols=None):
+    """
+    ワークシートのハンドルを返す（2回目以降はキャッシュ）
+
+    Args:
+        sheet_name: シート名
+        header: 指定時、シートがなければこの見出し行で作成
+        cols: 作成時の列数（省略時は見出しの列数）
+
+    Returns:
+        gspread.Worksheet。認証できなければNone。
+        シートがなく header も未指定なら gspread.WorksheetNotFound
+    """
+    global _spreadsheet
+    import gspread
+
+    with _lock:
+        client = get_client()
+        if client is None:
+            return None
+        perf.cache_event("sheets_worksheet", hit=sheet_name in _worksheets)
+        if sheet_name in _worksheets:
+            return _worksheets[sheet_name]
+
+        with perf.timed("sheets", "sheets.open_worksheet", sheet=sheet_name):
+            if _spreadsheet is None:
+                _spreadsheet = client.open_by_key(SPREADSHEET_ID)
+            try:
+                ws = _spreadsheet.worksheet(sheet_name)
+            except gspread.WorksheetNotFound:
+                if header is None:
+                    raise
+                ws = _spreadsheet.add_worksheet(
+                    title=sheet_name, rows=1000, cols=cols or len(header)
+                )
+                ws.append_row(header)
+        _worksheets[sheet_name] = ws
+        return ws
+
+
+def reset():
+    """キャッシュしたクライアント・ハンドルを破棄（次回呼び出しで再接続）"""
+    global _credentials, _client, _spreadsheet
+    with _lock:
+        _credentials = None
+        _client = None
+        _spreadsheet = None
+        _worksheets.clear()
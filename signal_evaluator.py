@@ -22,13 +22,36 @@
   print(result['signal_strength'])  # 0-10
   print(result['overall'])          # "問題なし" など
   print(result['action'])           # 推奨アクション
+
+使い方（保有銘柄をまとめて判定）:
+  from signal_evaluator import evaluate_portfolio_signals
+
+  results = evaluate_portfolio_signals([
+      {'ticker_code': "9127", 'purchase_price': 2870, 'purchase_date': "2025-11-05",
+       'shares': 100, 'industry': "海運業", 'purchase_roe': 18.5},
+      ...
+  ])
+  print(results["9127"]['overall'])
 ================================================
 """
 
+import re
+
+import numpy as np
 import yfinance as yf
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import perf
+from fundamentals_cache import get_cached
+
+
+# 一括判定時の同時取得数（Yahoo Financeへの同時接続上限）
+MAX_WORKERS = 8
+
+log = perf.get_logger(__name__)
+
 
 # ==========================================
 # ユーティリティ関数
@@ -55,36 +78,86 @@ def safe_float(value, default=None):
     return default
 
 
+CYCLICAL_KEYWORDS = [
+    '海運業', '鉄鋼', '非鉄金属', '石油・石炭製品',
+    '化学', '機械', '電気機器', '輸送用機器',
+    '建設業', '金属製品', 'ゴム製品', 'ガラス・土石製品',
+    '鉱業', '陸運業', '空運業', 'パルプ・紙'
+]
+
+
 def check_cyclical_industry(industry):
     """シクリカル業種判定"""
     if pd.isna(industry):
         return False
     
-    cyclical_keywords = [
-        '海運業', '鉄鋼', '非鉄金属', '石油・石炭製品',
-        '化学', '機械', '電気機器', '輸送用機器',
-        '建設業', '金属製品', 'ゴム製品', 'ガラス・土石製品',
-        '鉱業', '陸運業', '空運業', 'パルプ・紙'
-    ]
-    return any(keyword in str(industry) for keyword in cyclical_keywords)
+    return any(keyword in str(industry) for keyword in CYCLICAL_KEYWORDS)
 
 
 # ==========================================
 # 財務データ取得
 # ==========================================
 
+def _fetch_quote(stock):
+    """現在株価（有効期限: 分単位）"""
+    return {'currentPrice': safe_float(stock.fast_info['lastPrice'])}
+
+
+def _fetch_ratios(stock):
+    """バリュエーション指標（有効期限: 1日）"""
+    info = stock.info
+    return {
+        key: safe_float(info.get(key))
+        for key in (
+            'fiftyTwoWeekHigh', 'fiftyTwoWeekLow', 'trailingPE', 'priceToBook',
+            'returnOnEquity', 'dividendYield', 'marketCap',
+        )
+    }
+
+
+def _fetch_statements(stock):
+    """年次決算の必要項目（有効期限: 次回決算の反映予定日まで）"""
+    balance_sheet = stock.balance_sheet
+    income_stmt = stock.income_stmt
+    statements = {'period_end': None, 'has_balance_sheet': False, 'has_income_growth': False}
+
+    if not balance_sheet.empty and len(balance_sheet.columns) > 0:
+        latest_bs = balance_sheet.iloc[:, 0]
+        statements['has_balance_sheet'] = True
+        statements['period_end'] = pd.Timestamp(balance_sheet.columns[0]).strftime('%Y-%m-%d')
+        statements['total_assets'] = safe_float(latest_bs.get('Total Assets'))
+        statements['total_equity'] = safe_float(latest_bs.get('Stockholders Equity'))
+
+    if not income_stmt.empty and len(income_stmt.columns) > 1:
+        latest_income = income_stmt.iloc[:, 0]
+        prev_income = income_stmt.iloc[:, 1]
+        statements['has_income_growth'] = True
+        statements['period_end'] = pd.Timestamp(income_stmt.columns[0]).strftime('%Y-%m-%d')
+        statements['revenue'] = safe_float(latest_income.get('Total Revenue'))
+        statements['operating_income'] = safe_float(latest_income.get('Operating Income'))
+        statements['prev_revenue'] = safe_float(prev_income.get('Total Revenue'))
+        statements['prev_operating_income'] = safe_float(prev_income.get('Operating Income'))
+
+    return statements
+
+
 def get_stock_data(ticker_code):
-    """株価・財務データを取得"""
+    """
+    株価・財務データを取得
+
+    現在株価・指標・決算書を有効期限クラス別にキャッシュし（fundamentals_cache）、
+    期限切れの部分だけを再取得する。
+    """
     ticker = f"{ticker_code}.T"
     stock = yf.Ticker(ticker)
     
     try:
-        info = stock.info
-        balance_sheet = stock.balance_sheet
-        income_stmt = stock.income_stmt
+        quote = get_cached(ticker_code, 'quote', lambda: _fetch_quote(stock))
+        info = get_cached(ticker_code, 'ratios', lambda: _fetch_ratios(stock))
+        statements = get_cached(ticker_code, 'statements', lambda: _fetch_statements(stock))
         
         data = {
-            '現在株価': safe_float(info.get('currentPrice')),
+            '現在株価': safe_float(quote.get('currentPrice')),
             '52週高値': safe_float(info.get('fiftyTwoWeekHigh')),
             '52週安値': safe_float(info.get('fiftyTwoWeekLow')),
             '現在PER': safe_float(info.get('trailingPE')),
@@ -96,10 +169,9 @@ def get_stock_data(ticker_code):
         }
         
         # 自己資本比率
-        if not balance_sheet.empty and len(balance_sheet.columns) > 0:
-            latest_bs = balance_sheet.iloc[:, 0]
-            total_assets = safe_float(latest_bs.get('Total Assets'))
-            total_equity = safe_float(latest_bs.get('Stockholders Equity'))
+        if statements['has_balance_sheet']:
+            total_assets = statements.get('total_assets')
+            total_equity = statements.get('total_equity')
             
             if total_assets and total_equity and total_assets > 0:
                 data['現在自己資本比率'] = (total_equity / total_assets) * 100
@@ -109,14 +181,11 @@ def get_stock_data(ticker_code):
             data['現在自己資本比率'] = None
         
         # 営業利益率・成長率
-        if not income_stmt.empty and len(income_stmt.columns) > 1:
-            latest_income = income_stmt.iloc[:, 0]
-            prev_income = income_stmt.iloc[:, 1]
-            
-            revenue = safe_float(latest_income.get('Total Revenue'))
-            operating_income = safe_float(latest_income.get('Operating Income'))
-            prev_revenue = safe_float(prev_income.get('Total Revenue'))
-            prev_operating_income = safe_float(prev_income.get('Operating Income'))
+        if statements['has_income_growth']:
+            revenue = statements.get('revenue')
+            operating_income = statements.get('operating_income')
+            prev_revenue = statements.get('prev_revenue')
+            prev_operating_income = statements.get('prev_operating_income')
             
             if revenue and operating_income and revenue > 0:
                 data['営業利益率'] = (operating_income / revenue) * 100
@@ -140,7 +209,7 @@ def get_stock_data(ticker_code):
         return data
         
     except Exception as e:
-        print(f"エラー: {ticker_code} - {str(e)}")
+        log.warning(f"エラー: {ticker_code} - {str(e)}")
         return None
 
 
@@ -148,6 +217,21 @@ def get_stock_data(ticker_code):
 # 売却シグナル判定（メイン関数）
 # ==========================================
 
+def _failed_signal_result():
+    """データ取得失敗時の判定結果"""
+    return {
+        'signal_strength': 0,
+        'overall': 'データ取得失敗',
+        'action': 'データが取得できませんでした',
+        'signals': [],
+        'profit_rate': 0,
+        'current_price': None,
+        'current_per': None,
+        'current_roe': None,
+        'current_equity': None
+    }
+
+
 def evaluate_stock_signal(
     ticker_code,
     purchase_price,
@@ -188,177 +272,256 @@ def evaluate_stock_signal(
     # 現在データを取得
     stock_data = get_stock_data(ticker_code)
     if not stock_data:
-        return {
-            'signal_strength': 0,
-            'overall': 'データ取得失敗',
-            'action': 'データが取得できませんでした',
-            'signals': [],
-            'profit_rate': 0,
-            'current_price': None,
-            'current_per': None,
-            'current_roe': None,
-            'current_equity': None
+        return _failed_signal_result()
+
+    # 判定は score_sell_signals（列演算版）の1行分
+    frame = pd.DataFrame([{
+        'industry': industry,
+        'purchase_price': purchase_price,
+        'shares': shares,
+        'purchase_roe': purchase_roe,
+        'purchase_equity': purchase_equity,
+        **stock_data,
+    }], index=pd.Index([str(ticker_code)], name='ticker_code'))
+    return _signal_result(frame.iloc[0], score_sell_signals(frame).iloc[0], stock_data)
+
+
+# ==========================================
+# 保有銘柄の一括判定
+# ==========================================
+
+def evaluate_portfolio_signals(holdings, max_workers=MAX_WORKERS):
+    """
+    保有銘柄の売却シグナルをまとめて判定
+
+    銘柄ごとの財務データ取得（info / balance_sheet / income_stmt）を
+    スレッドプールで同時に実行し（get_fundamentals_frame）、
+    判定は全銘柄まとめて列演算で行う（score_sell_signals）。
+
+    Args:
+        holdings: evaluate_stock_signal の引数を持つ dict のリスト
+                  （または同名の列を持つ DataFrame）
+        max_workers: 同時取得数の上限
+
+    Returns:
+        dict: {銘柄コード: evaluate_stock_signal の戻り値}（入力順）
+    """
+    holdings = pd.DataFrame(holdings)
+    if holdings.empty:
+        return {}
+    holdings.index = pd.Index(holdings['ticker_code'].astype(str), name='ticker_code')
+
+    fundamentals = get_fundamentals_frame(list(dict.fromkeys(holdings.index)), max_workers)
+    fundamentals = fundamentals.reindex(holdings.index)
+    failed = fundamentals.isna().all(axis=1)
+
+    frame = pd.concat([holdings.drop(columns='ticker_code'), fundamentals], axis=1)
+    scored = score_sell_signals(frame)
+
+    results = {}
+    for i, code in enumerate(frame.index):
+        if failed.iloc[i]:
+            results[code] = _failed_signal_result()
+            continue
+        stock_data = {
+            key: (None if pd.isna(value) else value)
+            for key, value in fundamentals.iloc[i].items()
         }
-    
-    current_price = stock_data['現在株価']
-    current_per = stock_data['現在PER']
-    current_roe = stock_data['現在ROE']
-    current_equity = stock_data['現在自己資本比率']
-    
-    # 評価損益計算
-    if purchase_price and current_price and shares:
-        investment = shares * purchase_price
-        current_value = shares * current_price
-        profit = current_value - investment
-        profit_rate = (profit / investment * 100) if investment > 0 else 0
-    else:
-        profit_rate = 0
-    
-    signals = []
-    signal_strength = 0
-    
-    # ==========================================
-    # 1. PER分析（シクリカル株）
-    # ==========================================
-    if check_cyclical_industry(industry):
-        if current_per:
-            if current_per > 15:
-                signals.append({
-                    'category': 'PER評価',
-                    'level': '高',
-                    'message': f'PER {current_per:.1f}倍（天井圏）',
-                    'detail': 'シクリカル株としては売却推奨水準です'
-                })
-                signal_strength += 3
-            elif current_per > 12:
-                signals.append({
-                    'category': 'PER評価',
-                    'level': '中',
-                    'message': f'PER {current_per:.1f}倍（天井接近）',
-                    'detail': '15倍到達前の売却を検討してください'
-                })
-                signal_strength += 2
-    
-    # ==========================================
-    # 2. 評価損益分析
-    # ==========================================
-    if profit_rate < -20:
-        signals.append({
-            'category': '評価損益',
-            'level': '高',
-            'message': f'評価損益 {profit_rate:.1f}%',
-            'detail': '大幅な含み損。損切りを検討してください'
-        })
-        signal_strength += 3
-    elif profit_rate > 50:
-        signals.append({
-            'category': '評価損益',
-            'level': '中',
-            'message': f'評価損益 {profit_rate:.1f}%',
-            'detail': '大幅な含み益。利益確定を検討してください'
-        })
-        signal_strength += 2
-    
-    # ==========================================
-    # 3. 52週高値分析
-    # ==========================================
-    high_52w = stock_data.get('52週高値')
-    low_52w = stock_data.get('52週安値')
-    
-    if current_price and high_52w and low_52w:
-        range_52w = high_52w - low_52w
-        if range_52w > 0:
-            position = ((current_price - low_52w) / range_52w) * 100
-            if position > 90:
-                signals.append({
-                    'category': '株価位置',
-                    'level': '中',
-                    'message': f'52週レンジの{position:.1f}%地点',
-                    'detail': '高値圏にあります。調整局面に注意'
-                })
-                signal_strength += 2
-    
-    # ==========================================
-    # 4. ROE悪化分析
-    # ==========================================
-    if current_roe and purchase_roe:
-        roe_change = current_roe - purchase_roe
-        if roe_change < -5:
-            signals.append({
-                'category': 'ROE',
-                'level': '高',
-                'message': f'ROE {roe_change:+.1f}%ポイント悪化',
-                'detail': '収益性が大幅に低下しています'
-            })
-            signal_strength += 3
-    
-    # ==========================================
-    # 5. 自己資本比率悪化分析
-    # ==========================================
-    if current_equity and purchase_equity:
-        equity_change = current_equity - purchase_equity
-        if equity_change < -10:
-            signals.append({
-                'category': '財務健全性',
-                'level': '高',
-                'message': f'自己資本比率 {equity_change:+.1f}%ポイント悪化',
-                'detail': '財務状況が悪化しています'
-            })
-            signal_strength += 3
-    
-    # ==========================================
-    # 6. 売上・利益成長率分析
-    # ==========================================
-    revenue_growth = stock_data.get('売上成長率')
-    profit_growth = stock_data.get('営業利益成長率')
-    
-    if revenue_growth and revenue_growth < -10:
-        signals.append({
-            'category': '業績',
-            'level': '中',
-            'message': f'売上成長率 {revenue_growth:+.1f}%',
-            'detail': '売上が減少しています'
-        })
-        signal_strength += 2
-    
-    if profit_growth and profit_growth < -20:
-        signals.append({
-            'category': '業績',
-            'level': '高',
-            'message': f'営業利益成長率 {profit_growth:+.1f}%',
-            'detail': '営業利益が大幅に減少しています'
-        })
-        signal_strength += 3
-    
-    # ==========================================
+        results[code] = _signal_result(frame.iloc[i], scored.iloc[i], stock_data)
+    return results
+
+
+# ==========================================
+# 売却シグナル判定（列演算版）
+# ==========================================
+
+# 判定カテゴリ → 出力列名
+SIGNAL_CATEGORY_COLUMNS = {
+    'PER評価': 'signal_per',
+    '評価損益': 'signal_profit',
+    '株価位置': 'signal_position',
+    'ROE': 'signal_roe',
+    '財務健全性': 'signal_equity',
+    '業績': 'signal_growth',
+}
+
+OVERALL_LEVELS = [
+    (8, "強い売却推奨", "即座に売却を検討してください"),
+    (6, "売却検討", "詳細を確認し、1週間以内に売却判断してください"),
+    (4, "要注意", "注意深く監視し、悪化すれば売却を検討してください"),
+    (2, "軽微な懸念", "定期的に確認してください"),
+]
+
+
+def _present(frame, column):
+    """値があり 0 でない（値が未取得・0 の項目は判定しない）"""
+    values = pd.to_numeric(frame[column], errors='coerce') if column in frame else pd.Series(np.nan, index=frame.index)
+    return values, values.notna() & (values != 0)
+
+
+def score_sell_signals(frame):
+    """
+    売却シグナルの判定ルールを全銘柄に列演算で適用
+
+    evaluate_stock_signal / evaluate_portfolio_signals はこの関数で採点する。
+
+    Args:
+        frame: 1行1銘柄の DataFrame
+            保有情報: industry, purchase_price, shares, purchase_roe, purchase_equity
+            財務データ: get_stock_data の戻り値と同じ列
+                       （現在株価, 現在PER, 52週高値, 52週安値, 現在ROE,
+                         現在自己資本比率, 売上成長率, 営業利益成長率）
+
+    Returns:
+        DataFrame: profit_rate, position_52w（52週レンジ内の位置%）,
+                   カテゴリ別の点数（SIGNAL_CATEGORY_COLUMNS）,
+                   signal_strength, overall, action
+    """
+    result = pd.DataFrame(index=frame.index)
+
+    price, has_price = _present(frame, '現在株価')
+    purchase_price, has_purchase_price = _present(frame, 'purchase_price')
+    shares, has_shares = _present(frame, 'shares')
+    per, has_per = _present(frame, '現在PER')
+    high, has_high = _present(frame, '52週高値')
+    low, has_low = _present(frame, '52週安値')
+    roe, has_roe = _present(frame, '現在ROE')
+    purchase_roe, has_purchase_roe = _present(frame, 'purchase_roe')
+    equity, has_equity = _present(frame, '現在自己資本比率')
+    purchase_equity, has_purchase_equity = _present(frame, 'purchase_equity')
+    revenue_growth, has_revenue_growth = _present(frame, '売上成長率')
+    profit_growth, has_profit_growth = _present(frame, '営業利益成長率')
+
+    # 評価損益率
+    investment = shares * purchase_price
+    profit_rate = ((shares * price - investment) / investment * 100).where(investment > 0, 0)
+    profit_rate = profit_rate.where(has_purchase_price & has_price & has_shares, 0).fillna(0)
+    result['profit_rate'] = profit_rate
+
+    # 1. PER（シクリカル株のみ）
+    industry = frame['industry'] if 'industry' in frame else pd.Series(np.nan, index=frame.index)
+    is_cyclical = industry.notna() & industry.astype(str).str.contains(
+        '|'.join(re.escape(k) for k in CYCLICAL_KEYWORDS)
+    )
+    result['signal_per'] = np.where(
+        is_cyclical & has_per, np.select([per > 15, per > 12], [3, 2], default=0), 0
+    )
+
+    # 2. 評価損益
+    result['signal_profit'] = np.select([profit_rate < -20, profit_rate > 50], [3, 2], default=0)
+
+    # 3. 52週レンジ内の位置
+    range_52w = high - low
+    position = (price - low) / range_52w * 100
+    result['position_52w'] = position
+    result['signal_position'] = np.where(
+        has_price & has_high & has_low & (range_52w > 0) & (position > 90), 2, 0
+    )
+
+    # 4. ROE悪化 / 5. 自己資本比率悪化
+    result['signal_roe'] = np.where(
+        has_roe & has_purchase_roe & (roe - purchase_roe < -5), 3, 0
+    )
+    result['signal_equity'] = np.where(
+        has_equity & has_purchase_equity & (equity - purchase_equity < -10), 3, 0
+    )
+
+    # 6. 売上・営業利益成長率
+    result['signal_growth'] = (
+        np.where(has_revenue_growth & (revenue_growth < -10), 2, 0)
+        + np.where(has_profit_growth & (profit_growth < -20), 3, 0)
+    )
+
     # 総合判定
-    # ==========================================
-    if signal_strength >= 8:
-        overall = "強い売却推奨"
-        action = "即座に売却を検討してください"
-    elif signal_strength >= 6:
-        overall = "売却検討"
-        action = "詳細を確認し、1週間以内に売却判断してください"
-    elif signal_strength >= 4:
-        overall = "要注意"
-        action = "注意深く監視し、悪化すれば売却を検討してください"
-    elif signal_strength >= 2:
-        overall = "軽微な懸念"
-        action = "定期的に確認してください"
-    else:
-        overall = "問題なし"
-        action = "保有継続で問題ありません"
-    
+    strength = result[list(SIGNAL_CATEGORY_COLUMNS.values())].sum(axis=1)
+    result['signal_strength'] = strength
+    conditions = [strength >= threshold for threshold, _, _ in OVERALL_LEVELS]
+    result['overall'] = np.select(
+        conditions, [overall for _, overall, _ in OVERALL_LEVELS], default="問題なし"
+    )
+    result['action'] = np.select(
+        conditions, [action for _, _, action in OVERALL_LEVELS], default="保有継続で問題ありません"
+    )
+    return result
+
+
+def get_fundamentals_frame(ticker_codes, max_workers=MAX_WORKERS):
+    """
+    複数銘柄の get_stock_data を並列に取得し、1行1銘柄の DataFrame にまとめる
+
+    取得失敗した銘柄の行はすべて欠損値になる。
+    """
+    ticker_codes = [str(code) for code in ticker_codes]
+    if not ticker_codes:
+        return pd.DataFrame()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(ticker_codes))) as executor:
+        rows = list(executor.map(perf.in_render(get_stock_data), ticker_codes))
+    return pd.DataFrame([row or {} for row in rows], index=pd.Index(ticker_codes, name='ticker_code'))
+
+
+def _signal_result(row, scored, stock_data):
+    """
+    score_sell_signals の1行分を evaluate_stock_signal の戻り値の形にする
+
+    Args:
+        row: 保有情報 + 財務データの1行
+        scored: score_sell_signals の同じ行
+        stock_data: get_stock_data の戻り値
+    """
+    signals = []
+    per = stock_data['現在PER']
+    profit_rate = float(scored['profit_rate'])
+
+    if scored['signal_per'] == 3:
+        signals.append({'category': 'PER評価', 'level': '高', 'message': f'PER {per:.1f}倍（天井圏）',
+                        'detail': 'シクリカル株としては売却推奨水準です'})
+    elif scored['signal_per'] == 2:
+        signals.append({'category': 'PER評価', 'level': '中', 'message': f'PER {per:.1f}倍（天井接近）',
+                        'detail': '15倍到達前の売却を検討してください'})
+
+    if scored['signal_profit'] == 3:
+        signals.append({'category': '評価損益', 'level': '高', 'message': f'評価損益 {profit_rate:.1f}%',
+                        'detail': '大幅な含み損。損切りを検討してください'})
+    elif scored['signal_profit'] == 2:
+        signals.append({'category': '評価損益', 'level': '中', 'message': f'評価損益 {profit_rate:.1f}%',
+                        'detail': '大幅な含み益。利益確定を検討してください'})
+
+    if scored['signal_position']:
+        signals.append({'category': '株価位置', 'level': '中',
+                        'message': f"52週レンジの{scored['position_52w']:.1f}%地点",
+                        'detail': '高値圏にあります。調整局面に注意'})
+
+    if scored['signal_roe']:
+        roe_change = stock_data['現在ROE'] - float(row['purchase_roe'])
+        signals.append({'category': 'ROE', 'level': '高', 'message': f'ROE {roe_change:+.1f}%ポイント悪化',
+                        'detail': '収益性が大幅に低下しています'})
+
+    if scored['signal_equity']:
+        equity_change = stock_data['現在自己資本比率'] - float(row['purchase_equity'])
+        signals.append({'category': '財務健全性', 'level': '高',
+                        'message': f'自己資本比率 {equity_change:+.1f}%ポイント悪化',
+                        'detail': '財務状況が悪化しています'})
+
+    # signal_growth は 売上減少 2点 + 営業利益減少 3点 の合計
+    if scored['signal_growth'] in (2, 5):
+        signals.append({'category': '業績', 'level': '中',
+                        'message': f"売上成長率 {stock_data['売上成長率']:+.1f}%",
+                        'detail': '売上が減少しています'})
+    if scored['signal_growth'] in (3, 5):
+        signals.append({'category': '業績', 'level': '高',
+                        'message': f"営業利益成長率 {stock_data['営業利益成長率']:+.1f}%",
+                        'detail': '営業利益が大幅に減少しています'})
+
     return {
-        'signal_strength': signal_strength,
-        'overall': overall,
-        'action': action,
+        'signal_strength': int(scored['signal_strength']),
+        'overall': scored['overall'],
+        'action': scored['action'],
         'signals': signals,
         'profit_rate': profit_rate,
-        'current_price': current_price,
-        'current_per': current_per,
-        'current_roe': current_roe,
-        'current_equity': current_equity,
+        'current_price': stock_data['現在株価'],
+        'current_per': per,
+        'current_roe': stock_data['現在ROE'],
+        'current_equity': stock_data['現在自己資本比率'],
         'stock_data': stock_data  # 全データも返す
     }
 
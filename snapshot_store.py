@@ -0,0 +1,134 @@
+"""
+================================================
+ポートフォリオ スナップショットの保存と裏での再計算
+================================================
+機能:
+  - PortfolioEngine が作ったスナップショットをローカルSQLiteに保存
+    （入力値ごと。起動直後は前回の保存値をすぐ表示できる）
+  - 保存値を表示している間に、別スレッドで最新のスナップショットを作り直す
+    （同じ入力の再計算はプロセス内で1つだけ。複数セッションで共有）
+
+使い方:
+  import snapshot_store
+
+  key = engine.cache_key()
+  stored = snapshot_store.load_snapshot(key)
+  if stored:
+      requested_at = time.time()
+      snapshot_store.refresh_in_background(key, engine.build)
+      ...
+      done, snapshot = snapshot_store.refresh_result(key, requested_at)
+================================================
+"""
+
+import pickle
+import threading
+import time
+from datetime import datetime
+
+import perf
+from local_store import connect
+
+# 保存先
+SNAPSHOT_DB = "portfolio_snapshot.db"
+
+# 保存しておく入力パターンの数（古いものから削除）
+KEEP_SNAPSHOTS = 8
+
+log = perf.get_logger(__name__)
+
+_lock = threading.Lock()
+_running = {}   # key → Thread
+_results = {}   # key → (完了時刻 time.time(), スナップショット or None（失敗）)
+
+
+def _init_db(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS snapshots (
+            key      TEXT PRIMARY KEY,
+            snapshot BLOB NOT NULL,
+            saved_at TEXT NOT NULL
+        )
+    """)
+
+
+def save_snapshot(key, snapshot):
+    """スナップショットを保存（KEEP_SNAPSHOTS を超えた古い入力パターンは削除）"""
+    try:
+        blob = pickle.dumps(snapshot)
+        with connect(SNAPSHOT_DB) as conn:
+            _init_db(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)",
+                (key, blob, datetime.now().isoformat()),
+            )
+            conn.execute("""
+                DELETE FROM snapshots WHERE key NOT IN (
+                    SELECT key FROM snapshots ORDER BY saved_at DESC LIMIT ?
+                )
+            """, (KEEP_SNAPSHOTS,))
+    except Exception as e:
+        log.warning(f"スナップショット保存エラー: {e}")
+
+
+def load_snapshot(key):
+    """保存済みのスナップショット（なければ・読めなければ None）"""
+    try:
+        with connect(SNAPSHOT_DB) as conn:
+            _init_db(conn)
+            row = conn.execute("SELECT snapshot FROM snapshots WHERE key = ?", (key,)).fetchone()
+        perf.cache_event("snapshot", hit=row is not None)
+        return pickle.loads(row[0]) if row else None
+    except Exception as e:
+        # モジュール変更後の古い保存値などは読めなくても作り直せばよい
+        log.warning(f"スナップショット読込エラー: {e}")
+        return None
+
+
+def _refresh(key, build):
+    snapshot = None
+    try:
+        snapshot = build()
+        save_snapshot(key, snapshot)
+    except Exception as e:
+        log.warning(f"スナップショット再計算エラー: {e}")
+    finally:
+        with _lock:
+            _results[key] = (time.time(), snapshot)
+            _running.pop(key, None)
+
+
+def refresh_in_background(key, build):
+    """
+    build() でスナップショットを作り直して保存する（別スレッド）
+
+    同じ key の再計算が実行中なら新たには起動しない。
+    build は Streamlit に依存しない関数にすること（スレッドには描画コンテキストがない）。
+    """
+    with _lock:
+        if key in _running:
+            return
+        thread = threading.Thread(
+            target=_refresh, args=(key, build), name=f"snapshot-{key[:8]}", daemon=True
+        )
+        _running[key] = thread
+        thread.start()
+
+
+def is_refreshing(key):
+    with _lock:
+        return key in _running
+
+
+def refresh_result(key, since):
+    """
+    since（time.time()）以降に完了した再計算の結果
+
+    Returns:
+        (完了したか, スナップショット)  失敗時は (True, None)、未完了なら (False, None)
+    """
+    with _lock:
+        finished_at, snapshot = _results.get(key, (0, None))
+    if finished_at < since:
+        return False, None
+    return True, snapshot
@@ -1,6 +1,7 @@
 import requests
-from bs4 import BeautifulSoup
-import re
+
+from html_extract import extract
+from http_client import get_parsed
 
 
 def get_shiller_pe():
@@ -15,29 +16,15 @@ def get_shiller_pe():
         }
 
         url = "https://www.multpl.com/shiller-pe"
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # シラーPERの値を抽出
-        current_value = soup.find('div', id='current')
-
-        if current_value:
-            shiller_text = current_value.get_text().strip()
-
-            # 正規表現で数値を抽出（例: 40.30）
-            match = re.search(r'\d+\.\d+', shiller_text)
+        # シラーPERの値を抽出（div#current の中の数値 例: 40.30）
+        # 共有Sessionで取得し、ページが更新されていなければ前回の値を使う
+        shiller_pe = get_parsed(url, lambda page: extract("multpl", page)[0], headers=headers, timeout=10)
 
-            if match:
-                shiller_pe = float(match.group())
-                print(f"✅ シラーPER取得成功: {shiller_pe}倍")
-                return shiller_pe
-            else:
-                print(f"❌ 数値が見つかりません: {shiller_text}")
-                return None
+        if shiller_pe is not None:
+            print(f"✅ シラーPER取得成功: {shiller_pe}倍")
+            return shiller_pe
         else:
-            print("❌ シラーPERの要素が見つかりません")
+            print("❌ シラーPERの要素・数値が見つかりません")
             return None
 
     except requests.exceptions.RequestException as e:
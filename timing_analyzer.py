@@ -14,10 +14,16 @@
 ================================================
 """
 
-import yfinance as yf
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
+import perf
+from history_store import get_history
+from indicators import compute_indicators
+
+log = perf.get_logger(__name__)
+
 
 def calculate_rsi(prices, period=14):
     """
@@ -33,24 +39,40 @@ def calculate_rsi(prices, period=14):
     if len(prices) < period + 1:
         return None
     
-    # 前日比の変化を計算
-    delta = prices.diff()
-    
-    # 上昇・下降を分離
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    
-    # 平均を計算
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    
-    # RSを計算
-    rs = avg_gain / avg_loss
-    
-    # RSIを計算
-    rsi = 100 - (100 / (1 + rs))
-    
-    return rsi.iloc[-1]
+    return compute_indicators(prices.to_frame(), rsi_period=period)['rsi'].iloc[0]
+
+
+# 採点の点数 → (シグナル, 説明)（点数の付け方は score_timing_frame）
+RSI_LABELS = {
+    4: ("🎯 売られすぎ（絶好の買い場）", "RSI {rsi:.1f}は30未満で売られすぎ。反発の可能性大。"),
+    3: ("✅ やや売られすぎ（買い推奨）", "RSI {rsi:.1f}は40未満でやや売られすぎ。"),
+    2: ("😊 中立（やや買い）", "RSI {rsi:.1f}は中立圏。"),
+    1: ("😐 中立", "RSI {rsi:.1f}は中立圏。"),
+    0: ("⚠️ やや買われすぎ", "RSI {rsi:.1f}はやや買われすぎ。調整の可能性。"),
+    -2: ("🚨 買われすぎ（買い控え）", "RSI {rsi:.1f}は70超えで買われすぎ。調整待ち推奨。"),
+}
+MA_LABELS = {
+    2: ("✅ 25日線を下回る（押し目買いチャンス）", "現在価格¥{price:.0f}が25日線¥{ma_25:.0f}を下回る。"),
+    1: ("😊 5日線を下回る", "現在価格¥{price:.0f}が5日線¥{ma_5:.0f}を下回る。"),
+    -1: ("⚠️ 25日線を大きく上回る", "現在価格¥{price:.0f}が25日線¥{ma_25:.0f}を10%以上上回る。調整の可能性。"),
+    0: ("😐 移動平均線付近", "現在価格¥{price:.0f}は移動平均線付近。"),
+}
+TREND_LABELS = {
+    1: ("📈 上昇トレンド", "短期・中期・長期すべて上昇トレンド。"),
+    2: ("📉 下降トレンド（買い場）", "下降トレンド中。底値圏での買いチャンス。"),
+    0: ("😐 レンジ相場", "明確なトレンドなし。"),
+}
+PER_LABELS = {
+    3: ("🎯 超割安PER", "PER {per:.1f}倍は歴史的割安。"),
+    2: ("✅ 割安PER", "PER {per:.1f}倍は割安。"),
+    1: ("😊 適正PER", "PER {per:.1f}倍は適正水準。"),
+    0: ("😐 やや高PER", "PER {per:.1f}倍はやや高め。"),
+}
+
+
+def _value_or_none(value):
+    """指標エンジンの欠損値を None に変換"""
+    return None if pd.isna(value) else float(value)
 
 
 def analyze_purchase_timing(ticker_code, current_per=None):
@@ -65,7 +87,8 @@ def analyze_purchase_timing(ticker_code, current_per=None):
         dict: {
             'timing_score': 0-10,
             'recommendation': '買い推奨' | '様子見' | '買い控え',
-            'rsi': RSI値,
+            'rsi': RSI値（単純移動平均版）,
+            'rsi_wilder': RSI値（Wilder平滑化版）,
             'rsi_signal': 'RSIシグナル',
             'ma_signal': '移動平均シグナル',
             'trend': 'トレンド',
@@ -77,9 +100,8 @@ def analyze_purchase_timing(ticker_code, current_per=None):
     ticker = f"{ticker_code}.T"
     
     try:
-        # 過去6ヶ月のデータ取得
-        stock = yf.Ticker(ticker)
-        history = stock.history(period="6mo")
+        # 過去6ヶ月のデータ取得（ローカル履歴ストア + 不足分のみ取得）
+        history = get_history(ticker, period="6mo")
         
         if len(history) < 30:
             return {
@@ -89,149 +111,51 @@ def analyze_purchase_timing(ticker_code, current_per=None):
                 'details': []
             }
         
-        # 現在価格
-        current_price = history['Close'].iloc[-1]
-        
-        # RSI計算
-        rsi = calculate_rsi(history['Close'], period=14)
-        
-        # 移動平均計算
-        ma_5 = history['Close'].rolling(window=5).mean().iloc[-1]
-        ma_25 = history['Close'].rolling(window=25).mean().iloc[-1]
-        ma_75 = history['Close'].rolling(window=75).mean().iloc[-1] if len(history) >= 75 else None
-        
-        # スコアリング
-        score = 0
+        # 指標計算・採点（複数銘柄用の score_timing_frame の1行分を参照）
+        indicators = compute_indicators(history[['Close']])
+        row = score_timing_frame(
+            indicators, per={indicators.index[0]: current_per} if current_per else None
+        ).iloc[0]
+
+        current_price = row['current_price']
+        rsi = _value_or_none(row['rsi'])
+        ma_5 = row['ma_5']
+        ma_25 = row['ma_25']
+        ma_75 = _value_or_none(row['ma_75'])
+
+        # 点数ごとの判定文（点数は score_timing_frame と同じルール）
         details = []
-        
-        # ==========================================
-        # 1. RSI分析（最重要）
-        # ==========================================
         if rsi:
-            if rsi < 30:
-                score += 4
-                rsi_signal = "🎯 売られすぎ（絶好の買い場）"
-                rsi_detail = f"RSI {rsi:.1f}は30未満で売られすぎ。反発の可能性大。"
-            elif rsi < 40:
-                score += 3
-                rsi_signal = "✅ やや売られすぎ（買い推奨）"
-                rsi_detail = f"RSI {rsi:.1f}は40未満でやや売られすぎ。"
-            elif rsi < 50:
-                score += 2
-                rsi_signal = "😊 中立（やや買い）"
-                rsi_detail = f"RSI {rsi:.1f}は中立圏。"
-            elif rsi < 60:
-                score += 1
-                rsi_signal = "😐 中立"
-                rsi_detail = f"RSI {rsi:.1f}は中立圏。"
-            elif rsi < 70:
-                score += 0
-                rsi_signal = "⚠️ やや買われすぎ"
-                rsi_detail = f"RSI {rsi:.1f}はやや買われすぎ。調整の可能性。"
-            else:
-                score -= 2
-                rsi_signal = "🚨 買われすぎ（買い控え）"
-                rsi_detail = f"RSI {rsi:.1f}は70超えで買われすぎ。調整待ち推奨。"
-            
+            rsi_signal, rsi_detail = RSI_LABELS[int(row['rsi_points'])]
+            rsi_detail = rsi_detail.format(rsi=rsi)
             details.append(('RSI', f"{rsi:.1f}", rsi_signal, rsi_detail))
         else:
             rsi_signal = "N/A"
-            rsi_detail = "RSIデータなし"
-        
-        # ==========================================
-        # 2. 移動平均分析
-        # ==========================================
-        if current_price < ma_25:
-            score += 2
-            ma_signal = "✅ 25日線を下回る（押し目買いチャンス）"
-            ma_detail = f"現在価格¥{current_price:.0f}が25日線¥{ma_25:.0f}を下回る。"
-        elif current_price < ma_5:
-            score += 1
-            ma_signal = "😊 5日線を下回る"
-            ma_detail = f"現在価格¥{current_price:.0f}が5日線¥{ma_5:.0f}を下回る。"
-        elif current_price > ma_25 * 1.1:
-            score -= 1
-            ma_signal = "⚠️ 25日線を大きく上回る"
-            ma_detail = f"現在価格¥{current_price:.0f}が25日線¥{ma_25:.0f}を10%以上上回る。調整の可能性。"
-        else:
-            score += 0
-            ma_signal = "😐 移動平均線付近"
-            ma_detail = f"現在価格¥{current_price:.0f}は移動平均線付近。"
-        
+
+        ma_signal, ma_detail = MA_LABELS[int(row['ma_points'])]
+        ma_detail = ma_detail.format(price=current_price, ma_5=ma_5, ma_25=ma_25)
         details.append(('移動平均', f"¥{current_price:.0f}", ma_signal, ma_detail))
-        
-        # ==========================================
-        # 3. トレンド分析
-        # ==========================================
+
         if ma_75:
-            if ma_5 > ma_25 > ma_75:
-                score += 1
-                trend = "📈 上昇トレンド"
-                trend_detail = "短期・中期・長期すべて上昇トレンド。"
-            elif ma_5 < ma_25 < ma_75:
-                score += 2
-                trend = "📉 下降トレンド（買い場）"
-                trend_detail = "下降トレンド中。底値圏での買いチャンス。"
-            else:
-                score += 0
-                trend = "😐 レンジ相場"
-                trend_detail = "明確なトレンドなし。"
-            
+            trend, trend_detail = TREND_LABELS[int(row['trend_points'])]
             details.append(('トレンド', trend, '', trend_detail))
         else:
             trend = "N/A"
-        
-        # ==========================================
-        # 4. PER分析（提供された場合）
-        # ==========================================
+
         if current_per:
-            if current_per < 5:
-                score += 3
-                per_signal = "🎯 超割安PER"
-                per_detail = f"PER {current_per:.1f}倍は歴史的割安。"
-            elif current_per < 7:
-                score += 2
-                per_signal = "✅ 割安PER"
-                per_detail = f"PER {current_per:.1f}倍は割安。"
-            elif current_per < 10:
-                score += 1
-                per_signal = "😊 適正PER"
-                per_detail = f"PER {current_per:.1f}倍は適正水準。"
-            else:
-                score += 0
-                per_signal = "😐 やや高PER"
-                per_detail = f"PER {current_per:.1f}倍はやや高め。"
-            
-            details.append(('PER', f"{current_per:.1f}倍", per_signal, per_detail))
-        
-        # ==========================================
-        # 総合判定
-        # ==========================================
-        if score >= 8:
-            recommendation = "🎯 強い買い推奨"
-            action = "今月の投資予算の60%を投入推奨"
-        elif score >= 6:
-            recommendation = "✅ 買い推奨"
-            action = "今月の投資予算の40%を投入推奨"
-        elif score >= 4:
-            recommendation = "😊 やや買い"
-            action = "少額から様子見で投資"
-        elif score >= 2:
-            recommendation = "😐 中立"
-            action = "様子見推奨"
-        else:
-            recommendation = "⚠️ 買い控え"
-            action = "調整待ち推奨"
-        
+            per_signal, per_detail = PER_LABELS[int(row['per_points'])]
+            details.append(('PER', f"{current_per:.1f}倍", per_signal, per_detail.format(per=current_per)))
+
         return {
-            'timing_score': min(score, 10),  # 最大10点
-            'recommendation': recommendation,
+            'timing_score': int(row['timing_score']),
+            'recommendation': row['recommendation'],
             'rsi': rsi,
+            'rsi_wilder': _value_or_none(row['rsi_wilder']),
             'rsi_signal': rsi_signal,
             'ma_signal': ma_signal,
             'trend': trend,
             'details': details,
-            'action': action,
+            'action': row['action'],
             'current_price': current_price,
             'ma_5': ma_5,
             'ma_25': ma_25,
@@ -239,7 +163,7 @@ def analyze_purchase_timing(ticker_code, current_per=None):
         }
     
     except Exception as e:
-        print(f"エラー: {ticker_code} - {str(e)}")
+        log.warning(f"エラー: {ticker_code} - {str(e)}")
         return {
             'timing_score': 0,
             'recommendation': 'エラー',
@@ -248,6 +172,70 @@ def analyze_purchase_timing(ticker_code, current_per=None):
         }
 
 
+# ==========================================
+# 複数銘柄の一括スコアリング
+# ==========================================
+
+def score_timing_frame(indicators, per=None):
+    """
+    購入タイミングの採点ルール（RSI・移動平均・トレンド・PER）を全銘柄に列演算で適用
+
+    analyze_purchase_timing もこの関数で1銘柄分を採点する。
+
+    Args:
+        indicators: indicators.compute_indicators の戻り値（index=銘柄）
+        per: 銘柄 → 現在PER の Series / dict（任意）
+
+    Returns:
+        DataFrame: indicators に rsi_points / ma_points / trend_points / per_points /
+                   timing_score / recommendation / action を追加したもの
+                   （30日分に満たない銘柄は除外）
+    """
+    df = indicators[indicators['days'] >= 30].copy()
+    price = df['current_price'].to_numpy(dtype=float)
+    rsi = df['rsi'].to_numpy(dtype=float)
+    ma_5 = df['ma_5'].to_numpy(dtype=float)
+    ma_25 = df['ma_25'].to_numpy(dtype=float)
+    ma_75 = df['ma_75'].to_numpy(dtype=float)
+    per_values = pd.Series(per if per is not None else {}, dtype=float).reindex(df.index).to_numpy()
+
+    with np.errstate(invalid="ignore"):
+        has_rsi = ~np.isnan(rsi) & (rsi != 0)
+        df['rsi_points'] = np.where(
+            has_rsi,
+            np.select([rsi < 30, rsi < 40, rsi < 50, rsi < 60, rsi < 70], [4, 3, 2, 1, 0], default=-2),
+            0,
+        )
+        df['ma_points'] = np.select(
+            [price < ma_25, price < ma_5, price > ma_25 * 1.1], [2, 1, -1], default=0
+        )
+        df['trend_points'] = np.where(
+            np.isnan(ma_75),
+            0,
+            np.select([df['trend'] == 'up', df['trend'] == 'down'], [1, 2], default=0),
+        )
+        has_per = ~np.isnan(per_values) & (per_values != 0)
+        df['per_points'] = np.where(
+            has_per,
+            np.select([per_values < 5, per_values < 7, per_values < 10], [3, 2, 1], default=0),
+            0,
+        )
+
+    score = df['rsi_points'] + df['ma_points'] + df['trend_points'] + df['per_points']
+    df['timing_score'] = score.clip(upper=10)
+    df['recommendation'] = np.select(
+        [score >= 8, score >= 6, score >= 4, score >= 2],
+        ["🎯 強い買い推奨", "✅ 買い推奨", "😊 やや買い", "😐 中立"],
+        default="⚠️ 買い控え",
+    )
+    df['action'] = np.select(
+        [score >= 8, score >= 6, score >= 4, score >= 2],
+        ["今月の投資予算の60%を投入推奨", "今月の投資予算の40%を投入推奨", "少額から様子見で投資", "様子見推奨"],
+        default="調整待ち推奨",
+    )
+    return df
+
+
 # ==========================================
 # テスト用（単体実行時）
 # ==========================================
@@ -0,0 +1,195 @@
+"""
+================================================
+購入タイミング スクリーナー（東証ユニバース）
+================================================
+機能:
+  - 東証プライム・スタンダード全銘柄（または指定銘柄リスト）を
+    analyze_purchase_timing と同じRSI・移動平均・トレンド・PERルールで採点
+  - 株価履歴は銘柄をまとめて並列に同期（history_store）
+  - 同期の進捗をチェックポイントに保存し、中断しても続きから再開
+  - timing_score 順のランキング表を返す
+
+使い方:
+  python timing_screener.py                      # 東証プライム・スタンダード全銘柄
+  python timing_screener.py --codes 9127 1848    # 指定銘柄のみ
+  python timing_screener.py --output screen.csv --top 50
+
+  from timing_screener import screen_purchase_timing
+  ranking = screen_purchase_timing(codes=["9127", "1848"])
+
+※ 東証上場銘柄一覧（.xls）の読み込みには xlrd が必要
+================================================
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from history_store import get_close_matrix, sync
+from indicators import compute_indicators
+from timing_analyzer import score_timing_frame
+
+# 東証上場銘柄一覧（JPX）
+JPX_LIST_URL = "https://www.jpx.co.jp/markets/statistics-equities/misc/tvdivq0000001vg2-att/data_j.xls"
+DEFAULT_MARKETS = ("プライム（内国株式）", "スタンダード（内国株式）")
+
+CHECKPOINT_FILE = "timing_screener_checkpoint.json"
+
+# 1回の一括ダウンロードで扱う銘柄数と、同時に走らせるダウンロード数
+CHUNK_SIZE = 100
+MAX_WORKERS = 4
+
+
+def load_tse_universe(markets=DEFAULT_MARKETS, source=JPX_LIST_URL):
+    """
+    東証上場銘柄一覧を読み込む
+
+    Returns:
+        DataFrame: columns=['コード', '銘柄名', '市場', '業種']
+    """
+    df = pd.read_excel(source, dtype={"コード": str})
+    df = df.rename(columns={"市場・商品区分": "市場", "33業種区分": "業種"})
+    df = df[df["市場"].isin(markets)]
+    return df[["コード", "銘柄名", "市場", "業種"]].reset_index(drop=True)
+
+
+def _universe_key(codes):
+    return hashlib.sha1(",".join(codes).encode()).hexdigest()
+
+
+def _load_checkpoint(path, codes):
+    """同じ日・同じ銘柄リストのチェックポイントなら同期済み銘柄を返す"""
+    if not path or not os.path.exists(path):
+        return set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    if checkpoint.get("run_date") != datetime.now().strftime("%Y-%m-%d"):
+        return set()
+    if checkpoint.get("universe") != _universe_key(codes):
+        return set()
+    return set(checkpoint.get("done", [])) & set(codes)
+
+
+def _save_checkpoint(path, codes, done):
+    """チェックポイントを一時ファイル経由で置き換え（途中で落ちても壊れない）"""
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "run_date": datetime.now().strftime("%Y-%m-%d"),
+            "universe": _universe_key(codes),
+            "done": sorted(done),
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def sync_histories(codes, checkpoint_path=CHECKPOINT_FILE, resume=True,
+                   chunk_size=CHUNK_SIZE, max_workers=MAX_WORKERS):
+    """
+    銘柄の株価履歴をチャンク単位で並列に同期する
+
+    チャンクが終わるたびにチェックポイントを保存し、
+    resume=True なら同日中の続きから再開する。
+    取得できなかった銘柄はチェックポイントに含めない（再開時に再取得）。
+    """
+    done = _load_checkpoint(checkpoint_path, codes) if resume else set()
+    pending = [code for code in codes if code not in done]
+    if done:
+        print(f"チェックポイントから再開: {len(done)}/{len(codes)} 銘柄同期済み")
+
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(sync, [f"{code}.T" for code in chunk]): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                failed = set(future.result())
+            except Exception as e:
+                print(f"同期エラー: {chunk[0]}〜{chunk[-1]} - {e}")
+                continue
+            if failed:
+                print(f"同期できなかった銘柄: {len(failed)}/{len(chunk)}（{chunk[0]}〜{chunk[-1]}）")
+            done.update(code for code in chunk if f"{code}.T" not in failed)
+            _save_checkpoint(checkpoint_path, codes, done)
+            print(f"進捗: {len(done)}/{len(codes)} 銘柄")
+
+    return done
+
+
+def screen_purchase_timing(codes=None, per=None, universe=None,
+                           checkpoint_path=CHECKPOINT_FILE, resume=True,
+                           chunk_size=CHUNK_SIZE, max_workers=MAX_WORKERS):
+    """
+    購入タイミングスコアで銘柄をランキング
+
+    Args:
+        codes: 銘柄コードのリスト。None なら東証プライム・スタンダード全銘柄
+        per: 銘柄コード → 現在PER の dict（任意、PERスコアに反映）
+        universe: 銘柄名・市場・業種の DataFrame（load_tse_universe と同じ列、任意）
+        checkpoint_path: 同期進捗の保存先（None で保存しない）
+        resume: 同日中のチェックポイントから再開するか
+
+    Returns:
+        DataFrame: timing_score の高い順
+    """
+    if codes is None:
+        universe = load_tse_universe() if universe is None else universe
+        codes = universe["コード"].tolist()
+    codes = list(dict.fromkeys(str(code) for code in codes))
+    if not codes:
+        return pd.DataFrame()
+
+    sync_histories(codes, checkpoint_path, resume, chunk_size, max_workers)
+
+    # 指標計算・採点はローカル履歴の一括読み込み + 列演算のみ
+    close = get_close_matrix([f"{code}.T" for code in codes], period="6mo", refresh=False)
+    close.columns = codes
+    indicators = compute_indicators(close)
+    scored = score_timing_frame(indicators, per=per)
+    scored.index.name = "コード"
+
+    ranking = scored.reset_index()
+    if universe is not None:
+        ranking = ranking.merge(universe, on="コード", how="left")
+    ranking = ranking.sort_values(["timing_score", "rsi"], ascending=[False, True])
+    return ranking.reset_index(drop=True)
+
+
+# ==========================================
+# 夜間スクリーニング（単体実行時）
+# ==========================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="購入タイミング スクリーナー")
+    parser.add_argument("--codes", nargs="*", help="銘柄コード（省略時は東証プライム・スタンダード全銘柄）")
+    parser.add_argument("--output", default="", help="結果CSVの保存先")
+    parser.add_argument("--top", type=int, default=30, help="表示する上位件数")
+    parser.add_argument("--no-resume", action="store_true", help="チェックポイントを使わず最初から実行")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("購入タイミング スクリーニング")
+    print("=" * 80)
+
+    ranking = screen_purchase_timing(codes=args.codes or None, resume=not args.no_resume)
+
+    if args.output:
+        ranking.to_csv(args.output, index=False, encoding="utf-8-sig")
+        print(f"\n結果を保存しました: {args.output}")
+
+    columns = [c for c in ["コード", "銘柄名", "業種", "timing_score", "recommendation",
+                           "rsi", "current_price", "ma_25"] if c in ranking.columns]
+    print(f"\n上位 {args.top} 銘柄:")
+    print(ranking[columns].head(args.top).to_string(index=False))
@@ -4,26 +4,39 @@ FANG+ + シクリカル株 + マクロ経済指標を一元管理
 """
 
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import os
+from datetime import datetime
+import time
 
-# たーちゃん哲学2.0 - 売却目標価格自動推定
+# yfinance・plotly・gspread などの重いライブラリは使う関数の中で読み込む
+# （python import_report.py で起動時の読込時間を確認できる）
+
+import perf
+import snapshot_store
+from history_store import get_history
+from macro_snapshot import fetch_macro_snapshot
+from market_calendar import cache_epoch, market_for
+from macro_valuation import RECENT_YEARS, get_shiller_snapshot
+from portfolio_engine import LONG_TERM_HOLD_CODES, PortfolioEngine, estimate_targets, fetch_portfolio_prices
+
+# たーちゃん哲学2.0 - 売却目標価格キャッシュ管理
 try:
-    from auto_per_estimator import get_target_prices_auto, clear_cache, load_cache
+    from auto_per_estimator import clear_cache, load_cache
     TARGET_PRICES_AVAILABLE = True
 except ImportError:
     TARGET_PRICES_AVAILABLE = False
 
 # FANG+ 管理モジュール
 try:
-    from fang_manager import get_fang_current_price, calc_fang_summary, add_fang_purchase, load_fang_purchases
+    from fang_manager import get_fang_nav, add_fang_purchase, load_fang_purchases
     FANG_MODULE_OK = True
 except ImportError:
     FANG_MODULE_OK = False
 
+# この描画で記録された計測（取得・計算の所要時間・キャッシュヒット）を末尾のパネルに表示する
+render_started = time.time()
+render_id = perf.mark()
+
 # ページ設定
 st.set_page_config(
     page_title="統合投資ダッシュボード",
@@ -51,83 +64,28 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# データキャッシュ（1時間）
-@st.cache_data(ttl=3600)
-def get_bond_yields():
-    """債券利回り取得"""
-    try:
-        tnx = yf.Ticker("^TNX")  # 10年債
-        fvx = yf.Ticker("^FVX")  # 5年債
-
-        tnx_data = tnx.history(period="5d")
-        fvx_data = fvx.history(period="5d")
-
-        if len(tnx_data) > 0 and len(fvx_data) > 0:
-            ten_year = tnx_data['Close'].iloc[-1]
-            five_year = fvx_data['Close'].iloc[-1]
-
-            # 2年債を推定（10年債 - 0.8%程度）
-            two_year = ten_year - 0.8
-
-            return {
-                'ten_year': ten_year,
-                'two_year': two_year,
-                'spread': ten_year - two_year
-            }
-    except:
-        pass
-    return {'ten_year': 0, 'two_year': 0, 'spread': 0}
-
-@st.cache_data(ttl=3600)
-def get_vix():
-    """VIX指数取得"""
-    try:
-        vix = yf.Ticker("^VIX")
-        vix_data = vix.history(period="5d")
-        if len(vix_data) > 0:
-            return {
-                'current': vix_data['Close'].iloc[-1],
-                'history': vix_data['Close'].tolist()
-            }
-    except:
-        pass
-    return {'current': 0, 'history': []}
-
-@st.cache_data(ttl=3600)
-def get_major_indices():
-    """主要指数取得"""
-    try:
-        indices = {
-            'S&P 500': '^GSPC',
-            'NASDAQ': '^IXIC',
-            'QQQ': 'QQQ'
-        }
-
-        results = {}
-        for name, ticker in indices.items():
-            stock = yf.Ticker(ticker)
-            data = stock.history(period="5d")
-            if len(data) > 0:
-                current = data['Close'].iloc[-1]
-                prev = data['Close'].iloc[-2] if len(data) > 1 else current
-                change_pct = ((current - prev) / prev * 100) if prev > 0 else 0
-
-                results[name] = {
-                    'price': current,
-                    'change_pct': change_pct
-                }
-
-        return results
-    except:
-        pass
-    return {}
-
-@st.cache_data(ttl=3600)
-def get_stock_price(ticker):
+# データキャッシュ（市場の立会状況に連動）
+# epoch は market_calendar.cache_epoch の値。立会中は5分ごと、
+# 引け後は確定値の反映後に1回変わり、次の寄り付きまで同じ値になる。
+# 本体で perf.cache_miss() を呼び、perf.cached_call 経由で呼ぶとヒット率が記録される。
+@st.cache_data(max_entries=4)
+def get_macro_snapshot(epoch):
+    """債券利回り・VIX・主要指数（1回の一括取得）"""
+    perf.cache_miss()
+    return fetch_macro_snapshot()
+
+@st.cache_data(max_entries=4)
+def get_shiller_pe(epoch):
+    """シラーPER（1日1回取得・履歴はローカルに蓄積）と履歴上のパーセンタイル"""
+    perf.cache_miss()
+    return get_shiller_snapshot()
+
+@st.cache_data(max_entries=256)
+def get_stock_price(ticker, epoch):
     """日本株の現在価格取得"""
+    perf.cache_miss()
     try:
-        stock = yf.Ticker(ticker)
-        data = stock.history(period="5d")
+        data = get_history(ticker, period="5d")
         if len(data) > 0:
             current = data['Close'].iloc[-1]
             prev = data['Close'].iloc[-2] if len(data) > 1 else current
@@ -141,10 +99,35 @@ def get_stock_price(ticker):
         pass
     return {'price': 0, 'change_pct': 0}
 
-@st.cache_data(ttl=3600)
-def get_stock_fundamentals(ticker):
+@st.cache_data(max_entries=8)
+def get_portfolio_prices(codes, epoch):
+    """
+    保有銘柄の現在価格を一括取得
+
+    Args:
+        codes: 銘柄コードのタプル（例: ('9127', '1848')）
+
+    Returns:
+        DataFrame: index=銘柄コード, columns=['price', 'change_pct']
+                   取得失敗した銘柄は price=0, change_pct=0
+    """
+    perf.cache_miss()
+    return fetch_portfolio_prices(codes)
+
+# 引け後は holdings が次の寄り付きまで変わらないため、ttl で auto_per_estimator の
+# キャッシュ（7日間有効）の期限切れ・他セッションでの更新も1時間以内に反映する
+@st.cache_data(max_entries=8, ttl=3600, show_spinner="売却目標価格を計算中...")
+def get_target_estimates(holdings):
+    """保有銘柄の売却目標価格（保有内容・現在価格が変わったとき・1時間ごとに再計算）"""
+    perf.cache_miss()
+    return estimate_targets(holdings)
+
+@st.cache_data(max_entries=256)
+def get_stock_fundamentals(ticker, epoch):
     """PERとEPSを取得（たーちゃん哲学2.0用）"""
+    perf.cache_miss()
     try:
+        import yfinance as yf
         stock = yf.Ticker(ticker)
         info = stock.info
         per = info.get('trailingPE') or info.get('forwardPE') or 0
@@ -157,122 +140,17 @@ def get_stock_fundamentals(ticker):
             per, eps = 0, 0
         # EPSが取れない場合は現在価格/PERで逆算
         if (not eps or eps <= 0) and per > 0:
-            price_data = get_stock_price(ticker)
+            price_data = perf.cached_call("st.stock_price", get_stock_price, ticker, epoch)
             if price_data['price'] > 0:
                 eps = round(price_data['price'] / per, 2)
         return {'per': per, 'eps': eps}
     except Exception:
         return {'per': 0, 'eps': 0}
 
-def calculate_danger_level(buffett, yield_spread, vix):
-    """総合危険度計算"""
-    danger = 0
-
-    # イールドカーブ
-    if yield_spread < -0.5:
-        danger += 3
-    elif yield_spread < 0:
-        danger += 2
-
-    # VIX
-    if vix > 30:
-        danger += 3
-    elif vix > 25:
-        danger += 2
-    elif vix > 20:
-        danger += 1
-
-    # バフェット指数
-    if buffett > 200:
-        danger += 3
-    elif buffett > 180:
-        danger += 2
-    elif buffett > 150:
-        danger += 1
-
-    return danger
-
-def load_cyclical_portfolio():
-    """シクリカル株ポートフォリオ読込（Google Sheets対応）"""
-
-    # Google Sheets の CSV エクスポート URL（設定で変更可能）
-    # サイドバーで設定した場合はそちらを優先
-    google_sheets_url = st.session_state.get('google_sheets_url', '')
-
-    # ローカルファイルパス
-    local_csv_path = "/Users/carlos/PyCharmMiscProject/株スクリーニング完成版/portfolio_data/purchased_stocks.csv"
-
-    df = pd.DataFrame()
-
-    # 優先順位1: Google Sheets URL
-    if google_sheets_url:
-        try:
-            df = pd.read_csv(google_sheets_url)
-            st.sidebar.success("✅ Google Sheets から読込成功")
-        except Exception as e:
-            st.sidebar.error(f"❌ Google Sheets 読込失敗: {e}")
-
-    # 優先順位2: ローカルファイル
-    if df.empty and os.path.exists(local_csv_path):
-        try:
-            df = pd.read_csv(local_csv_path, encoding='utf-8-sig')
-        except Exception as e:
-            print(f"ローカルファイル読み込みエラー: {e}")
-
-    # データ集約処理
-    if not df.empty and '銘柄コード' in df.columns:
-        # 同じ銘柄の複数購入記録を集約
-        aggregated_rows = []
-
-        for code in df['銘柄コード'].unique():
-            stock_records = df[df['銘柄コード'] == code]
-
-            # 合計株数計算
-            total_shares = stock_records['購入株数'].sum()
-
-            # 平均取得単価計算（加重平均）
-            total_cost = (stock_records['購入株数'] * stock_records['購入単価']).sum()
-            avg_price = total_cost / total_shares if total_shares > 0 else 0
-
-            # 最も古い購入日を使用
-            first_purchase = stock_records['購入日'].min()
-
-            # 購入時PERの加重平均（EPSを逆算するために保持）
-            avg_per = 0
-            if '購入時PER' in stock_records.columns:
-                try:
-                    valid = stock_records[pd.to_numeric(stock_records['購入時PER'], errors='coerce') > 0].copy()
-                    valid['購入時PER'] = pd.to_numeric(valid['購入時PER'], errors='coerce')
-                    if not valid.empty:
-                        w = valid['購入株数'] * valid['購入単価']
-                        avg_per = (w * valid['購入時PER']).sum() / w.sum() if w.sum() > 0 else 0
-                except Exception:
-                    avg_per = 0
-
-            # 集約レコード作成
-            aggregated_rows.append({
-                '銘柄コード': code,
-                '銘柄名': stock_records.iloc[0]['企業名'],
-                '購入価格': avg_price,
-                '購入株数': total_shares,
-                '購入日': first_purchase,
-                '購入時PER': avg_per,
-            })
-
-        return pd.DataFrame(aggregated_rows)
-
-    # デモデータ（ファイルが存在しない場合）
-    return pd.DataFrame({
-        '銘柄コード': [],
-        '銘柄名': [],
-        '購入価格': [],
-        '購入株数': [],
-        '購入日': []
-    })
-
 # メインページ
 st.title("📊 統合投資ダッシュボード")
-st.caption(f"最終更新: {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}")
+# 最終更新時刻・更新状況（スナップショットが決まってから表示）
+status_area = st.container()
 
 # サイドバー
 with st.sidebar:
@@ -336,9 +214,9 @@ with st.sidebar:
     if FANG_MODULE_OK:
         # 基準価額の自動取得ボタン
         if st.button("📡 最新基準価額を取得", use_container_width=True,
-                     help="Yahoo!ファイナンスからiFreeNEXT FANG+の基準価額を取得します"):
+                     help="iFreeNEXT FANG+の基準価額を取得します（次の公表までは取得済みの値を使用）"):
             with st.spinner("Yahoo!ファイナンスから取得中..."):
-                _auto_price = get_fang_current_price()
+                _auto_price = get_fang_nav()
             if _auto_price > 0:
                 st.session_state["fang_price_auto"] = _auto_price
                 st.success(f"✅ 取得成功: ¥{_auto_price:,.0f}")
@@ -399,18 +277,11 @@ with st.sidebar:
                 except Exception as e:
                     st.error(f"削除失敗: {e}")
 
-        # サマリー計算（ダッシュボード本体で使う変数を設定）
+        # サマリーは PortfolioEngine で計算（0 なら保存済みの基準価額を使う）
         _manual = fang_manual_price
         _auto   = st.session_state.get("fang_price_auto", 0.0)
-        _use_price = _auto if _auto > 0 else _manual
-        _fang_summary = calc_fang_summary(current_price=_use_price)
-
-        # ダッシュボード計算用変数（後段で使用）
-        fang_investment    = _fang_summary["total_investment"]
-        fang_current_value = _fang_summary["current_value"]
-        fang_profit        = _fang_summary["profit"]
-        fang_profit_pct    = _fang_summary["profit_pct"]
-        fang_purchase_price = _fang_summary["avg_cost"]  # 後段の互換性のため残す
+        fang_price = _auto if _auto > 0 else _manual
+        fang_summary = None
 
     else:
         # fang_manager.py が見つからない場合は旧来の手動入力
@@ -422,9 +293,21 @@ with st.sidebar:
             "購入時の基準価額", min_value=0.0, value=0.0, step=100.0,
             help="購入後に入力してください"
         )
-        fang_current_value = fang_investment
-        fang_profit        = 0.0
-        fang_profit_pct    = 0.0
+        # 評価額は QQQ の値動きで概算
+        fang_price = 0.0
+        fang_summary = {"total_investment": fang_investment, "current_value": fang_investment}
+        if fang_purchase_price > 0:
+            qqq_data = perf.cached_call("st.stock_price", get_stock_price, 'QQQ', cache_epoch(market_for('QQQ')))
+            if qqq_data['price'] > 0:
+                fang_current_value = fang_investment * (qqq_data['price'] / fang_purchase_price)
+                fang_summary.update(
+                    avg_cost=fang_purchase_price,
+                    current_price=qqq_data['price'],
+                    current_value=fang_current_value,
+                    profit=fang_current_value - fang_investment,
+                    profit_pct=(fang_current_value - fang_investment) / fang_investment * 100 if fang_investment > 0 else 0,
+                    price_source="QQQ概算",
+                )
 
     # 現金
     st.subheader("💵 現金")
@@ -444,8 +327,10 @@ with st.sidebar:
     st.subheader("📊 シクリカル株 記録")
 
     try:
+        import ledger_store
         from cyclical_purchase_manager import (
-            add_cyclical_purchase, get_purchase_history, delete_last_purchase
+            add_cyclical_purchase, get_purchase_history, delete_last_purchase,
+            PURCHASE_SHEET_NAME,
         )
         PURCHASE_MODULE_OK = True
     except ImportError:
@@ -470,7 +355,7 @@ with st.sidebar:
                         st.success(f"✅ {p_name}（{p_code}）{p_shares}株 @ ¥{p_price:,.0f} を記録しました")
                         st.rerun()
                     else:
-                        st.error("❌ 保存失敗。Secrets の gcp_service_account を確認してください。")
+                        st.error("❌ 保存失敗。ローカル台帳に書き込めませんでした。")
                 else:
                     st.error("銘柄コード・企業名・単価・株数をすべて入力してください。")
 
@@ -491,6 +376,9 @@ with st.sidebar:
             else:
                 st.dataframe(hist, use_container_width=True, hide_index=True)
                 st.caption(f"合計 {len(hist)} 件")
+            unsynced = ledger_store.pending_count(PURCHASE_SHEET_NAME)
+            if unsynced:
+                st.caption(f"🔄 Google Sheets 未同期: {unsynced} 件（バックグラウンドで同期中）")
     else:
         st.warning("⚠️ cyclical_purchase_manager.py が見つかりません")
 
@@ -511,219 +399,250 @@ with st.sidebar:
             st.caption("キャッシュ: なし")
         if st.button("🔄 キャッシュを更新", use_container_width=True):
             clear_cache()
+            get_target_estimates.clear()
             st.success("削除しました。再読み込みで再計算されます。")
             st.rerun()
         st.caption("※ 7日間有効。銘柄追加後に更新推奨。")
 
-# データ取得
-bonds = get_bond_yields()
-vix_data = get_vix()
-indices = get_major_indices()
+# データ取得・計算（表示はすべてこのスナップショットから行う）
+# 売却目標価格は目標価格セクションを描画するときに計算する
+engine_inputs = dict(
+    buffett_indicator=buffett_indicator,
+    cash_reserve=cash_reserve,
+    fang_price=fang_price,
+    fang_summary=fang_summary,
+    sheets_url=st.session_state.get('google_sheets_url', ''),
+)
+engine = PortfolioEngine(
+    **engine_inputs,
+    price_loader=lambda codes: perf.cached_call(
+        "st.portfolio_prices", get_portfolio_prices, codes, cache_epoch("TSE")
+    ),
+    macro_loader=lambda: perf.cached_call("st.macro", get_macro_snapshot, cache_epoch("NYSE")),
+    shiller_loader=lambda: perf.cached_call("st.shiller_pe", get_shiller_pe, cache_epoch("NYSE")),
+)
+snapshot_key = engine.cache_key()
+
+# セッションの最初の表示（起動・スリープ復帰直後）は前回保存したスナップショットを
+# そのまま表示し、最新の計算は別スレッドで行う。完了したら全体を再描画して差し替える。
+snapshot = None
+is_stale = False
+if not st.session_state.get("snapshot_live"):
+    requested_at = st.session_state.get("refresh_requested_at")
+    done, snapshot = (
+        snapshot_store.refresh_result(snapshot_key, requested_at) if requested_at else (False, None)
+    )
+    if not done:
+        snapshot = snapshot_store.load_snapshot(snapshot_key)
+        is_stale = snapshot is not None
+    if is_stale:
+        if requested_at is None:
+            st.session_state["refresh_requested_at"] = time.time()
+        # スレッド側は st.cache_data を使わない取得関数で計算する
+        snapshot_store.refresh_in_background(
+            snapshot_key, lambda: PortfolioEngine(**engine_inputs).build(with_targets=False)
+        )
+
+if snapshot is None:
+    snapshot = engine.build(with_targets=False)
+    snapshot_store.save_snapshot(snapshot_key, snapshot)
+if not is_stale:
+    st.session_state["snapshot_live"] = True
+    st.session_state.pop("refresh_requested_at", None)
+
+
+@st.fragment(run_every=1)
+def render_refresh_status(snapshot_key, built_at):
+    """保存済みの値を表示中の案内。裏の再計算が終わったら全体を再描画して差し替える"""
+    done, _ = snapshot_store.refresh_result(snapshot_key, st.session_state["refresh_requested_at"])
+    if done:
+        st.rerun()
+    st.caption(
+        f"🕒 {built_at.strftime('%Y年%m月%d日 %H:%M')} 時点の保存データを表示中 — 最新データを取得しています..."
+    )
+
+
+with status_area:
+    if is_stale:
+        render_refresh_status(snapshot_key, snapshot.built_at)
+    else:
+        st.caption(f"最終更新: {snapshot.built_at.strftime('%Y年%m月%d日 %H:%M:%S')}")
+
+if snapshot.holdings_source == "google_sheets":
+    st.sidebar.success("✅ Google Sheets から読込成功")
+for _message in snapshot.messages:
+    st.sidebar.error(f"❌ {_message}")
+
+# 各セクションは st.fragment として描画する。
+# セクション内のウィジェット操作（NTTチェックなど）はそのセクションだけを再実行する。
 
 # ========================================
 # 1. マクロ経済指標
 # ========================================
-st.markdown('<div class="section-header">🌍 マクロ経済指標</div>', unsafe_allow_html=True)
+@st.fragment
+def render_macro(snapshot):
+    """債券利回り・VIX・バフェット指数・シラーPER"""
+    import plotly.graph_objects as go
 
-col1, col2, col3 = st.columns(3)
+    bonds = snapshot.macro.bonds
+    vix_data = snapshot.macro.vix
+    buffett_indicator = snapshot.buffett_indicator
 
-with col1:
-    st.markdown("### 🔴 債券利回り")
-    st.metric("10年債利回り", f"{bonds['ten_year']:.2f}%")
-    st.metric("2年債利回り（概算）", f"{bonds['two_year']:.2f}%")
+    st.markdown('<div class="section-header">🌍 マクロ経済指標</div>', unsafe_allow_html=True)
 
-    spread = bonds['spread']
-    st.metric("イールドカーブ", f"{spread:.2f}%")
+    col1, col2, col3 = st.columns(3)
 
-    if spread >= 0:
-        st.success("✅ 正常範囲")
-    else:
-        st.error("⚠️ 逆イールド発生中")
-
-with col2:
-    st.markdown("### 😱 恐怖指数 (VIX)")
-    vix_current = vix_data['current']
-    st.metric("VIX指数", f"{vix_current:.2f}")
-
-    if vix_current < 15:
-        st.success("😊 楽観的")
-        st.info("市場は安定。保有継続。")
-    elif vix_current < 20:
-        st.info("😐 中立")
-        st.info("通常の変動範囲。")
-    elif vix_current < 30:
-        st.warning("😰 やや不安")
-        st.warning("警戒が必要。")
-    else:
-        st.error("😱 パニック")
-        st.error("🎯 買い増しチャンス！")
-
-    # VIX推移グラフ
-    if len(vix_data['history']) > 0:
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            y=vix_data['history'],
-            mode='lines+markers',
-            line=dict(color='red', width=2),
-            marker=dict(size=6)
-        ))
-        fig.update_layout(
-            title="過去5日間のVIX推移",
-            height=200,
-            margin=dict(l=0, r=0, t=30, b=0),
-            showlegend=False,
-            template="plotly_dark"
-        )
-        st.plotly_chart(fig, width="stretch")
-
-with col3:
-    st.markdown("### 💰 バフェット指数")
-    st.metric("バフェット指数 (%)", f"{buffett_indicator:.1f}%")
-
-    if buffett_indicator > 200:
-        st.error("🚨 歴史的割高")
-        st.error("警戒！調整リスク大。")
-    elif buffett_indicator > 180:
-        st.warning("⚠️ 割高")
-        st.warning("新規購入は慎重に。")
-    elif buffett_indicator > 150:
-        st.info("😐 やや割高")
-    else:
-        st.success("✅ 適正水準")
+    with col1:
+        st.markdown("### 🔴 債券利回り")
+        st.metric("10年債利回り", f"{bonds.ten_year:.2f}%")
+        st.metric("2年債利回り（概算）", f"{bonds.two_year:.2f}%")
+
+        spread = bonds.spread
+        st.metric("イールドカーブ", f"{spread:.2f}%")
+
+        if spread >= 0:
+            st.success("✅ 正常範囲")
+        else:
+            st.error("⚠️ 逆イールド発生中")
+
+    with col2:
+        st.markdown("### 😱 恐怖指数 (VIX)")
+        vix_current = vix_data.current
+        st.metric("VIX指数", f"{vix_current:.2f}")
+
+        if vix_current < 15:
+            st.success("😊 楽観的")
+            st.info("市場は安定。保有継続。")
+        elif vix_current < 20:
+            st.info("😐 中立")
+            st.info("通常の変動範囲。")
+        elif vix_current < 30:
+            st.warning("😰 やや不安")
+            st.warning("警戒が必要。")
+        else:
+            st.error("😱 パニック")
+            st.error("🎯 買い増しチャンス！")
+
+        # VIX推移グラフ
+        if len(vix_data.history) > 0:
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(
+                y=vix_data.history,
+                mode='lines+markers',
+                line=dict(color='red', width=2),
+                marker=dict(size=6)
+            ))
+            fig.update_layout(
+                title="過去5日間のVIX推移",
+                height=200,
+                margin=dict(l=0, r=0, t=30, b=0),
+                showlegend=False,
+                template="plotly_dark"
+            )
+            st.plotly_chart(fig, width="stretch")
+
+    with col3:
+        st.markdown("### 💰 バフェット指数")
+        st.metric("バフェット指数 (%)", f"{buffett_indicator:.1f}%")
+
+        if buffett_indicator > 200:
+            st.error("🚨 歴史的割高")
+            st.error("警戒！調整リスク大。")
+        elif buffett_indicator > 180:
+            st.warning("⚠️ 割高")
+            st.warning("新規購入は慎重に。")
+        elif buffett_indicator > 150:
+            st.info("😐 やや割高")
+        else:
+            st.success("✅ 適正水準")
+
+        shiller = snapshot.shiller
+        if shiller['value'] is not None:
+            st.metric("シラーPER (倍)", f"{shiller['value']:.1f}倍")
+            if shiller['percentile'] is not None:
+                st.caption(
+                    f"履歴上の位置: 全期間 {shiller['percentile']:.0f}% / "
+                    f"直近{RECENT_YEARS}年 {shiller['percentile_recent']:.0f}%（中央値 {shiller['median']:.1f}倍）"
+                )
+            else:
+                st.caption("履歴上の位置: 月次履歴を取得できていないため未算出")
+        else:
+            st.caption("シラーPER: 取得できませんでした")
+
+render_macro(snapshot)
 
 # ========================================
 # 2. ポートフォリオ全体サマリー
 # ========================================
-st.markdown('<div class="section-header">💼 ポートフォリオ全体</div>', unsafe_allow_html=True)
-
-# シクリカル株データ読込
-cyclical_df = load_cyclical_portfolio()
-
-# FANG+評価額計算
-# fang_manager統合済みの場合はサイドバーで既に計算されている
-# 未統合（FANG_MODULE_OK=False）の場合のみここで旧来計算を行う
-if not FANG_MODULE_OK:
-    fang_current_value = fang_investment
-    fang_profit = 0
-    fang_profit_pct = 0
-    if fang_purchase_price > 0:
-        qqq_data = get_stock_price('QQQ')
-        if qqq_data['price'] > 0:
-            fang_current_value = fang_investment * (qqq_data['price'] / fang_purchase_price)
-            fang_profit = fang_current_value - fang_investment
-            fang_profit_pct = (fang_profit / fang_investment * 100)
-
-# シクリカル株評価額計算
-cyclical_total_cost = 0
-cyclical_total_value = 0
-
-if not cyclical_df.empty:
-    for idx, row in cyclical_df.iterrows():
-        ticker = str(row['銘柄コード']) + '.T'
-        purchase_price = float(row['購入価格'])
-        shares = float(row['購入株数'])
-        cost = purchase_price * shares
-
-        cyclical_total_cost += cost
-
-        # 現在価格取得
-        stock_data = get_stock_price(ticker)
-        if stock_data['price'] > 0:
-            current_value = stock_data['price'] * shares
-            cyclical_total_value += current_value
-        else:
-            cyclical_total_value += cost
+@st.fragment
+def render_portfolio(totals):
+    """合計資産・資産配分"""
+    import plotly.graph_objects as go
 
-cyclical_profit = cyclical_total_value - cyclical_total_cost
-cyclical_profit_pct = (cyclical_profit / cyclical_total_cost * 100) if cyclical_total_cost > 0 else 0
+    st.markdown('<div class="section-header">💼 ポートフォリオ全体</div>', unsafe_allow_html=True)
 
-# 合計計算
-total_investment = fang_investment + cyclical_total_cost + cash_reserve
-total_value = fang_current_value + cyclical_total_value + cash_reserve
-total_profit = total_value - total_investment
-total_profit_pct = (total_profit / total_investment * 100) if total_investment > 0 else 0
+    # 表示
+    col1, col2, col3, col4 = st.columns(4)
 
-# 表示
-col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(
+            "💰 合計資産",
+            f"¥{totals.total_value:,.0f}",
+            f"{totals.total_profit:+,.0f} ({totals.total_profit_pct:+.2f}%)"
+        )
 
-with col1:
-    st.metric(
-        "💰 合計資産",
-        f"¥{total_value:,.0f}",
-        f"{total_profit:+,.0f} ({total_profit_pct:+.2f}%)"
-    )
+    with col2:
+        st.metric(
+            "💎 FANG+",
+            f"¥{totals.fang.value:,.0f}",
+            f"{totals.fang.profit:+,.0f} ({totals.fang.profit_pct:+.2f}%)"
+        )
 
-with col2:
-    profit_color = "positive" if fang_profit >= 0 else "negative"
-    st.metric(
-        "💎 FANG+",
-        f"¥{fang_current_value:,.0f}",
-        f"{fang_profit:+,.0f} ({fang_profit_pct:+.2f}%)"
-    )
+    with col3:
+        st.metric(
+            "📊 シクリカル株",
+            f"¥{totals.cyclical_value:,.0f}",
+            f"{totals.cyclical_profit:+,.0f} ({totals.cyclical_profit_pct:+.2f}%)"
+        )
 
-with col3:
-    st.metric(
-        "📊 シクリカル株",
-        f"¥{cyclical_total_value:,.0f}",
-        f"{cyclical_profit:+,.0f} ({cyclical_profit_pct:+.2f}%)"
+    with col4:
+        st.metric("💵 現金", f"¥{totals.cash:,.0f}")
+
+    # 資産配分グラフ
+    fig = go.Figure(data=[go.Pie(
+        labels=['FANG+', 'シクリカル株', '現金'],
+        values=[totals.fang.value, totals.cyclical_value, totals.cash],
+        hole=0.4,
+        marker=dict(colors=['#FF6B6B', '#4ECDC4', '#95E1D3'])
+    )])
+    fig.update_layout(
+        title="資産配分",
+        height=300,
+        template="plotly_dark"
     )
+    st.plotly_chart(fig, width="stretch")
 
-with col4:
-    st.metric("💵 現金", f"¥{cash_reserve:,.0f}")
-
-# 資産配分グラフ
-fig = go.Figure(data=[go.Pie(
-    labels=['FANG+', 'シクリカル株', '現金'],
-    values=[fang_current_value, cyclical_total_value, cash_reserve],
-    hole=0.4,
-    marker=dict(colors=['#FF6B6B', '#4ECDC4', '#95E1D3'])
-)])
-fig.update_layout(
-    title="資産配分",
-    height=300,
-    template="plotly_dark"
-)
-st.plotly_chart(fig, width="stretch")
+render_portfolio(snapshot.totals)
 
 # ========================================
 # 3. シクリカル株詳細
 # ========================================
-st.markdown('<div class="section-header">📊 シクリカル株 詳細</div>', unsafe_allow_html=True)
-
-if not cyclical_df.empty:
+@st.fragment
+def render_holdings(holdings):
+    """保有銘柄ごとの損益"""
     # 詳細テーブル作成
-    detail_rows = []
-
-    for idx, row in cyclical_df.iterrows():
-        ticker = str(row['銘柄コード']) + '.T'
-        stock_name = row['銘柄名']
-        purchase_price = float(row['購入価格'])
-        shares = float(row['購入株数'])
-        purchase_date = row['購入日']
-
-        cost = purchase_price * shares
-
-        # 現在価格取得
-        stock_data = get_stock_price(ticker)
-        current_price = stock_data['price'] if stock_data['price'] > 0 else purchase_price
-        current_value = current_price * shares
-        profit = current_value - cost
-        profit_pct = (profit / cost * 100) if cost > 0 else 0
-
-        detail_rows.append({
-            '銘柄コード': row['銘柄コード'],
-            '銘柄名': stock_name,
-            '購入価格': f"¥{purchase_price:,.0f}",
-            '現在価格': f"¥{current_price:,.0f}",
-            '株数': int(shares),
-            '取得額': f"¥{cost:,.0f}",
-            '評価額': f"¥{current_value:,.0f}",
-            '損益': f"¥{profit:+,.0f}",
-            '損益率': f"{profit_pct:+.2f}%",
-            '購入日': purchase_date
-        })
-
-    detail_df = pd.DataFrame(detail_rows)
+    detail_df = pd.DataFrame([{
+        '銘柄コード': h.code,
+        '銘柄名': h.name,
+        '購入価格': f"¥{h.purchase_price:,.0f}",
+        '現在価格': f"¥{h.current_price:,.0f}",
+        '株数': int(h.shares),
+        '取得額': f"¥{h.cost:,.0f}",
+        '評価額': f"¥{h.value:,.0f}",
+        '損益': f"¥{h.profit:+,.0f}",
+        '損益率': f"{h.profit_pct:+.2f}%",
+        '購入日': h.purchase_date,
+    } for h in holdings])
 
     # カラーコーディング（損益率列のみ）
     def highlight_profit(s):
@@ -740,179 +659,188 @@ if not cyclical_df.empty:
         height=400
     )
 
-    # 簡易売却シグナル
+@st.fragment
+def render_signals(signals):
+    """簡易売却シグナル"""
     st.subheader("🚨 売却シグナル")
 
-    signals = []
-    for idx, row in cyclical_df.iterrows():
-        ticker = str(row['銘柄コード']) + '.T'
-        stock_name = row['銘柄名']
-        purchase_price = float(row['購入価格'])
-        shares = float(row['購入株数'])
-        cost = purchase_price * shares
-
-        stock_data = get_stock_price(ticker)
-        current_price = stock_data['price'] if stock_data['price'] > 0 else purchase_price
-        current_value = current_price * shares
-        profit_pct = ((current_value - cost) / cost * 100) if cost > 0 else 0
-
-        # シグナル判定
-        signal_level = 0
-        signal_reasons = []
-
-        # 損益率チェック
-        if profit_pct <= -30:
-            signal_level += 3
-            signal_reasons.append("⚠️ 損切りライン（-30%以下）")
-        elif profit_pct >= 30:
-            signal_level += 2
-            signal_reasons.append("💰 利益確定ライン（+30%以上）")
-
-        # 変動率チェック
-        if abs(stock_data['change_pct']) > 5:
-            signal_level += 1
-            signal_reasons.append(f"📈 大幅変動（{stock_data['change_pct']:+.2f}%）")
-
-        if signal_level > 0:
-            signals.append({
-                '銘柄': f"{row['銘柄コード']} {stock_name}",
-                'シグナル強度': signal_level,
-                '理由': ' / '.join(signal_reasons),
-                '損益率': f"{profit_pct:+.2f}%"
-            })
-
     if signals:
-        signal_df = pd.DataFrame(signals)
-        signal_df = signal_df.sort_values('シグナル強度', ascending=False)
-
         st.dataframe(
-            signal_df,
+            pd.DataFrame([{
+                '銘柄': sig.label,
+                'シグナル強度': sig.strength,
+                '理由': sig.reason,
+                '損益率': f"{sig.profit_pct:+.2f}%",
+            } for sig in signals]),
             width="stretch",
             hide_index=True
         )
     else:
         st.success("✅ 現在、売却シグナルはありません。保有継続。")
 
+st.markdown('<div class="section-header">📊 シクリカル株 詳細</div>', unsafe_allow_html=True)
+
+if snapshot.holdings:
+    render_holdings(snapshot.holdings)
+    render_signals(snapshot.signals)
 else:
     st.info("シクリカル株の保有データがありません。")
 
 # ========================================
 # 3-2. 売却目標価格（たーちゃん哲学2.0）
 # ========================================
-st.markdown('<div class="section-header">🎯 売却目標価格</div>', unsafe_allow_html=True)
-
-if not TARGET_PRICES_AVAILABLE:
-    st.warning("⚠️ auto_per_estimator.py が見つかりません。リポジトリに追加してください。")
-elif cyclical_df.empty:
-    st.info("シクリカル株の保有データがありません。")
-else:
-    st.caption(
-        "過去52週の株価データから銘柄ごとに現実的な売却目標価格を推定。"
-        "各銘柄の特性に合わせた個別最適化目標を3段階で表示。"
-    )
+@st.fragment
+def render_target_detail(estimated):
+    """銘柄別詳細（選択した1銘柄だけを描画）"""
+    st.subheader("🔍 銘柄別詳細")
+
+    names = {t.code: f"{t.name}（{t.code}）" for t in estimated}
+    code = st.selectbox("銘柄を選択", list(names), format_func=names.get, key="target_detail_code")
+    estimate = next(t for t in estimated if t.code == code)
+    result = estimate.result
+    current_price = estimate.current_price
+
+    # メタ情報
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        conf = result['confidence']
+        badge = "🟢" if conf >= 70 else "🟡" if conf >= 50 else "🔴"
+        st.metric("信頼度", f"{badge} {conf}%")
+    with c2:
+        st.metric("推定方法", result['estimation_method'])
+    with c3:
+        if '52w_data' in result:
+            d = result['52w_data']
+            st.metric(
+                "52週高値",
+                f"¥{d['high']:,.0f}",
+                f"PER {d['high_per']}倍",
+            )
 
-    # NTT除外オプション
-    show_ntt = st.checkbox("NTT（長期配当ホールド）も含める", value=False, key="show_ntt")
+    st.caption(f"根拠: {result['reason']}")
+    st.markdown("")
 
-    # 計算対象を決定
-    target_df = cyclical_df.copy()
-    if not show_ntt:
-        target_df = target_df[target_df['銘柄コード'].astype(str) != '9432']
+    # 3段階の目標カード
+    cols = st.columns(3)
+    icons = ['🟡', '🟢', '🚀']
 
-    if target_df.empty:
-        st.info("表示対象の銘柄がありません（NTTを含める場合はチェックを入れてください）。")
-    else:
-        # ---- サマリーテーブル ----
-        st.subheader("📊 全銘柄サマリー")
+    for col, target, icon in zip(cols, result['targets'], icons):
+        with col:
+            pct_to_target = (target['price'] - current_price) / current_price * 100
+            if pct_to_target <= 5:
+                status = "🚨 目標到達圏"
+            elif pct_to_target <= 20:
+                status = "⚠️ 目標接近中"
+            else:
+                status = f"残り +{pct_to_target:.0f}%"
 
-        summary_rows = []
-        all_targets = {}   # ticker(コードのみ) → result
+            st.metric(
+                label=f"{icon} {target['level']}（{target['timeframe']}）",
+                value=f"¥{target['price']:,.0f}",
+                delta=f"+{target['return_pct']}%",
+            )
+            st.caption(
+                f"目標PER: **{target['per']}倍** ／ 売却: {target['sell_ratio']}%  \n{status}"
+            )
 
-        progress = st.progress(0, text="目標価格を計算中...")
+    # 売却ガイド
+    st.markdown("")
+    t = result['targets']
+    st.info(
+        f"**{result['name']} 売却ガイド**\n\n"
+        f"① 🟡 ¥{t[0]['price']:,.0f} 到達 → **{t[0]['sell_ratio']}%売却**（{t[0]['timeframe']}）\n\n"
+        f"② 🟢 ¥{t[1]['price']:,.0f} 到達 → **{t[1]['sell_ratio']}%売却**（{t[1]['timeframe']}）\n\n"
+        f"③ 🚀 ¥{t[2]['price']:,.0f} 到達 → **{t[2]['sell_ratio']}%売却・全売却**（{t[2]['timeframe']}）\n\n"
+        "⚠️ Code 5 でシグナル強度 6点以上 → 目標未達でも売却を検討"
+    )
 
-        for i, (_, row) in enumerate(target_df.iterrows()):
-            ticker_code = str(int(row['銘柄コード']))
-            ticker_full = ticker_code + '.T'
-            name = row['銘柄名']
-            purchase_price = float(row['購入価格'])
+@st.fragment
+def render_targets(holdings):
+    """売却目標価格（NTTチェックの切替はこのセクションだけを再実行）"""
+    st.markdown('<div class="section-header">🎯 売却目標価格</div>', unsafe_allow_html=True)
 
-            progress.progress((i + 1) / len(target_df), text=f"計算中: {name}...")
+    if not TARGET_PRICES_AVAILABLE:
+        st.warning("⚠️ auto_per_estimator.py が見つかりません。リポジトリに追加してください。")
+    elif not holdings:
+        st.info("シクリカル株の保有データがありません。")
+    else:
+        st.caption(
+            "過去52週の株価データから銘柄ごとに現実的な売却目標価格を推定。"
+            "各銘柄の特性に合わせた個別最適化目標を3段階で表示。"
+        )
 
-            # 現在価格
-            stock_data = get_stock_price(ticker_full)
-            current_price = stock_data['price'] if stock_data['price'] > 0 else purchase_price
+        # NTT除外オプション
+        show_ntt = st.checkbox("NTT（長期配当ホールド）も含める", value=False, key="show_ntt")
 
-            # PER / EPS（購入時PERとEPS逆算方式）
-            purchase_per = float(row.get('購入時PER', 0) or 0)
-            if purchase_per > 0 and purchase_price > 0:
-                # EPS = 購入単価 ÷ 購入時PER
-                eps = round(purchase_price / purchase_per, 2)
-                # 現在PER = 現在株価 ÷ EPS
-                per = round(current_price / eps, 2) if eps > 0 else 0
-            else:
-                per, eps = 0, 0
-
-            if not per or per <= 0 or not eps or eps <= 0:
-                summary_rows.append({
-                    '銘柄': f"{name}（{ticker_code}）",
-                    '現在価格': f"¥{current_price:,.0f}",
-                    '現在PER': '-',
-                    '🟡 保守的': '-',
-                    '🟢 標準': '-',
-                    '🚀 楽観的': '-',
-                    '信頼度': '-',
-                })
-                continue
-
-            try:
-                result = get_target_prices_auto(ticker_code, current_price, per, eps, name)
-                all_targets[ticker_code] = {
-                    'result': result,
-                    'current_price': current_price,
-                    'per': per,
-                    'name': name,
-                }
-                t = result['targets']
-                pct_to_t1 = (t[0]['price'] - current_price) / current_price * 100
-
-                alert = ''
-                if pct_to_t1 <= 5:
-                    alert = ' 🚨'
-                elif pct_to_t1 <= 15:
-                    alert = ' ⚠️'
-
-                summary_rows.append({
-                    '銘柄': f"{name}（{ticker_code}）",
-                    '現在価格': f"¥{current_price:,.0f}",
-                    '現在PER': f"{per:.1f}倍",
-                    '🟡 保守的': f"¥{t[0]['price']:,.0f}  (+{t[0]['return_pct']}%){alert}",
-                    '🟢 標準': f"¥{t[1]['price']:,.0f}  (+{t[1]['return_pct']}%)",
-                    '🚀 楽観的': f"¥{t[2]['price']:,.0f}  (+{t[2]['return_pct']}%)",
-                    '信頼度': f"{result['confidence']}%",
-                })
-            except Exception as e:
-                summary_rows.append({
-                    '銘柄': f"{name}（{ticker_code}）",
-                    '現在価格': f"¥{current_price:,.0f}",
-                    '現在PER': f"{per:.1f}倍",
-                    '🟡 保守的': f"エラー: {e}",
-                    '🟢 標準': '-',
-                    '🚀 楽観的': '-',
-                    '信頼度': '-',
-                })
-
-        progress.empty()
-
-        if summary_rows:
-            st.dataframe(
-                pd.DataFrame(summary_rows),
-                use_container_width=True,
-                hide_index=True,
-            )
+        # 表示対象を決定（目標価格は全銘柄分をまとめてキャッシュ。チェックの切替では再計算しない）
+        targets = [
+            t for t in perf.cached_call("st.target_estimates", get_target_estimates, holdings)
+            if show_ntt or t.code not in LONG_TERM_HOLD_CODES
+        ]
 
-        # 読み方説明
-        with st.expander("📖 売却戦略の読み方"):
-            st.markdown("""
+        if not targets:
+            st.info("表示対象の銘柄がありません（NTTを含める場合はチェックを入れてください）。")
+        else:
+            # ---- サマリーテーブル ----
+            st.subheader("📊 全銘柄サマリー")
+
+            summary_rows = []
+            for target in targets:
+                label = f"{target.name}（{target.code}）"
+                current_price = target.current_price
+
+                if target.result is None and target.error is None:
+                    # PER / EPS 不明
+                    summary_rows.append({
+                        '銘柄': label,
+                        '現在価格': f"¥{current_price:,.0f}",
+                        '現在PER': '-',
+                        '🟡 保守的': '-',
+                        '🟢 標準': '-',
+                        '🚀 楽観的': '-',
+                        '信頼度': '-',
+                    })
+                elif target.error is not None:
+                    summary_rows.append({
+                        '銘柄': label,
+                        '現在価格': f"¥{current_price:,.0f}",
+                        '現在PER': f"{target.per:.1f}倍",
+                        '🟡 保守的': f"エラー: {target.error}",
+                        '🟢 標準': '-',
+                        '🚀 楽観的': '-',
+                        '信頼度': '-',
+                    })
+                else:
+                    result = target.result
+                    t = result['targets']
+                    pct_to_t1 = (t[0]['price'] - current_price) / current_price * 100
+
+                    alert = ''
+                    if pct_to_t1 <= 5:
+                        alert = ' 🚨'
+                    elif pct_to_t1 <= 15:
+                        alert = ' ⚠️'
+
+                    summary_rows.append({
+                        '銘柄': label,
+                        '現在価格': f"¥{current_price:,.0f}",
+                        '現在PER': f"{target.per:.1f}倍",
+                        '🟡 保守的': f"¥{t[0]['price']:,.0f}  (+{t[0]['return_pct']}%){alert}",
+                        '🟢 標準': f"¥{t[1]['price']:,.0f}  (+{t[1]['return_pct']}%)",
+                        '🚀 楽観的': f"¥{t[2]['price']:,.0f}  (+{t[2]['return_pct']}%)",
+                        '信頼度': f"{result['confidence']}%",
+                    })
+
+            if summary_rows:
+                st.dataframe(
+                    pd.DataFrame(summary_rows),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+            # 読み方説明
+            with st.expander("📖 売却戦略の読み方"):
+                st.markdown("""
 | 段階 | タイミング | 売却比率 | 考え方 |
 |------|-----------|---------|--------|
 | 🟡 保守的 | 最初の利確 | **40%** | 過去52週高値レベル。ほぼ確実に到達可能。ここで4割を確定。 |
@@ -920,137 +848,137 @@ else:
 | 🚀 楽観的 | 残りの利確 | **20%** | 景気ピーク時のベストケース。残り2割で最大リターンを狙う。 |
 
 ⚠️ 保守的目標に近づいたら Code 5 のシグナルも確認すること。
-            """)
+                """)
 
-        st.markdown("---")
+            st.markdown("---")
 
-        # ---- 銘柄別詳細 ----
-        if all_targets:
-            st.subheader("🔍 銘柄別詳細")
-
-            tab_names = [v['name'] for v in all_targets.values()]
-            tabs = st.tabs(tab_names)
-
-            for tab, (ticker_code, data) in zip(tabs, all_targets.items()):
-                with tab:
-                    result = data['result']
-                    current_price = data['current_price']
-                    per = data['per']
-
-                    # メタ情報
-                    c1, c2, c3 = st.columns(3)
-                    with c1:
-                        conf = result['confidence']
-                        badge = "🟢" if conf >= 70 else "🟡" if conf >= 50 else "🔴"
-                        st.metric("信頼度", f"{badge} {conf}%")
-                    with c2:
-                        st.metric("推定方法", result['estimation_method'])
-                    with c3:
-                        if '52w_data' in result:
-                            d = result['52w_data']
-                            st.metric(
-                                "52週高値",
-                                f"¥{d['high']:,.0f}",
-                                f"PER {d['high_per']}倍",
-                            )
-
-                    st.caption(f"根拠: {result['reason']}")
-                    st.markdown("")
-
-                    # 3段階の目標カード
-                    cols = st.columns(3)
-                    icons = ['🟡', '🟢', '🚀']
-
-                    for col, target, icon in zip(cols, result['targets'], icons):
-                        with col:
-                            pct_to_target = (target['price'] - current_price) / current_price * 100
-                            if pct_to_target <= 5:
-                                status = "🚨 目標到達圏"
-                            elif pct_to_target <= 20:
-                                status = "⚠️ 目標接近中"
-                            else:
-                                status = f"残り +{pct_to_target:.0f}%"
-
-                            st.metric(
-                                label=f"{icon} {target['level']}（{target['timeframe']}）",
-                                value=f"¥{target['price']:,.0f}",
-                                delta=f"+{target['return_pct']}%",
-                            )
-                            st.caption(
-                                f"目標PER: **{target['per']}倍** ／ 売却: {target['sell_ratio']}%  \n{status}"
-                            )
-
-                    # 売却ガイド
-                    st.markdown("")
-                    t = result['targets']
-                    st.info(
-                        f"**{result['name']} 売却ガイド**\n\n"
-                        f"① 🟡 ¥{t[0]['price']:,.0f} 到達 → **{t[0]['sell_ratio']}%売却**（{t[0]['timeframe']}）\n\n"
-                        f"② 🟢 ¥{t[1]['price']:,.0f} 到達 → **{t[1]['sell_ratio']}%売却**（{t[1]['timeframe']}）\n\n"
-                        f"③ 🚀 ¥{t[2]['price']:,.0f} 到達 → **{t[2]['sell_ratio']}%売却・全売却**（{t[2]['timeframe']}）\n\n"
-                        "⚠️ Code 5 でシグナル強度 6点以上 → 目標未達でも売却を検討"
-                    )
+            # ---- 銘柄別詳細 ----
+            estimated = [t for t in targets if t.result is not None]
+            if estimated:
+                render_target_detail(estimated)
+
+render_targets(snapshot.holdings)
 
 # ========================================
 # 4. 主要指数
 # ========================================
-st.markdown('<div class="section-header">📈 主要指数</div>', unsafe_allow_html=True)
-
-if indices:
-    cols = st.columns(len(indices))
-    for i, (name, data) in enumerate(indices.items()):
-        with cols[i]:
-            color = "positive" if data['change_pct'] >= 0 else "negative"
-            st.metric(
-                name,
-                f"${data['price']:,.2f}" if name == 'QQQ' else f"{data['price']:,.2f}",
-                f"{data['change_pct']:+.2f}%"
-            )
+@st.fragment
+def render_indices(indices):
+    """主要指数の現在値と前日比"""
+    st.markdown('<div class="section-header">📈 主要指数</div>', unsafe_allow_html=True)
+
+    if indices:
+        cols = st.columns(len(indices))
+        for i, (name, data) in enumerate(indices.items()):
+            with cols[i]:
+                color = "positive" if data.change_pct >= 0 else "negative"
+                st.metric(
+                    name,
+                    f"${data.price:,.2f}" if name == 'QQQ' else f"{data.price:,.2f}",
+                    f"{data.change_pct:+.2f}%"
+                )
+
+render_indices(snapshot.macro.indices)
 
 # ========================================
 # 5. 総合判定
 # ========================================
-st.markdown('<div class="section-header">🎯 総合判定</div>', unsafe_allow_html=True)
-
-danger_level = calculate_danger_level(buffett_indicator, bonds['spread'], vix_data['current'])
+@st.fragment
+def render_verdict(snapshot):
+    """警戒レベルと推奨アクション"""
+    st.markdown('<div class="section-header">🎯 総合判定</div>', unsafe_allow_html=True)
+
+    danger_level = snapshot.danger_level
+    vix_data = snapshot.macro.vix
+    totals = snapshot.totals
+
+    col1, col2 = st.columns([1, 2])
+
+    with col1:
+        st.metric("⚠️ 警戒レベル", f"{danger_level} / 9")
+
+        if danger_level >= 7:
+            st.error("🚨 最大警戒")
+        elif danger_level >= 5:
+            st.warning("⚠️ 高警戒")
+        elif danger_level >= 3:
+            st.info("😐 中警戒")
+        else:
+            st.success("✅ 低警戒")
+
+    with col2:
+        st.subheader("💡 推奨アクション")
+
+        if danger_level >= 7:
+            st.error("🚨 即座に損切りを検討")
+            st.write("- 全ポジションの見直し")
+            st.write("- 現金比率を60%以上に")
+        elif danger_level >= 5:
+            st.warning("⚠️ 新規購入を一時停止")
+            st.write("- 保有継続、追加購入は控える")
+            st.write("- 現金を確保")
+        elif danger_level >= 3:
+            st.info("😐 慎重に行動")
+            st.write("- 通常通り保有継続")
+            st.write("- 追加購入は少額に")
+        else:
+            st.success("✅ 通常通り行動")
+            st.write("- 保有継続")
+            st.write("- 投資計画通りに実行")
 
-col1, col2 = st.columns([1, 2])
+        if vix_data.current > 30:
+            st.success("🎯 VIX 30超え！買い増しチャンス")
+            st.write(f"- 待機資金 ¥{totals.cash:,.0f} の活用を検討")
 
-with col1:
-    st.metric("⚠️ 警戒レベル", f"{danger_level} / 9")
+render_verdict(snapshot)
 
-    if danger_level >= 7:
-        st.error("🚨 最大警戒")
-    elif danger_level >= 5:
-        st.warning("⚠️ 高警戒")
-    elif danger_level >= 3:
-        st.info("😐 中警戒")
-    else:
-        st.success("✅ 低警戒")
-
-with col2:
-    st.subheader("💡 推奨アクション")
-
-    if danger_level >= 7:
-        st.error("🚨 即座に損切りを検討")
-        st.write("- 全ポジションの見直し")
-        st.write("- 現金比率を60%以上に")
-    elif danger_level >= 5:
-        st.warning("⚠️ 新規購入を一時停止")
-        st.write("- 保有継続、追加購入は控える")
-        st.write("- 現金を確保")
-    elif danger_level >= 3:
-        st.info("😐 慎重に行動")
-        st.write("- 通常通り保有継続")
-        st.write("- 追加購入は少額に")
-    else:
-        st.success("✅ 通常通り行動")
-        st.write("- 保有継続")
-        st.write("- 投資計画通りに実行")
+# ========================================
+# 6. パフォーマンス（この描画の計測）
+# ========================================
+def render_performance(render, started):
+    """この描画で時間のかかった処理・分類ごとの合計・キャッシュヒット率（perf.log にも同じ内容を出力）"""
+    with st.expander(f"⏱️ パフォーマンス（この描画 {time.time() - started:.2f}秒）", expanded=False):
+        st.caption(
+            "この描画で実行した処理のみ（裏の再計算スレッド・他のセッションは含みません）。"
+            f"全体の記録は {perf.PERF_LOG}（JSON Lines）にあります。"
+        )
 
-    if vix_data['current'] > 30:
-        st.success("🎯 VIX 30超え！買い増しチャンス")
-        st.write(f"- 待機資金 ¥{cash_reserve:,.0f} の活用を検討")
+        slowest = perf.slowest(render)
+        if not slowest:
+            st.info("この描画ではキャッシュ外の取得・計算はありませんでした。")
+        else:
+            st.markdown("**時間のかかった処理**")
+            st.dataframe(pd.DataFrame([
+                {
+                    '分類': e['category'],
+                    '処理': e['name'],
+                    '時間(ms)': e['ms'],
+                    '結果': "✅" if e['ok'] else f"❌ {e.get('error', '')[:80]}",
+                    'thread': e['thread'],
+                }
+                for e in slowest
+            ]), use_container_width=True, hide_index=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("**分類ごとの合計**")
+            totals = perf.stage_totals(render)
+            if totals:
+                st.dataframe(pd.DataFrame([
+                    {'分類': category, '回数': t['count'], '合計(ms)': round(t['ms'], 1), 'エラー': t['errors']}
+                    for category, t in sorted(totals.items(), key=lambda item: -item[1]['ms'])
+                ]), use_container_width=True, hide_index=True)
+        with col2:
+            st.markdown("**キャッシュヒット率**")
+            stats = perf.cache_stats(render)
+            if stats:
+                st.dataframe(pd.DataFrame([
+                    {'キャッシュ': cache, 'ヒット': s['hits'], 'ミス': s['misses'],
+                     'ヒット率': f"{s['hit_rate']:.0f}%"}
+                    for cache, s in sorted(stats.items())
+                ]), use_container_width=True, hide_index=True)
+
+render_performance(render_id, render_started)
 
 # フッター
 st.markdown("---")